@@ -0,0 +1,285 @@
+"""
+Parse-throughput benchmark for the SafeBite scrapers
+
+Runs every site's card extraction, the grocery text helpers (clean_price,
+extract_discount_percentage, extract_weight) and the per-source merge of
+scrape_all_sources over a corpus of saved pages, and reports pages per
+second, cards per second and peak memory per source and parser backend,
+along with the size of each source's cache entries as JSON and in the
+scraper_records encoding.
+
+The corpus holds rendered search pages (page.content() after the cards
+have loaded), one file per query:
+
+    <corpus>/grocery/<source>/<query>.html
+    <corpus>/food_delivery/<source>/<food>.html
+
+fixtures/bench holds a small synthetic corpus so the benchmark runs out of
+the box. With --archive the pages are read from the archive of scraped
+pages instead (see scraper_archive), one per distinct page and query.
+
+Usage:
+
+    python bench_scrapers.py --corpus fixtures/bench --output bench.json
+    python bench_scrapers.py --archive --since 2024-05-01 --output bench.json
+
+Compare the JSON of two commits to spot parse regressions.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from functools import partial
+
+# The scrapers log every parsed page; keep the timings free of that
+logging.disable(logging.INFO)
+os.environ.setdefault('SCRAPER_CACHE_BACKEND', 'memory')
+
+import scraper_parsing
+import scraper_records
+import scraper_archive
+import enhanced_grocery_scraper as grocery
+import food_delivery_scraper as food_delivery
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'bench')
+DEFAULT_CITY = 'Bangalore'
+
+def parser_backends():
+    """The BeautifulSoup parsers available here"""
+    backends = ['html.parser']
+    try:
+        import lxml  # noqa: F401
+        backends.insert(0, 'lxml')
+    except ImportError:
+        pass
+    return backends
+
+def load_pages(corpus, scraper, source):
+    """Return the (query, html) pages saved for a source"""
+    directory = os.path.join(corpus, scraper, source)
+    if not os.path.isdir(directory):
+        return []
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.html'):
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                pages.append((os.path.splitext(name)[0], f.read()))
+    return pages
+
+def archived_pages(since, scraper, source):
+    """Return the (query, html) pages archived for a source, each page once"""
+    pages = {}
+    for fetch in scraper_archive.archived_fetches(scraper, source, since):
+        params = fetch["params"]
+        query = params.get("query") or params.get("food") or ''
+        if (query, fetch["content_hash"]) not in pages:
+            pages[(query, fetch["content_hash"])] = scraper_archive.read_page(fetch["content_hash"])
+    return [(query, html) for (query, content_hash), html in pages.items()]
+
+def source_parsers(city):
+    """(scraper, source, parse(query, html)) for every site"""
+    parsers = []
+    for key, site in grocery.GROCERY_SOURCES.items():
+        parsers.append(("grocery", key, lambda query, html, parse=site["parse"]: parse(html)))
+    for key, site in food_delivery.FOOD_DELIVERY_SOURCES.items():
+        parsers.append((
+            "food_delivery", key,
+            lambda query, html, parse=site["parse"]: parse(html, query, city)
+        ))
+    return parsers
+
+def timed(run, repeat):
+    """Best wall time of repeat runs, and the result of the last one"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def peak_memory(run):
+    """Peak traced memory of one run, in bytes"""
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_source(parse, pages, repeat):
+    """Parse every page of a source and measure throughput and memory"""
+    run = lambda: [parse(query, html) for query, html in pages]
+    seconds, results = timed(run, repeat)
+    cards = sum(len(items) for items in results)
+    return {
+        "pages": len(pages),
+        "cards": cards,
+        "seconds": round(seconds, 6),
+        "pages_per_second": round(len(pages) / seconds, 1) if seconds else None,
+        "cards_per_second": round(cards / seconds, 1) if seconds else None,
+        "peak_memory_bytes": peak_memory(run)
+    }, results
+
+def card_texts(pages, source):
+    """Every text value read from the grocery cards of a source"""
+    cards = getattr(grocery, f"{source.upper()}_CARDS")
+    fields = getattr(grocery, f"{source.upper()}_SELECTORS")
+    texts = []
+    for query, html in pages:
+        for row in scraper_parsing.card_rows(html, cards, fields, 15):
+            texts.extend(value for value in row.values() if isinstance(value, str))
+    return texts
+
+def bench_helpers(texts, repeat):
+    """Throughput of the grocery text helpers over the card texts"""
+    helpers = {
+        "clean_price": grocery.clean_price,
+        "extract_discount_percentage": grocery.extract_discount_percentage,
+        "extract_weight": grocery.extract_weight
+    }
+    report = {}
+    for name, helper in helpers.items():
+        seconds, _ = timed(lambda: [helper(text) for text in texts], repeat)
+        report[name] = {
+            "calls": len(texts),
+            "calls_per_second": round(len(texts) / seconds, 1) if seconds else None
+        }
+    return report
+
+def bench_merge(results_by_source, repeat):
+    """Throughput of the scrape_all_sources merge over the parsed pages"""
+    queries = {}
+    for source, results in results_by_source.items():
+        for query, products in results:
+            result = {"source": source, "products": products, "fetch_path": "http", "status": "ok"}
+            queries.setdefault(query, []).append((result, False))
+    if not queries:
+        return None
+    run = lambda: [grocery.merge_source_results(source_results) for source_results in queries.values()]
+    seconds, _ = timed(run, repeat)
+    return {
+        "merges": len(queries),
+        "merges_per_second": round(len(queries) / seconds, 1) if seconds else None
+    }
+
+def bench_cache_entries(results_by_source, repeat):
+    """Cache entry size and codec throughput of the parsed results, against JSON"""
+    entries = []
+    for (scraper, source), results in results_by_source.items():
+        items = "products" if scraper == "grocery" else "restaurants"
+        for query, parsed in results:
+            entries.append({"value": {"source": source, items: parsed, "fetch_path": "http", "status": "ok"}, "fresh_until": time.time()})
+    if not entries:
+        return None
+
+    as_json = [json.dumps(scraper_records.to_json(entry), separators=(',', ':')).encode('utf-8') for entry in entries]
+    encoded = [scraper_records.encode(entry) for entry in entries]
+    encode_seconds, _ = timed(lambda: [scraper_records.encode(entry) for entry in entries], repeat)
+    decode_seconds, _ = timed(lambda: [scraper_records.decode(data) for data in encoded], repeat)
+    json_bytes = sum(len(data) for data in as_json)
+    record_bytes = sum(len(data) for data in encoded)
+    return {
+        "entries": len(entries),
+        "json_bytes_per_entry": json_bytes // len(entries),
+        "record_bytes_per_entry": record_bytes // len(entries),
+        "ratio": round(json_bytes / record_bytes, 2) if record_bytes else None,
+        "encodes_per_second": round(len(entries) / encode_seconds, 1) if encode_seconds else None,
+        "decodes_per_second": round(len(entries) / decode_seconds, 1) if decode_seconds else None
+    }
+
+def git_commit():
+    """The commit being benchmarked, if this is a git checkout"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+def run_benchmarks(pages_for, repeat, city):
+    """Benchmark every source with a saved page, for every parser backend
+
+    pages_for(scraper, source) returns the (query, html) pages of a source.
+    """
+    sources = []
+    helpers = None
+    merge = {}
+    cache_entries = None
+    original_parser = scraper_parsing.HTML_PARSER
+    try:
+        for backend in parser_backends():
+            scraper_parsing.HTML_PARSER = backend
+            grocery_results = {}
+            parsed_results = {}
+            for scraper, source, parse in source_parsers(city):
+                pages = pages_for(scraper, source)
+                if not pages:
+                    continue
+                report, results = bench_source(parse, pages, repeat)
+                sources.append({"scraper": scraper, "source": source, "parser": backend, **report})
+                parsed_results[(scraper, source)] = [(query, items) for (query, html), items in zip(pages, results)]
+                if scraper == "grocery":
+                    grocery_results[source] = parsed_results[(scraper, source)]
+            merge[backend] = bench_merge(grocery_results, repeat)
+            # Every backend parses the same cards, so measure the entries once
+            if cache_entries is None:
+                cache_entries = bench_cache_entries(parsed_results, repeat)
+
+        texts = []
+        for key in grocery.GROCERY_SOURCES:
+            texts.extend(card_texts(pages_for("grocery", key), key))
+        helpers = bench_helpers(texts, repeat) if texts else None
+    finally:
+        scraper_parsing.HTML_PARSER = original_parser
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "repeat": repeat,
+        "sources": sources,
+        "helpers": helpers,
+        "merge": merge,
+        "cache_entries": cache_entries
+    }
+
+def print_report(report):
+    """Print a short table of the source results"""
+    print(f"{'scraper':<14} {'source':<18} {'parser':<12} {'pages/s':>10} {'cards/s':>10} {'peak KiB':>10}")
+    for row in report["sources"]:
+        print(
+            f"{row['scraper']:<14} {row['source']:<18} {row['parser']:<12} "
+            f"{row['pages_per_second'] or 0:>10} {row['cards_per_second'] or 0:>10} {row['peak_memory_bytes'] // 1024:>10}"
+        )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark scraper parse throughput over saved pages")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help="directory of saved pages")
+    parser.add_argument('--archive', action='store_true', help="read the pages from the archive of scraped pages instead")
+    parser.add_argument('--since', help="with --archive, only pages fetched on or after this date (YYYY-MM-DD)")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per source; the best one is reported")
+    parser.add_argument('--city', default=DEFAULT_CITY, help="city passed to the food delivery parsers")
+    args = parser.parse_args()
+
+    if args.archive:
+        pages_for = partial(archived_pages, scraper_archive.parse_since(args.since))
+    else:
+        pages_for = partial(load_pages, args.corpus)
+    report = run_benchmarks(pages_for, args.repeat, args.city)
+    if not report["sources"]:
+        print(f"No saved pages found in {scraper_archive.ARCHIVE_DIR if args.archive else args.corpus}")
+        sys.exit(1)
+
+    print_report(report)
+    if report["cache_entries"]:
+        entries = report["cache_entries"]
+        print(f"cache entries: {entries['json_bytes_per_entry']} bytes as JSON, {entries['record_bytes_per_entry']} as records ({entries['ratio']}x)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
@@ -9,8 +9,10 @@ This script scrapes grocery product data from:
 - Amazon Fresh
 - Flipkart Grocery
 
-It uses BeautifulSoup and Playwright for scraping and provides a Flask API endpoint
-to serve the scraped data with proper error handling and caching.
+It fetches server-rendered search pages over plain HTTP, falls back to
+Playwright for the rest, parses only the product cards with BeautifulSoup
+(lxml backend) and provides a Flask API endpoint to serve the scraped data
+with proper error handling and caching.
 
 Features:
 - Real-time data scraping from multiple sources
@@ -18,13 +20,16 @@ Features:
 - Offers and discounts tracking
 - Robust error handling and fallback mechanisms
 - Efficient caching to improve performance
+- Streaming endpoint that sends each source's results as soon as they are parsed
+- Batch endpoint that searches a list of queries with one browser session per site
+- Price per 100 g, 100 ml or piece on every product, with a sort by value
+- Matching of the same product across platforms into one listing per item
+- Write-through of scraped products into MongoDB when MONGO_URI is set
+- Price history of every scraped product, with min/avg/max over a window
 """
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
-import requests
 import json
 import time
 import re
@@ -35,6 +40,24 @@ from urllib.parse import quote
 import threading
 import concurrent.futures
 from datetime import datetime, timedelta
+from scraper_cache import get_cache, cache_key, get_fresh, set_fresh
+from scraper_http import batch_fetch_path, fetch_html, fetch_with_fallback, SOURCE_OK, SOURCE_EMPTY, SOURCE_ERROR, SOURCE_TIMED_OUT, SOURCE_REJECTED, SOURCE_SKIPPED
+from scraper_browser import browser_page, shared_page, goto, read_results
+from scraper_parsing import compile_cards, compile_fields, card_rows
+from scraper_stream import stream_response, STREAM_NDJSON
+from scraper_units import normalize_products, sort_by_value
+from scraper_matching import group_products
+from scraper_records import Product, as_records
+from scraper_archive import archive_scope
+from scraper_store import product_id, persist_products, load_stored_results, price_summary, PERSIST_ENABLED
+from scraper_singleflight import coalesce
+from scraper_prewarm import Prewarmer, refresh_in_background, PREWARM_MARGIN
+from scrape_jobs import scrape_jobs
+from scraper_stats import scraper_stats, track_scrape
+from scraper_selection import plan_sources, record_outcome
+from scraper_executor import scrape_executor, scraper_executor, ExecutorSaturated
+from scraper_service import scrape_remote, SCRAPER_SERVICE_URL
+from scraper_deadline import Deadline, DeadlineExceeded, deadline_scope, parse_deadline, pause, DEFAULT_DEADLINE, DEFAULT_SOURCE_BUDGET
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -43,13 +66,26 @@ logger = logging.getLogger('enhanced-grocery-scraper')
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
-
-# Cache for storing scraped data
+app.register_blueprint(scrape_jobs)
+app.register_blueprint(scraper_executor)
+app.register_blueprint(scraper_stats)
+
+# Cache for storing scraped data, shared by all workers (see scraper_cache).
+# Results are cached per source and query and served stale for a grace
+# period while they are refreshed in the background; sources that returned
+# nothing or failed get a short negative entry so they are retried soon.
 CACHE_EXPIRY = 3600  # 1 hour in seconds
-cache = {
-    "data": {},
-    "timestamp": {}
-}
+NEGATIVE_CACHE_TTL = 300  # 5 minutes
+# Fetch path of source results served from the scraped products database
+FETCH_PATH_STORE = 'store'
+# Most queries accepted by the batch endpoint
+BATCH_MAX_QUERIES = int(os.environ.get('SCRAPER_BATCH_MAX_QUERIES', 20))
+# Longest window of the price history endpoint, in days
+PRICE_HISTORY_MAX_DAYS = 365
+# Orders accepted by the sort parameter; results are in source order by default
+SORT_VALUE = 'value'
+SORT_OPTIONS = (SORT_VALUE,)
+cache = get_cache()
 
 # User agents for rotating
 USER_AGENTS = [
@@ -59,6 +95,12 @@ USER_AGENTS = [
     'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36'
 ]
 
+# Search pages that are server-rendered and can be fetched over plain HTTP
+BIGBASKET_SEARCH_URL = 'https://www.bigbasket.com/ps/?q={query}'
+JIOMART_SEARCH_URL = 'https://www.jiomart.com/search/{query}'
+AMAZON_FRESH_SEARCH_URL = 'https://www.amazon.in/s?k={query}&i=amazon-fresh'
+FLIPKART_GROCERY_SEARCH_URL = 'https://www.flipkart.com/search?q={query}&marketplace=GROCERY'
+
 def get_random_user_agent():
     """Return a random user agent from the list"""
     return random.choice(USER_AGENTS)
@@ -103,669 +145,819 @@ def extract_weight(text):
 
     return ""
 
-def scrape_blinkit(query):
-    """Scrape grocery products from Blinkit"""
-    logger.info(f"Scraping Blinkit for: {query}")
+def build_products(rows, build, name):
+    """Create product records from card fields, skipping cards that fail"""
     products = []
-
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(
-                user_agent=get_random_user_agent(),
-                viewport={'width': 1280, 'height': 800}
-            )
-
-            # Set location (Bangalore by default)
-            page.goto('https://blinkit.com')
-            time.sleep(2)
-
-            # Search for products
-            search_url = f'https://blinkit.com/s/?q={quote(query)}'
-            page.goto(search_url, timeout=60000)
-            time.sleep(3)
-
-            # Get page content
-            html = page.content()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find product cards
-            product_cards = soup.select('div[data-testid="product-card"]')
-            logger.info(f"Found {len(product_cards)} products on Blinkit")
-
-            for card in product_cards[:15]:  # Limit to 15 products
-                try:
-                    # Extract product details
-                    name_elem = card.select_one('div[class*="ProductName"]')
-                    name = name_elem.text.strip() if name_elem else "Unknown Product"
-
-                    # Extract image
-                    img_elem = card.select_one('img')
-                    image_url = img_elem['src'] if img_elem and 'src' in img_elem.attrs else ""
-
-                    # Extract price
-                    price_elem = card.select_one('div[class*="Price"]')
-                    price_text = price_elem.text.strip() if price_elem else "₹0"
-                    price = clean_price(price_text)
-
-                    # Extract original price if available
-                    original_price_elem = card.select_one('div[class*="OriginalPrice"]')
-                    original_price = clean_price(original_price_elem.text) if original_price_elem else price
-
-                    # Extract product link
-                    link_elem = card.select_one('a')
-                    product_link = f"https://blinkit.com{link_elem['href']}" if link_elem and 'href' in link_elem.attrs else ""
-
-                    # Extract weight
-                    weight_elem = card.select_one('div[class*="Weight"]')
-                    weight = weight_elem.text.strip() if weight_elem else extract_weight(name)
-
-                    # Extract offers
-                    offers = []
-                    offer_elem = card.select_one('div[class*="DiscountTag"]')
-                    if offer_elem:
-                        offers.append(offer_elem.text.strip())
-
-                    # Extract brand (from name)
-                    brand = name.split(' ')[0] if ' ' in name else ""
-
-                    # Extract category
-                    category = "Grocery"
-                    category_elem = card.select_one('div[class*="Category"]')
-                    if category_elem:
-                        category = category_elem.text.strip()
-
-                    # Create product object
-                    product = {
-                        "_id": f"blinkit_{int(time.time())}_{len(products)}",
-                        "name": name,
-                        "brand": brand,
-                        "category": category,
-                        "description": f"{name} {weight}".strip(),
-                        "price": price,
-                        "sale_price": price,
-                        "market_price": original_price,
-                        "image_url": image_url,
-                        "source": "Blinkit",
-                        "platform": "Blinkit",
-                        "redirect": product_link,
-                        "offers": offers,
-                        "in_stock": True,
-                        "weight": weight,
-                        "rating": random.uniform(3.5, 4.9)  # Random rating between 3.5 and 4.9
-                    }
-
-                    products.append(product)
-                except Exception as e:
-                    logger.error(f"Error extracting Blinkit product: {e}")
-
-            browser.close()
-    except Exception as e:
-        logger.error(f"Error scraping Blinkit: {e}")
+    for fields in rows:
+        try:
+            product = build(fields, len(products))
+            if product:
+                products.append(Product(**product))
+        except Exception as e:
+            logger.error(f"Error extracting {name} product: {e}")
 
     return products
 
-def scrape_bigbasket(query):
-    """Scrape grocery products from BigBasket"""
-    logger.info(f"Scraping BigBasket for: {query}")
-    products = []
+BLINKIT_CARDS = compile_cards('div[data-testid="product-card"]')
+BLINKIT_FIELDS = {
+    "name": ('div[class*="ProductName"]', 'text'),
+    "image_url": ('img', 'src'),
+    "price": ('div[class*="Price"]', 'text'),
+    "original_price": ('div[class*="OriginalPrice"]', 'text'),
+    "link": ('a', 'href'),
+    "weight": ('div[class*="Weight"]', 'text'),
+    "offer": ('div[class*="DiscountTag"]', 'text'),
+    "category": ('div[class*="Category"]', 'text')
+}
+BLINKIT_SELECTORS = compile_fields(BLINKIT_FIELDS)
+
+def warm_blinkit_browser(page):
+    """Open Blinkit in a fresh page before searching"""
+    # Set location (Bangalore by default)
+    goto(page, 'https://blinkit.com', 'homepage')
+    pause(2)
+
+def search_blinkit_browser(page, query):
+    """Search Blinkit in a warmed-up page and read the product cards"""
+    # Search for products
+    search_url = f'https://blinkit.com/s/?q={quote(query)}'
+    goto(page, search_url, 'search', 60000)
+    pause(3)
+
+    # Read the product cards
+    return read_results(page, BLINKIT_CARDS, BLINKIT_FIELDS, 15)
+
+def fetch_blinkit_browser(query):
+    """Load the Blinkit search results in a headless browser"""
+    with browser_page(get_random_user_agent()) as page:
+        warm_blinkit_browser(page)
+        return search_blinkit_browser(page, query)
+
+def build_blinkit_product(fields, index):
+    """Create a product object from the fields of a Blinkit card"""
+    name = fields["name"] or "Unknown Product"
+    price = clean_price(fields["price"] or "₹0")
+    original_price = clean_price(fields["original_price"]) if fields["original_price"] is not None else price
+    weight = fields["weight"] or extract_weight(name)
+
+    return {
+        "_id": product_id("blinkit", name, weight, fields["link"] or fields["image_url"]),
+        "name": name,
+        "brand": name.split(' ')[0] if ' ' in name else "",
+        "category": fields["category"] or "Grocery",
+        "description": f"{name} {weight}".strip(),
+        "price": price,
+        "sale_price": price,
+        "market_price": original_price,
+        "image_url": fields["image_url"] or "",
+        "source": "Blinkit",
+        "platform": "Blinkit",
+        "redirect": f"https://blinkit.com{fields['link']}" if fields["link"] else "",
+        "offers": [fields["offer"]] if fields["offer"] else [],
+        "in_stock": True,
+        "weight": weight,
+        "rating": random.uniform(3.5, 4.9)  # Random rating between 3.5 and 4.9
+    }
+
+def parse_blinkit(page_data):
+    """Extract products from a Blinkit search results page"""
+    rows = card_rows(page_data, BLINKIT_CARDS, BLINKIT_SELECTORS, 15)  # Limit to 15 products
+    logger.info(f"Found {len(rows)} products on Blinkit")
+    return build_products(rows, build_blinkit_product, "Blinkit")
 
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(
-                user_agent=get_random_user_agent(),
-                viewport={'width': 1280, 'height': 800}
-            )
-
-            # Go to BigBasket
-            page.goto('https://www.bigbasket.com/')
-            time.sleep(2)
-
-            # Search for products
-            search_url = f'https://www.bigbasket.com/ps/?q={quote(query)}'
-            page.goto(search_url, timeout=60000)
-            time.sleep(3)
-
-            # Get page content
-            html = page.content()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find product cards
-            product_cards = soup.select('div.prod-deck')
-            if not product_cards:
-                product_cards = soup.select('div.item-wrapper')  # Alternative selector
-
-            logger.info(f"Found {len(product_cards)} products on BigBasket")
-
-            for card in product_cards[:15]:  # Limit to 15 products
-                try:
-                    # Extract product details
-                    name_elem = card.select_one('div.prod-name, div.item-name')
-                    name = name_elem.text.strip() if name_elem else "Unknown Product"
-
-                    # Extract image
-                    img_elem = card.select_one('img')
-                    image_url = img_elem['src'] if img_elem and 'src' in img_elem.attrs else ""
-
-                    # Extract price
-                    price_elem = card.select_one('div.discnt-price, div.sp')
-                    price_text = price_elem.text.strip() if price_elem else "₹0"
-                    price = clean_price(price_text)
-
-                    # Extract original price if available
-                    original_price_elem = card.select_one('div.mrp, div.mrp-price')
-                    original_price = clean_price(original_price_elem.text) if original_price_elem else price
-
-                    # Extract product link
-                    link_elem = card.select_one('a')
-                    product_link = f"https://www.bigbasket.com{link_elem['href']}" if link_elem and 'href' in link_elem.attrs else ""
-
-                    # Extract weight
-                    weight_elem = card.select_one('div.qty, div.weight')
-                    weight = weight_elem.text.strip() if weight_elem else extract_weight(name)
-
-                    # Extract offers
-                    offers = []
-                    offer_elem = card.select_one('div.save-price, div.offer')
-                    if offer_elem:
-                        offers.append(offer_elem.text.strip())
-
-                    # Extract brand
-                    brand_elem = card.select_one('div.brand, div.brand-name')
-                    brand = brand_elem.text.strip() if brand_elem else name.split(' ')[0]
-
-                    # Extract category
-                    category = "Grocery"
-                    category_elem = card.select_one('div.category')
-                    if category_elem:
-                        category = category_elem.text.strip()
-
-                    # Create product object
-                    product = {
-                        "_id": f"bigbasket_{int(time.time())}_{len(products)}",
-                        "name": name,
-                        "brand": brand,
-                        "category": category,
-                        "description": f"{name} {weight}".strip(),
-                        "price": price,
-                        "sale_price": price,
-                        "market_price": original_price,
-                        "image_url": image_url,
-                        "source": "BigBasket",
-                        "platform": "BigBasket",
-                        "redirect": product_link,
-                        "offers": offers,
-                        "in_stock": True,
-                        "weight": weight,
-                        "rating": random.uniform(3.5, 4.9)  # Random rating between 3.5 and 4.9
-                    }
-
-                    products.append(product)
-                except Exception as e:
-                    logger.error(f"Error extracting BigBasket product: {e}")
-
-            browser.close()
-    except Exception as e:
-        logger.error(f"Error scraping BigBasket: {e}")
+def scrape_blinkit(query):
+    """Scrape grocery products from Blinkit"""
+    return scrape_source('blinkit', query)['products']
+
+BIGBASKET_CARDS = compile_cards('div.prod-deck', 'div.item-wrapper')
+BIGBASKET_FIELDS = {
+    "name": ('div.prod-name, div.item-name', 'text'),
+    "image_url": ('img', 'src'),
+    "price": ('div.discnt-price, div.sp', 'text'),
+    "original_price": ('div.mrp, div.mrp-price', 'text'),
+    "link": ('a', 'href'),
+    "weight": ('div.qty, div.weight', 'text'),
+    "offer": ('div.save-price, div.offer', 'text'),
+    "brand": ('div.brand, div.brand-name', 'text'),
+    "category": ('div.category', 'text')
+}
+BIGBASKET_SELECTORS = compile_fields(BIGBASKET_FIELDS)
+
+def fetch_bigbasket_http(query):
+    """Fetch the server-rendered BigBasket search results without a browser"""
+    return fetch_html(BIGBASKET_SEARCH_URL.format(query=quote(query)), get_random_user_agent())
+
+def warm_bigbasket_browser(page):
+    """Open BigBasket in a fresh page before searching"""
+    # Go to BigBasket
+    goto(page, 'https://www.bigbasket.com/', 'homepage')
+    pause(2)
+
+def search_bigbasket_browser(page, query):
+    """Search BigBasket in a warmed-up page and read the product cards"""
+    # Search for products
+    search_url = BIGBASKET_SEARCH_URL.format(query=quote(query))
+    goto(page, search_url, 'search', 60000)
+    pause(3)
+
+    # Read the product cards
+    return read_results(page, BIGBASKET_CARDS, BIGBASKET_FIELDS, 15)
+
+def fetch_bigbasket_browser(query):
+    """Load the BigBasket search results in a headless browser"""
+    with browser_page(get_random_user_agent()) as page:
+        warm_bigbasket_browser(page)
+        return search_bigbasket_browser(page, query)
+
+def build_bigbasket_product(fields, index):
+    """Create a product object from the fields of a BigBasket card"""
+    name = fields["name"] or "Unknown Product"
+    price = clean_price(fields["price"] or "₹0")
+    original_price = clean_price(fields["original_price"]) if fields["original_price"] is not None else price
+    weight = fields["weight"] or extract_weight(name)
+
+    return {
+        "_id": product_id("bigbasket", name, weight, fields["link"] or fields["image_url"]),
+        "name": name,
+        "brand": fields["brand"] or name.split(' ')[0],
+        "category": fields["category"] or "Grocery",
+        "description": f"{name} {weight}".strip(),
+        "price": price,
+        "sale_price": price,
+        "market_price": original_price,
+        "image_url": fields["image_url"] or "",
+        "source": "BigBasket",
+        "platform": "BigBasket",
+        "redirect": f"https://www.bigbasket.com{fields['link']}" if fields["link"] else "",
+        "offers": [fields["offer"]] if fields["offer"] else [],
+        "in_stock": True,
+        "weight": weight,
+        "rating": random.uniform(3.5, 4.9)  # Random rating between 3.5 and 4.9
+    }
+
+def parse_bigbasket(page_data):
+    """Extract products from a BigBasket search results page"""
+    rows = card_rows(page_data, BIGBASKET_CARDS, BIGBASKET_SELECTORS, 15)  # Limit to 15 products
+    logger.info(f"Found {len(rows)} products on BigBasket")
+    return build_products(rows, build_bigbasket_product, "BigBasket")
 
-    return products
+def scrape_bigbasket(query):
+    """Scrape grocery products from BigBasket"""
+    return scrape_source('bigbasket', query)['products']
+
+ZEPTO_CARDS = compile_cards('div.product-card', 'div[data-testid="product-card"]')
+ZEPTO_FIELDS = {
+    "name": ('p.product-title, div.product-name', 'text'),
+    "image_url": ('img', 'src'),
+    "price": ('p.product-price, div.discounted-price', 'text'),
+    "original_price": ('p.product-mrp, div.original-price', 'text'),
+    "link": ('a', 'href'),
+    "weight": ('p.product-weight, div.product-weight', 'text'),
+    "offer": ('div.offer-tag, div.discount-tag', 'text')
+}
+ZEPTO_SELECTORS = compile_fields(ZEPTO_FIELDS)
+
+def warm_zepto_browser(page):
+    """Open Zepto in a fresh page before searching"""
+    # Go to Zepto
+    goto(page, 'https://www.zeptonow.com/', 'homepage')
+    pause(2)
+
+def search_zepto_browser(page, query):
+    """Search Zepto in a warmed-up page and read the product cards"""
+    # Search for products
+    search_url = f'https://www.zeptonow.com/search?q={quote(query)}'
+    goto(page, search_url, 'search', 60000)
+    pause(3)
+
+    # Read the product cards
+    return read_results(page, ZEPTO_CARDS, ZEPTO_FIELDS, 15)
+
+def fetch_zepto_browser(query):
+    """Load the Zepto search results in a headless browser"""
+    with browser_page(get_random_user_agent()) as page:
+        warm_zepto_browser(page)
+        return search_zepto_browser(page, query)
+
+def build_zepto_product(fields, index):
+    """Create a product object from the fields of a Zepto card"""
+    name = fields["name"] or "Unknown Product"
+    price = clean_price(fields["price"] or "₹0")
+    original_price = clean_price(fields["original_price"]) if fields["original_price"] is not None else price
+    weight = fields["weight"] or extract_weight(name)
+
+    return {
+        "_id": product_id("zepto", name, weight, fields["link"] or fields["image_url"]),
+        "name": name,
+        "brand": name.split(' ')[0] if ' ' in name else "",
+        "category": "Grocery",
+        "description": f"{name} {weight}".strip(),
+        "price": price,
+        "sale_price": price,
+        "market_price": original_price,
+        "image_url": fields["image_url"] or "",
+        "source": "Zepto",
+        "platform": "Zepto",
+        "redirect": f"https://www.zeptonow.com{fields['link']}" if fields["link"] else "",
+        "offers": [fields["offer"]] if fields["offer"] else [],
+        "in_stock": True,
+        "weight": weight,
+        "rating": random.uniform(3.5, 4.9)  # Random rating between 3.5 and 4.9
+    }
+
+def parse_zepto(page_data):
+    """Extract products from a Zepto search results page"""
+    rows = card_rows(page_data, ZEPTO_CARDS, ZEPTO_SELECTORS, 15)  # Limit to 15 products
+    logger.info(f"Found {len(rows)} products on Zepto")
+    return build_products(rows, build_zepto_product, "Zepto")
 
 def scrape_zepto(query):
     """Scrape grocery products from Zepto"""
-    logger.info(f"Scraping Zepto for: {query}")
-    products = []
-
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(
-                user_agent=get_random_user_agent(),
-                viewport={'width': 1280, 'height': 800}
-            )
-
-            # Go to Zepto
-            page.goto('https://www.zeptonow.com/')
-            time.sleep(2)
-
-            # Search for products
-            search_url = f'https://www.zeptonow.com/search?q={quote(query)}'
-            page.goto(search_url, timeout=60000)
-            time.sleep(3)
-
-            # Get page content
-            html = page.content()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find product cards
-            product_cards = soup.select('div.product-card')
-            if not product_cards:
-                product_cards = soup.select('div[data-testid="product-card"]')  # Alternative selector
-
-            logger.info(f"Found {len(product_cards)} products on Zepto")
-
-            for card in product_cards[:15]:  # Limit to 15 products
-                try:
-                    # Extract product details
-                    name_elem = card.select_one('p.product-title, div.product-name')
-                    name = name_elem.text.strip() if name_elem else "Unknown Product"
-
-                    # Extract image
-                    img_elem = card.select_one('img')
-                    image_url = img_elem['src'] if img_elem and 'src' in img_elem.attrs else ""
-
-                    # Extract price
-                    price_elem = card.select_one('p.product-price, div.discounted-price')
-                    price_text = price_elem.text.strip() if price_elem else "₹0"
-                    price = clean_price(price_text)
-
-                    # Extract original price if available
-                    original_price_elem = card.select_one('p.product-mrp, div.original-price')
-                    original_price = clean_price(original_price_elem.text) if original_price_elem else price
-
-                    # Extract product link
-                    link_elem = card.select_one('a')
-                    product_link = f"https://www.zeptonow.com{link_elem['href']}" if link_elem and 'href' in link_elem.attrs else ""
-
-                    # Extract weight
-                    weight_elem = card.select_one('p.product-weight, div.product-weight')
-                    weight = weight_elem.text.strip() if weight_elem else extract_weight(name)
-
-                    # Extract offers
-                    offers = []
-                    offer_elem = card.select_one('div.offer-tag, div.discount-tag')
-                    if offer_elem:
-                        offers.append(offer_elem.text.strip())
-
-                    # Extract brand (from name)
-                    brand = name.split(' ')[0] if ' ' in name else ""
-
-                    # Extract category
-                    category = "Grocery"
-
-                    # Create product object
-                    product = {
-                        "_id": f"zepto_{int(time.time())}_{len(products)}",
-                        "name": name,
-                        "brand": brand,
-                        "category": category,
-                        "description": f"{name} {weight}".strip(),
-                        "price": price,
-                        "sale_price": price,
-                        "market_price": original_price,
-                        "image_url": image_url,
-                        "source": "Zepto",
-                        "platform": "Zepto",
-                        "redirect": product_link,
-                        "offers": offers,
-                        "in_stock": True,
-                        "weight": weight,
-                        "rating": random.uniform(3.5, 4.9)  # Random rating between 3.5 and 4.9
-                    }
-
-                    products.append(product)
-                except Exception as e:
-                    logger.error(f"Error extracting Zepto product: {e}")
-
-            browser.close()
-    except Exception as e:
-        logger.error(f"Error scraping Zepto: {e}")
-
-    return products
+    return scrape_source('zepto', query)['products']
+
+JIOMART_CARDS = compile_cards('div.product-item', 'div.jm-col-4')
+JIOMART_FIELDS = {
+    "name": ('div.product-name, span.clsgetname', 'text'),
+    "image_url": ('img', 'src'),
+    "price": ('span.final-price, span.jm-price', 'text'),
+    "original_price": ('span.line-through, span.jm-mrp', 'text'),
+    "link": ('a', 'href'),
+    "weight": ('span.weight, span.jm-weight', 'text'),
+    "offer": ('span.save-price, span.jm-discount', 'text')
+}
+JIOMART_SELECTORS = compile_fields(JIOMART_FIELDS)
+
+def fetch_jiomart_http(query):
+    """Fetch the server-rendered JioMart search results without a browser"""
+    return fetch_html(JIOMART_SEARCH_URL.format(query=quote(query)), get_random_user_agent())
+
+def warm_jiomart_browser(page):
+    """Open JioMart in a fresh page before searching"""
+    # Go to JioMart
+    goto(page, 'https://www.jiomart.com/', 'homepage')
+    pause(2)
+
+def search_jiomart_browser(page, query):
+    """Search JioMart in a warmed-up page and read the product cards"""
+    # Search for products
+    search_url = JIOMART_SEARCH_URL.format(query=quote(query))
+    goto(page, search_url, 'search', 60000)
+    pause(3)
+
+    # Read the product cards
+    return read_results(page, JIOMART_CARDS, JIOMART_FIELDS, 15)
+
+def fetch_jiomart_browser(query):
+    """Load the JioMart search results in a headless browser"""
+    with browser_page(get_random_user_agent()) as page:
+        warm_jiomart_browser(page)
+        return search_jiomart_browser(page, query)
+
+def build_jiomart_product(fields, index):
+    """Create a product object from the fields of a JioMart card"""
+    name = fields["name"] or "Unknown Product"
+    price = clean_price(fields["price"] or "₹0")
+    original_price = clean_price(fields["original_price"]) if fields["original_price"] is not None else price
+    weight = fields["weight"] or extract_weight(name)
+
+    return {
+        "_id": product_id("jiomart", name, weight, fields["link"] or fields["image_url"]),
+        "name": name,
+        "brand": name.split(' ')[0] if ' ' in name else "",
+        "category": "Grocery",
+        "description": f"{name} {weight}".strip(),
+        "price": price,
+        "sale_price": price,
+        "market_price": original_price,
+        "image_url": fields["image_url"] or "",
+        "source": "JioMart",
+        "platform": "JioMart",
+        "redirect": f"https://www.jiomart.com{fields['link']}" if fields["link"] else "",
+        "offers": [fields["offer"]] if fields["offer"] else [],
+        "in_stock": True,
+        "weight": weight,
+        "rating": random.uniform(3.5, 4.9)  # Random rating between 3.5 and 4.9
+    }
+
+def parse_jiomart(page_data):
+    """Extract products from a JioMart search results page"""
+    rows = card_rows(page_data, JIOMART_CARDS, JIOMART_SELECTORS, 15)  # Limit to 15 products
+    logger.info(f"Found {len(rows)} products on JioMart")
+    return build_products(rows, build_jiomart_product, "JioMart")
 
 def scrape_jiomart(query):
     """Scrape grocery products from JioMart"""
-    logger.info(f"Scraping JioMart for: {query}")
-    products = []
-
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(
-                user_agent=get_random_user_agent(),
-                viewport={'width': 1280, 'height': 800}
-            )
-
-            # Go to JioMart
-            page.goto('https://www.jiomart.com/')
-            time.sleep(2)
-
-            # Search for products
-            search_url = f'https://www.jiomart.com/search/{quote(query)}'
-            page.goto(search_url, timeout=60000)
-            time.sleep(3)
-
-            # Get page content
-            html = page.content()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find product cards
-            product_cards = soup.select('div.product-item')
-            if not product_cards:
-                product_cards = soup.select('div.jm-col-4')  # Alternative selector
-
-            logger.info(f"Found {len(product_cards)} products on JioMart")
-
-            for card in product_cards[:15]:  # Limit to 15 products
-                try:
-                    # Extract product details
-                    name_elem = card.select_one('div.product-name, span.clsgetname')
-                    name = name_elem.text.strip() if name_elem else "Unknown Product"
-
-                    # Extract image
-                    img_elem = card.select_one('img')
-                    image_url = img_elem['src'] if img_elem and 'src' in img_elem.attrs else ""
-
-                    # Extract price
-                    price_elem = card.select_one('span.final-price, span.jm-price')
-                    price_text = price_elem.text.strip() if price_elem else "₹0"
-                    price = clean_price(price_text)
-
-                    # Extract original price if available
-                    original_price_elem = card.select_one('span.line-through, span.jm-mrp')
-                    original_price = clean_price(original_price_elem.text) if original_price_elem else price
-
-                    # Extract product link
-                    link_elem = card.select_one('a')
-                    product_link = f"https://www.jiomart.com{link_elem['href']}" if link_elem and 'href' in link_elem.attrs else ""
-
-                    # Extract weight
-                    weight_elem = card.select_one('span.weight, span.jm-weight')
-                    weight = weight_elem.text.strip() if weight_elem else extract_weight(name)
-
-                    # Extract offers
-                    offers = []
-                    offer_elem = card.select_one('span.save-price, span.jm-discount')
-                    if offer_elem:
-                        offers.append(offer_elem.text.strip())
-
-                    # Extract brand (from name)
-                    brand = name.split(' ')[0] if ' ' in name else ""
-
-                    # Extract category
-                    category = "Grocery"
-
-                    # Create product object
-                    product = {
-                        "_id": f"jiomart_{int(time.time())}_{len(products)}",
-                        "name": name,
-                        "brand": brand,
-                        "category": category,
-                        "description": f"{name} {weight}".strip(),
-                        "price": price,
-                        "sale_price": price,
-                        "market_price": original_price,
-                        "image_url": image_url,
-                        "source": "JioMart",
-                        "platform": "JioMart",
-                        "redirect": product_link,
-                        "offers": offers,
-                        "in_stock": True,
-                        "weight": weight,
-                        "rating": random.uniform(3.5, 4.9)  # Random rating between 3.5 and 4.9
-                    }
-
-                    products.append(product)
-                except Exception as e:
-                    logger.error(f"Error extracting JioMart product: {e}")
-
-            browser.close()
-    except Exception as e:
-        logger.error(f"Error scraping JioMart: {e}")
+    return scrape_source('jiomart', query)['products']
+
+AMAZON_FRESH_CARDS = compile_cards('div[data-component-type="s-search-result"]')
+AMAZON_FRESH_FIELDS = {
+    "name": ('h2 a span', 'text'),
+    "image_url": ('img.s-image', 'src'),
+    "price_whole": ('span.a-price-whole', 'text'),
+    "price_fraction": ('span.a-price-fraction', 'text'),
+    "original_price": ('span.a-text-price span.a-offscreen', 'text'),
+    "link": ('h2 a', 'href'),
+    "offer": ('span.a-color-price', 'text'),
+    "rating": ('span.a-icon-alt', 'text')
+}
+AMAZON_FRESH_SELECTORS = compile_fields(AMAZON_FRESH_FIELDS)
+
+def fetch_amazon_fresh_http(query):
+    """Fetch the server-rendered Amazon Fresh search results without a browser"""
+    return fetch_html(AMAZON_FRESH_SEARCH_URL.format(query=quote(query)), get_random_user_agent())
+
+def warm_amazon_fresh_browser(page):
+    """Open Amazon Fresh in a fresh page before searching"""
+    # Go to Amazon Fresh
+    goto(page, 'https://www.amazon.in/alm/storefront?almBrandId=ctnow', 'homepage')
+    pause(2)
+
+def search_amazon_fresh_browser(page, query):
+    """Search Amazon Fresh in a warmed-up page and read the product cards"""
+    # Search for products
+    search_url = AMAZON_FRESH_SEARCH_URL.format(query=quote(query))
+    goto(page, search_url, 'search', 60000)
+    pause(3)
+
+    # Read the product cards
+    return read_results(page, AMAZON_FRESH_CARDS, AMAZON_FRESH_FIELDS, 15)
+
+def fetch_amazon_fresh_browser(query):
+    """Load the Amazon Fresh search results in a headless browser"""
+    with browser_page(get_random_user_agent()) as page:
+        warm_amazon_fresh_browser(page)
+        return search_amazon_fresh_browser(page, query)
+
+def build_amazon_fresh_product(fields, index):
+    """Create a product object from the fields of an Amazon Fresh card"""
+    if fields["price_whole"] is None:
+        raise ValueError("no price on card")
+
+    name = fields["name"] or "Unknown Product"
+    price_text = f"₹{fields['price_whole']}"
+    if fields["price_fraction"] is not None:
+        price_text += f".{fields['price_fraction']}"
+    price = clean_price(price_text)
+    original_price = clean_price(fields["original_price"]) if fields["original_price"] is not None else price
+    weight = extract_weight(name)
+
+    # Extract rating
+    rating = 0.0
+    if fields["rating"]:
+        rating_match = re.search(r'([\d.]+)', fields["rating"])
+        if rating_match:
+            rating = float(rating_match.group(1))
+
+    return {
+        "_id": product_id("amazon", name, weight, fields["link"] or fields["image_url"]),
+        "name": name,
+        "brand": name.split(' ')[0] if ' ' in name else "",
+        "category": "Grocery",
+        "description": f"{name} {weight}".strip(),
+        "price": price,
+        "sale_price": price,
+        "market_price": original_price,
+        "image_url": fields["image_url"] or "",
+        "source": "Amazon Fresh",
+        "platform": "Amazon",
+        "redirect": f"https://www.amazon.in{fields['link']}" if fields["link"] else "",
+        "offers": [fields["offer"]] if fields["offer"] else [],
+        "in_stock": True,
+        "weight": weight,
+        "rating": rating or random.uniform(3.5, 4.9),  # Use random rating if not available
+        "nutritional_info": {
+            "calories": random.randint(50, 400),
+            "protein": random.randint(1, 20),
+            "carbs": random.randint(5, 50),
+            "fat": random.randint(1, 20),
+            "fiber": random.randint(0, 10)
+        }
+    }
 
-    return products
+def parse_amazon_fresh(page_data):
+    """Extract products from an Amazon Fresh search results page"""
+    rows = card_rows(page_data, AMAZON_FRESH_CARDS, AMAZON_FRESH_SELECTORS, 15)  # Limit to 15 products
+    logger.info(f"Found {len(rows)} products on Amazon Fresh")
+    return build_products(rows, build_amazon_fresh_product, "Amazon Fresh")
 
 def scrape_amazon_fresh(query):
     """Scrape grocery products from Amazon Fresh"""
-    logger.info(f"Scraping Amazon Fresh for: {query}")
-    products = []
-
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(
-                user_agent=get_random_user_agent(),
-                viewport={'width': 1280, 'height': 800}
-            )
-
-            # Go to Amazon Fresh
-            page.goto('https://www.amazon.in/alm/storefront?almBrandId=ctnow')
-            time.sleep(2)
-
-            # Search for products
-            search_url = f'https://www.amazon.in/s?k={quote(query)}&i=amazon-fresh'
-            page.goto(search_url, timeout=60000)
-            time.sleep(3)
-
-            # Get page content
-            html = page.content()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find product cards
-            product_cards = soup.select('div[data-component-type="s-search-result"]')
-            logger.info(f"Found {len(product_cards)} products on Amazon Fresh")
-
-            for card in product_cards[:15]:  # Limit to 15 products
-                try:
-                    # Extract product details
-                    name_elem = card.select_one('h2 a span')
-                    name = name_elem.text.strip() if name_elem else "Unknown Product"
-
-                    # Extract image
-                    img_elem = card.select_one('img.s-image')
-                    image_url = img_elem['src'] if img_elem and 'src' in img_elem.attrs else ""
-
-                    # Extract price
-                    price_elem = card.select_one('span.a-price-whole')
-                    price_fraction = card.select_one('span.a-price-fraction')
-                    price_text = f"₹{price_elem.text.strip()}"
-                    if price_fraction:
-                        price_text += f".{price_fraction.text.strip()}"
-                    price = clean_price(price_text)
-
-                    # Extract original price if available
-                    original_price_elem = card.select_one('span.a-text-price span.a-offscreen')
-                    original_price = clean_price(original_price_elem.text) if original_price_elem else price
-
-                    # Extract product link
-                    link_elem = card.select_one('h2 a')
-                    product_link = f"https://www.amazon.in{link_elem['href']}" if link_elem and 'href' in link_elem.attrs else ""
-
-                    # Extract weight
-                    weight = extract_weight(name)
-
-                    # Extract offers
-                    offers = []
-                    offer_elem = card.select_one('span.a-color-price')
-                    if offer_elem:
-                        offers.append(offer_elem.text.strip())
-
-                    # Extract brand (from name)
-                    brand = name.split(' ')[0] if ' ' in name else ""
-
-                    # Extract category
-                    category = "Grocery"
-
-                    # Extract rating
-                    rating_elem = card.select_one('span.a-icon-alt')
-                    rating = 0.0
-                    if rating_elem:
-                        rating_text = rating_elem.text.strip()
-                        rating_match = re.search(r'([\d.]+)', rating_text)
-                        if rating_match:
-                            rating = float(rating_match.group(1))
-
-                    # Create product object
-                    product = {
-                        "_id": f"amazon_{int(time.time())}_{len(products)}",
-                        "name": name,
-                        "brand": brand,
-                        "category": category,
-                        "description": f"{name} {weight}".strip(),
-                        "price": price,
-                        "sale_price": price,
-                        "market_price": original_price,
-                        "image_url": image_url,
-                        "source": "Amazon Fresh",
-                        "platform": "Amazon",
-                        "redirect": product_link,
-                        "offers": offers,
-                        "in_stock": True,
-                        "weight": weight,
-                        "rating": rating or random.uniform(3.5, 4.9),  # Use random rating if not available
-                        "nutritional_info": {
-                            "calories": random.randint(50, 400),
-                            "protein": random.randint(1, 20),
-                            "carbs": random.randint(5, 50),
-                            "fat": random.randint(1, 20),
-                            "fiber": random.randint(0, 10)
-                        }
-                    }
-
-                    products.append(product)
-                except Exception as e:
-                    logger.error(f"Error extracting Amazon Fresh product: {e}")
-
-            browser.close()
-    except Exception as e:
-        logger.error(f"Error scraping Amazon Fresh: {e}")
+    return scrape_source('amazon_fresh', query)['products']
+
+FLIPKART_GROCERY_CARDS = compile_cards('div._1AtVbE')
+FLIPKART_GROCERY_FIELDS = {
+    "name": ('a.s1Q9rs, a.IRpwTa', 'text'),
+    "image_url": ('img._396cs4', 'src'),
+    "price": ('div._30jeq3', 'text'),
+    "original_price": ('div._3I9_wc', 'text'),
+    "link": ('a.s1Q9rs, a.IRpwTa', 'href'),
+    "offer": ('div._3Ay6Sb', 'text'),
+    "rating": ('div._3LWZlK', 'text')
+}
+FLIPKART_GROCERY_SELECTORS = compile_fields(FLIPKART_GROCERY_FIELDS)
+
+def fetch_flipkart_grocery_http(query):
+    """Fetch the server-rendered Flipkart Grocery search results without a browser"""
+    return fetch_html(FLIPKART_GROCERY_SEARCH_URL.format(query=quote(query)), get_random_user_agent())
+
+def warm_flipkart_grocery_browser(page):
+    """Open Flipkart Grocery in a fresh page before searching"""
+    # Go to Flipkart Grocery
+    goto(page, 'https://www.flipkart.com/grocery/pr?sid=73z', 'homepage')
+    pause(2)
+
+def search_flipkart_grocery_browser(page, query):
+    """Search Flipkart Grocery in a warmed-up page and read the product cards"""
+    # Search for products
+    search_url = FLIPKART_GROCERY_SEARCH_URL.format(query=quote(query))
+    goto(page, search_url, 'search', 60000)
+    pause(3)
+
+    # Read the product cards
+    return read_results(page, FLIPKART_GROCERY_CARDS, FLIPKART_GROCERY_FIELDS, 15)
+
+def fetch_flipkart_grocery_browser(query):
+    """Load the Flipkart Grocery search results in a headless browser"""
+    with browser_page(get_random_user_agent()) as page:
+        warm_flipkart_grocery_browser(page)
+        return search_flipkart_grocery_browser(page, query)
+
+def build_flipkart_grocery_product(fields, index):
+    """Create a product object from the fields of a Flipkart Grocery card"""
+    if fields["name"] is None:
+        return None  # Skip if no name element found
+
+    name = fields["name"]
+    price = clean_price(fields["price"] or "₹0")
+    original_price = clean_price(fields["original_price"]) if fields["original_price"] is not None else price
+    weight = extract_weight(name)
+
+    return {
+        "_id": product_id("flipkart", name, weight, fields["link"] or fields["image_url"]),
+        "name": name,
+        "brand": name.split(' ')[0] if ' ' in name else "",
+        "category": "Grocery",
+        "description": f"{name} {weight}".strip(),
+        "price": price,
+        "sale_price": price,
+        "market_price": original_price,
+        "image_url": fields["image_url"] or "",
+        "source": "Flipkart Grocery",
+        "platform": "Flipkart",
+        "redirect": f"https://www.flipkart.com{fields['link']}" if fields["link"] else "",
+        "offers": [fields["offer"]] if fields["offer"] else [],
+        "in_stock": True,
+        "weight": weight,
+        "rating": float(fields["rating"]) if fields["rating"] is not None else random.uniform(3.5, 4.9),
+        "nutritional_info": {
+            "calories": random.randint(50, 400),
+            "protein": random.randint(1, 20),
+            "carbs": random.randint(5, 50),
+            "fat": random.randint(1, 20),
+            "fiber": random.randint(0, 10)
+        }
+    }
 
-    return products
+def parse_flipkart_grocery(page_data):
+    """Extract products from a Flipkart Grocery search results page"""
+    rows = card_rows(page_data, FLIPKART_GROCERY_CARDS, FLIPKART_GROCERY_SELECTORS, 15)  # Limit to 15 products
+    logger.info(f"Found {len(rows)} products on Flipkart Grocery")
+    return build_products(rows, build_flipkart_grocery_product, "Flipkart Grocery")
 
 def scrape_flipkart_grocery(query):
     """Scrape grocery products from Flipkart Grocery"""
-    logger.info(f"Scraping Flipkart Grocery for: {query}")
-    products = []
+    return scrape_source('flipkart_grocery', query)['products']
+
+# Site adapters. 'http' fetches the server-rendered search page over the
+# pooled session; it is None for client-rendered sites that only show
+# product cards in a real browser. 'warm' and 'search' are the two halves
+# of 'browser', so a batch can warm up one page and run every query in it.
+# 'ttl' is how long the source's results
+# for a query stay cached and 'budget' is the most time, in seconds, a
+# scrape of the source may take within the request deadline.
+GROCERY_SOURCES = {
+    "blinkit": {"name": "Blinkit", "http": None, "browser": fetch_blinkit_browser, "warm": warm_blinkit_browser, "search": search_blinkit_browser, "parse": parse_blinkit, "ttl": 1800, "budget": DEFAULT_SOURCE_BUDGET},
+    "bigbasket": {"name": "BigBasket", "http": fetch_bigbasket_http, "browser": fetch_bigbasket_browser, "warm": warm_bigbasket_browser, "search": search_bigbasket_browser, "parse": parse_bigbasket, "ttl": CACHE_EXPIRY, "budget": DEFAULT_SOURCE_BUDGET},
+    "zepto": {"name": "Zepto", "http": None, "browser": fetch_zepto_browser, "warm": warm_zepto_browser, "search": search_zepto_browser, "parse": parse_zepto, "ttl": 1800, "budget": DEFAULT_SOURCE_BUDGET},
+    "jiomart": {"name": "JioMart", "http": fetch_jiomart_http, "browser": fetch_jiomart_browser, "warm": warm_jiomart_browser, "search": search_jiomart_browser, "parse": parse_jiomart, "ttl": CACHE_EXPIRY, "budget": DEFAULT_SOURCE_BUDGET},
+    "amazon_fresh": {"name": "Amazon Fresh", "http": fetch_amazon_fresh_http, "browser": fetch_amazon_fresh_browser, "warm": warm_amazon_fresh_browser, "search": search_amazon_fresh_browser, "parse": parse_amazon_fresh, "ttl": CACHE_EXPIRY, "budget": DEFAULT_SOURCE_BUDGET},
+    "flipkart_grocery": {"name": "Flipkart Grocery", "http": fetch_flipkart_grocery_http, "browser": fetch_flipkart_grocery_browser, "warm": warm_flipkart_grocery_browser, "search": search_flipkart_grocery_browser, "parse": parse_flipkart_grocery, "ttl": CACHE_EXPIRY, "budget": DEFAULT_SOURCE_BUDGET}
+}
 
+def scrape_source(key, query, deadline=None):
+    """Scrape one source, on the scraper service when one is configured"""
+    if SCRAPER_SERVICE_URL:
+        return scrape_remote("grocery", key, {"query": query}, deadline)
+    return scrape_source_local(key, query, deadline)
+
+def scrape_source_local(key, query, deadline=None):
+    """Scrape one source, trying its HTTP path before launching a browser
+
+    The scrape stops at the source's budget or the request deadline,
+    whichever comes first.
+    """
+    site = GROCERY_SOURCES[key]
+    logger.info(f"Scraping {site['name']} for: {query}")
+
+    budget = deadline.child(site["budget"]) if deadline else Deadline(site["budget"])
+    http_fetch = (lambda: site["http"](query)) if site["http"] else None
+    with track_scrape("grocery", key) as stats:
+        try:
+            with deadline_scope(budget), archive_scope("grocery", key, {"query": query}):
+                products, fetch_path = fetch_with_fallback(
+                    site["name"], http_fetch, lambda: site["browser"](query), site["parse"]
+                )
+            status = SOURCE_OK if products else SOURCE_EMPTY
+        except Exception as e:
+            products, fetch_path = [], None
+            if isinstance(e, DeadlineExceeded) or budget.expired():
+                logger.warning(f"Timed out scraping {site['name']}")
+                status = SOURCE_TIMED_OUT
+            else:
+                logger.error(f"Error scraping {site['name']}: {e}")
+                status = SOURCE_ERROR
+        stats.update(status=status, cards=len(products), fetch_path=fetch_path)
+
+    return {"source": key, "products": products, "fetch_path": fetch_path, "status": status}
+
+def scrape_source_batch(key, queries, deadline=None):
+    """Scrape one source for several queries, keyed by query
+
+    The scraper service takes one query per call, so there the queries are
+    scraped one after the other.
+    """
+    if SCRAPER_SERVICE_URL:
+        return {query: scrape_remote("grocery", key, {"query": query}, deadline) for query in queries}
+    return scrape_source_batch_local(key, queries, deadline)
+
+def scrape_source_batch_local(key, queries, deadline=None):
+    """Scrape one source for several queries in one browser session
+
+    Each query tries the HTTP path first; the ones that need a browser share
+    a page that is launched and warmed up once. The source gets its budget
+    once per query, within the request deadline, and the batch is recorded
+    as a single scrape in the stats.
+    """
+    site = GROCERY_SOURCES[key]
+    logger.info(f"Scraping {site['name']} for {len(queries)} queries")
+
+    seconds = site["budget"] * len(queries)
+    budget = deadline.child(seconds) if deadline else Deadline(seconds)
+    results = {}
+    with track_scrape("grocery", key) as stats, deadline_scope(budget):
+        try:
+            with shared_page(get_random_user_agent(), site["warm"]) as page:
+                for query in queries:
+                    http_fetch = (lambda query=query: site["http"](query)) if site["http"] else None
+                    try:
+                        with archive_scope("grocery", key, {"query": query}):
+                            products, fetch_path = fetch_with_fallback(
+                                site["name"], http_fetch, lambda query=query: site["search"](page(), query), site["parse"]
+                            )
+                        status = SOURCE_OK if products else SOURCE_EMPTY
+                    except Exception as e:
+                        products, fetch_path = [], None
+                        if isinstance(e, DeadlineExceeded) or budget.expired():
+                            logger.warning(f"Timed out scraping {site['name']} for: {query}")
+                            status = SOURCE_TIMED_OUT
+                        else:
+                            logger.error(f"Error scraping {site['name']} for {query}: {e}")
+                            status = SOURCE_ERROR
+                    results[query] = {"source": key, "products": products, "fetch_path": fetch_path, "status": status}
+        except Exception as e:
+            # Closing the browser failed; the results read so far still stand
+            logger.error(f"Error closing the {site['name']} browser: {e}")
+
+        statuses = {result["status"] for result in results.values()}
+        stats.update(
+            status=next((status for status in (SOURCE_OK, SOURCE_TIMED_OUT, SOURCE_ERROR) if status in statuses), SOURCE_EMPTY),
+            cards=sum(len(result["products"]) for result in results.values()),
+            fetch_path=batch_fetch_path(result["fetch_path"] for result in results.values())
+        )
+
+    for query in queries:
+        results.setdefault(query, unscraped_result(key, SOURCE_TIMED_OUT if budget.expired() else SOURCE_ERROR))
+    return results
+
+def unscraped_result(key, status=SOURCE_TIMED_OUT):
+    """Result for a source that timed out or was never scraped"""
+    return {"source": key, "products": [], "fetch_path": None, "status": status}
+
+def source_cache_key(key, query):
+    """Cache key for one source's results for a query"""
+    return cache_key("grocery", key, query)
+
+def record_and_cache_source(key, query, result, seconds, deadline):
+    """Fold a source's result into its health and cache it, unless it timed out"""
+    # A source is only blamed for timeouts within its own budget
+    if result["status"] != SOURCE_TIMED_OUT or not (deadline and deadline.expired()):
+        record_outcome("grocery", key, result["status"], seconds)
+    if result["status"] != SOURCE_TIMED_OUT:
+        if result["status"] == SOURCE_OK:
+            set_fresh(cache, source_cache_key(key, query), result, GROCERY_SOURCES[key]["ttl"])
+            persist_products(key, query, result["products"])
+        else:
+            set_fresh(cache, source_cache_key(key, query), result, NEGATIVE_CACHE_TTL, grace=0)
+
+def scrape_and_cache_source(key, query, deadline):
+    """Scrape one source and cache its result, unless it timed out"""
+    started = time.monotonic()
+    result = scrape_source(key, query, deadline)
+    record_and_cache_source(key, query, result, time.monotonic() - started, deadline)
+    return result
+
+def load_source(key, query, deadline, min_fresh=0):
+    """Scrape one source, sharing the scrape with concurrent identical requests
+
+    The scrape is skipped if another caller cached a result that stays fresh
+    for more than min_fresh seconds in the meantime.
+    """
+    try:
+        return coalesce(
+            source_cache_key(key, query),
+            lambda: scrape_and_cache_source(key, query, deadline),
+            deadline,
+            min_fresh
+        )
+    except DeadlineExceeded:
+        return unscraped_result(key)
+
+def scrape_and_cache_batch(key, queries, deadline):
+    """Scrape one source for several queries and cache each result"""
+    started = time.monotonic()
+    results = scrape_source_batch(key, queries, deadline)
+    seconds = (time.monotonic() - started) / len(queries)
+    for query, result in results.items():
+        record_and_cache_source(key, query, result, seconds, deadline)
+    return results
+
+def load_stored_sources(keys, query):
+    """Results of the sources stored in the database for a query within their TTL
+
+    They are cached for what is left of the TTL, like a fresh scrape.
+    """
+    stored = load_stored_results({key: GROCERY_SOURCES[key]["ttl"] for key in keys}, query)
+    results = {}
+    for key, (products, age) in stored.items():
+        result = {"source": key, "products": as_records(products, Product), "fetch_path": FETCH_PATH_STORE, "status": SOURCE_OK}
+        # Cached for the rest of the TTL so the next miss skips the database
+        remaining = GROCERY_SOURCES[key]["ttl"] - age
+        if remaining > 0:
+            set_fresh(cache, source_cache_key(key, query), result, remaining)
+        results[key] = result
+    return results
+
+def revalidate_source(key, query):
+    """Re-scrape one source in the background, unless adaptive selection skips it
+
+    Entries that go stale within PREWARM_MARGIN are re-scraped even though
+    they are still fresh.
+    """
+    run, skipped = plan_sources("grocery", [key])
+    if skipped:
+        return
+    refresh_in_background(
+        source_cache_key(key, query),
+        lambda: load_source(key, query, Deadline(DEFAULT_DEADLINE), PREWARM_MARGIN)
+    )
+
+def warm_query(query):
+    """Refresh the sources of a popular query that are missing or about to go stale
+
+    Sources with a negative entry (empty or failed) are left alone until it
+    expires.
+    """
+    expiring = time.time() + PREWARM_MARGIN
+    for key in GROCERY_SOURCES:
+        cached, fresh_until = get_fresh(cache, source_cache_key(key, query))
+        if cached is not None and cached["status"] != SOURCE_OK:
+            continue
+        if fresh_until <= expiring:
+            revalidate_source(key, query)
+
+prewarmer = Prewarmer("grocery", warm_query)
+
+def source_report(result, cached):
+    """Summarize one source's result for the API responses"""
+    return {
+        "fetch_path": result["fetch_path"],
+        "status": result["status"],
+        "count": len(result["products"]),
+        "cached": cached,
+        "timed_out": result["status"] == SOURCE_TIMED_OUT
+    }
+
+def iter_source_results(query, deadline=None):
+    """Yield (result, cached) for every source as soon as it is available
+
+    Each source's results are cached on their own, so cached sources are
+    yielded first and only the sources that are missing from the cache are
+    scraped, in parallel, yielding each as it completes. Stale sources are
+    yielded as cached and refreshed in the background. Concurrent requests
+    for the same source and query share one scrape.
+    Sources still running at the deadline are yielded as timed out and left
+    to stop at their next wait, sources turned away by a full scrape queue
+    as rejected, and sources left out by adaptive selection (see
+    scraper_selection) as skipped; none of these is cached.
+    """
+    deadline = deadline or Deadline(DEFAULT_DEADLINE)
+    pending = []
+    for key in GROCERY_SOURCES:
+        cached, fresh_until = get_fresh(cache, source_cache_key(key, query))
+        if cached is None:
+            pending.append(key)
+            continue
+        if fresh_until <= time.time():
+            revalidate_source(key, query)
+        yield cached, True
+
+    # Sources whose products were stored recently do not need a scrape
+    for key, result in load_stored_sources(pending, query).items():
+        pending.remove(key)
+        yield result, True
+
+    if not pending:
+        return
+
+    # Skip sources that keep failing, and submit the most useful ones first
+    pending, skipped = plan_sources("grocery", pending)
+    for key in skipped:
+        logger.info(f"Skipping {GROCERY_SOURCES[key]['name']}, it has been failing or finding nothing")
+        yield unscraped_result(key, SOURCE_SKIPPED), False
+
+    # Run the scrapers in parallel on the shared executor
+    futures = {}
+    for key in pending:
+        try:
+            futures[scrape_executor.submit(load_source, key, query, deadline)] = key
+        except ExecutorSaturated:
+            logger.warning(f"Scrape queue is full, skipping {GROCERY_SOURCES[key]['name']}")
+            yield unscraped_result(key, SOURCE_REJECTED), False
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(
-                user_agent=get_random_user_agent(),
-                viewport={'width': 1280, 'height': 800}
-            )
-
-            # Go to Flipkart Grocery
-            page.goto('https://www.flipkart.com/grocery/pr?sid=73z')
-            time.sleep(2)
-
-            # Search for products
-            search_url = f'https://www.flipkart.com/search?q={quote(query)}&marketplace=GROCERY'
-            page.goto(search_url, timeout=60000)
-            time.sleep(3)
-
-            # Get page content
-            html = page.content()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find product cards
-            product_cards = soup.select('div._1AtVbE')
-            logger.info(f"Found {len(product_cards)} products on Flipkart Grocery")
-
-            for card in product_cards[:15]:  # Limit to 15 products
-                try:
-                    # Extract product details
-                    name_elem = card.select_one('a.s1Q9rs, a.IRpwTa')
-                    if not name_elem:
-                        continue  # Skip if no name element found
-                    name = name_elem.text.strip()
-
-                    # Extract image
-                    img_elem = card.select_one('img._396cs4')
-                    image_url = img_elem['src'] if img_elem and 'src' in img_elem.attrs else ""
-
-                    # Extract price
-                    price_elem = card.select_one('div._30jeq3')
-                    price_text = price_elem.text.strip() if price_elem else "₹0"
-                    price = clean_price(price_text)
-
-                    # Extract original price if available
-                    original_price_elem = card.select_one('div._3I9_wc')
-                    original_price = clean_price(original_price_elem.text) if original_price_elem else price
-
-                    # Extract product link
-                    link_elem = card.select_one('a.s1Q9rs, a.IRpwTa')
-                    product_link = f"https://www.flipkart.com{link_elem['href']}" if link_elem and 'href' in link_elem.attrs else ""
-
-                    # Extract weight
-                    weight = extract_weight(name)
-
-                    # Extract offers
-                    offers = []
-                    offer_elem = card.select_one('div._3Ay6Sb')
-                    if offer_elem:
-                        offers.append(offer_elem.text.strip())
-
-                    # Extract brand (from name)
-                    brand = name.split(' ')[0] if ' ' in name else ""
-
-                    # Extract category
-                    category = "Grocery"
-
-                    # Extract rating
-                    rating_elem = card.select_one('div._3LWZlK')
-                    rating = float(rating_elem.text.strip()) if rating_elem else random.uniform(3.5, 4.9)
-
-                    # Create product object
-                    product = {
-                        "_id": f"flipkart_{int(time.time())}_{len(products)}",
-                        "name": name,
-                        "brand": brand,
-                        "category": category,
-                        "description": f"{name} {weight}".strip(),
-                        "price": price,
-                        "sale_price": price,
-                        "market_price": original_price,
-                        "image_url": image_url,
-                        "source": "Flipkart Grocery",
-                        "platform": "Flipkart",
-                        "redirect": product_link,
-                        "offers": offers,
-                        "in_stock": True,
-                        "weight": weight,
-                        "rating": rating,
-                        "nutritional_info": {
-                            "calories": random.randint(50, 400),
-                            "protein": random.randint(1, 20),
-                            "carbs": random.randint(5, 50),
-                            "fat": random.randint(1, 20),
-                            "fiber": random.randint(0, 10)
-                        }
-                    }
-
-                    products.append(product)
-                except Exception as e:
-                    logger.error(f"Error extracting Flipkart Grocery product: {e}")
-
-            browser.close()
-    except Exception as e:
-        logger.error(f"Error scraping Flipkart Grocery: {e}")
-
-    return products
-
-def scrape_all_sources(query):
-    """Scrape products from all sources in parallel"""
-    all_products = []
-
-    # Use ThreadPoolExecutor to run scrapers in parallel
-    with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-        # Submit scraping tasks
-        blinkit_future = executor.submit(scrape_blinkit, query)
-        bigbasket_future = executor.submit(scrape_bigbasket, query)
-        zepto_future = executor.submit(scrape_zepto, query)
-        jiomart_future = executor.submit(scrape_jiomart, query)
-        amazon_future = executor.submit(scrape_amazon_fresh, query)
-        flipkart_future = executor.submit(scrape_flipkart_grocery, query)
-
         # Get results as they complete
-        for future in concurrent.futures.as_completed([blinkit_future, bigbasket_future, zepto_future, jiomart_future, amazon_future, flipkart_future]):
+        for future in concurrent.futures.as_completed(futures, timeout=deadline.remaining()):
+            futures.pop(future)
             try:
-                products = future.result()
-                all_products.extend(products)
+                result = future.result()
             except Exception as e:
                 logger.error(f"Error in scraper thread: {e}")
+                continue
+            yield result, False
+    except concurrent.futures.TimeoutError:
+        logger.warning(f"Deadline reached for '{query}', returning partial results")
+        for key in futures.values():
+            yield unscraped_result(key), False
+    finally:
+        # Drop scrapes still queued; running ones stop at their next wait
+        for future in futures:
+            future.cancel()
+
+def scrape_all_sources(query, deadline=None):
+    """Scrape products from all sources in parallel
+
+    Returns the merged products and a per-source report of the fetch path
+    that served each source, its status, result count and whether it was
+    served from cache.
+    """
+    return merge_source_results(iter_source_results(query, deadline))
+
+def merge_source_results(source_results):
+    """Merge (result, cached) pairs into the products and the per-source report"""
+    all_products = []
+    sources = {}
+
+    for result, cached in source_results:
+        all_products.extend(result["products"])
+        sources[result["source"]] = source_report(result, cached)
+
+    return all_products, sources
+
+def stream_grocery_events(query, deadline=None):
+    """Yield a 'source' event per source as it completes, then a 'summary'"""
+    count = 0
+    sources = {}
+
+    for result, cached in iter_source_results(query, deadline):
+        count += len(result["products"])
+        sources[result["source"]] = source_report(result, cached)
+        yield {"event": "source", "source": result["source"], "results": normalize_products(result["products"]), **sources[result["source"]]}
+
+    # If no results from scraping, use hardcoded data
+    fallback = count == 0
+    if fallback:
+        logger.warning(f"No results from scraping, using hardcoded data for '{query}'")
+        products = get_hardcoded_products(query)
+        count = len(products)
+        yield {"event": "source", "source": "fallback", "results": normalize_products(products), "count": count}
 
-    return all_products
+    yield {
+        "event": "summary",
+        "count": count,
+        "query": query,
+        "sources": sources,
+        "source": "cache" if all(info["cached"] for info in sources.values()) else "scraping",
+        "fallback": fallback
+    }
 
 def get_hardcoded_products(query):
     """Get hardcoded product data for fallback"""
@@ -846,38 +1038,203 @@ def get_hardcoded_products(query):
 
     return products
 
-@app.route('/api/grocery/scrape', methods=['GET'])
-def scrape_grocery():
-    """API endpoint to scrape grocery products"""
-    query = request.args.get('q', '')
+def search_grocery(query, deadline=None, sort=None, group=False):
+    """Scrape grocery products for a query and build the API response"""
+    prewarmer.track(query)
 
-    if not query:
-        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    # Scrape the sources that are not cached
+    products, sources = scrape_all_sources(query, deadline)
+    return grocery_response(query, products, sources, sort, group)
 
-    # Check cache
-    cache_key = f"grocery_{query}"
-    if cache_key in cache["data"] and time.time() - cache["timestamp"].get(cache_key, 0) < CACHE_EXPIRY:
-        logger.info(f"Returning cached results for '{query}'")
-        return jsonify({"results": cache["data"][cache_key], "source": "cache"})
+def grocery_response(query, products, sources, sort=None, group=False):
+    """Build the API response for a query, falling back to hardcoded data
 
-    # Scrape products
-    products = scrape_all_sources(query)
+    Every product gets its price per unit (see scraper_units), which also
+    turns the product records into plain dicts for the JSON; sort=value
+    orders them cheapest per unit first. With group, the response also
+    lists the products matched across platforms (see scraper_matching).
+    """
+    from_cache = all(info["cached"] for info in sources.values())
+    if from_cache:
+        logger.info(f"Returning cached results for '{query}'")
 
     # If no results from scraping, use hardcoded data
     if not products:
         logger.warning(f"No results from scraping, using hardcoded data for '{query}'")
         products = get_hardcoded_products(query)
 
-    # Update cache
-    cache["data"][cache_key] = products
-    cache["timestamp"][cache_key] = time.time()
+    products = normalize_products(products)
+    if sort == SORT_VALUE:
+        products = sort_by_value(products)
 
-    return jsonify({
+    response = {
         "results": products,
         "count": len(products),
         "query": query,
-        "source": "scraping"
-    })
+        "sources": sources,
+        "source": "cache" if from_cache else "scraping"
+    }
+    if group:
+        response["listings"] = group_products(products)
+    return response
+
+def search_grocery_batch(queries, deadline=None, sort=None, group=False):
+    """Scrape grocery products for several queries, keyed by query
+
+    Like iter_source_results, cached sources are served from the cache and
+    stale ones refreshed in the background, but each source that is missing
+    any of the queries is scraped once for all of them on the shared
+    executor, so it warms up one browser session for the whole batch.
+    Batch scrapes are not shared with concurrent requests.
+    """
+    deadline = deadline or Deadline(DEFAULT_DEADLINE)
+    found = {query: {} for query in queries}
+    missing = {}
+    for query in queries:
+        prewarmer.track(query)
+        for key in GROCERY_SOURCES:
+            cached, fresh_until = get_fresh(cache, source_cache_key(key, query))
+            if cached is None:
+                missing.setdefault(key, []).append(query)
+                continue
+            if fresh_until <= time.time():
+                revalidate_source(key, query)
+            found[query][key] = (cached, True)
+
+    for query in queries:
+        keys = [key for key, missing_queries in missing.items() if query in missing_queries]
+        for key, result in load_stored_sources(keys, query).items():
+            missing[key].remove(query)
+            found[query][key] = (result, True)
+    missing = {key: missing_queries for key, missing_queries in missing.items() if missing_queries}
+
+    # Skip sources that keep failing, and submit the most useful ones first
+    pending, skipped = plan_sources("grocery", list(missing))
+    for key in skipped:
+        logger.info(f"Skipping {GROCERY_SOURCES[key]['name']}, it has been failing or finding nothing")
+        for query in missing[key]:
+            found[query][key] = (unscraped_result(key, SOURCE_SKIPPED), False)
+
+    futures = {}
+    for key in pending:
+        try:
+            futures[scrape_executor.submit(scrape_and_cache_batch, key, missing[key], deadline)] = key
+        except ExecutorSaturated:
+            logger.warning(f"Scrape queue is full, skipping {GROCERY_SOURCES[key]['name']}")
+            for query in missing[key]:
+                found[query][key] = (unscraped_result(key, SOURCE_REJECTED), False)
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=deadline.remaining()):
+            key = futures.pop(future)
+            try:
+                results = future.result()
+            except Exception as e:
+                logger.error(f"Error in scraper thread: {e}")
+                results = {query: unscraped_result(key, SOURCE_ERROR) for query in missing[key]}
+            for query, result in results.items():
+                found[query][key] = (result, False)
+    except concurrent.futures.TimeoutError:
+        logger.warning(f"Deadline reached for a batch of {len(queries)} queries, returning partial results")
+        for key in futures.values():
+            for query in missing[key]:
+                found[query][key] = (unscraped_result(key), False)
+    finally:
+        # Drop scrapes still queued; running ones stop at their next wait
+        for future in futures:
+            future.cancel()
+
+    return {query: grocery_response(query, *merge_source_results(found[query].values()), sort, group) for query in queries}
+
+def run_scrape_job(params):
+    """Run a grocery scrape job (see scrape_jobs)"""
+    return search_grocery(
+        params["q"], Deadline(parse_deadline(params.get("deadline"))), params.get("sort"), bool(params.get("group"))
+    )
+
+@app.route('/api/grocery/scrape', methods=['GET'])
+def scrape_grocery():
+    """API endpoint to scrape grocery products
+
+    sort=value orders the products by price per unit, cheapest first and
+    group=true adds the products matched across platforms as listings.
+    """
+    query = request.args.get('q', '')
+    sort = request.args.get('sort')
+
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    if sort and sort not in SORT_OPTIONS:
+        return jsonify({"error": f"Sort must be one of: {', '.join(SORT_OPTIONS)}"}), 400
+
+    deadline = Deadline(parse_deadline(request.args.get('deadline')))
+    group = request.args.get('group', '').lower() in ('1', 'true', 'yes')
+    return jsonify(search_grocery(query, deadline, sort, group))
+
+@app.route('/api/grocery/scrape/stream', methods=['GET'])
+def stream_grocery():
+    """API endpoint that streams grocery products as each source completes
+
+    Emits NDJSON by default, or Server-Sent Events with format=sse.
+    """
+    query = request.args.get('q', '')
+
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+
+    deadline = Deadline(parse_deadline(request.args.get('deadline')))
+    prewarmer.track(query)
+    return stream_response(stream_grocery_events(query, deadline), request.args.get('format', STREAM_NDJSON))
+
+@app.route('/api/grocery/scrape/batch', methods=['POST'])
+def scrape_grocery_batch():
+    """API endpoint to scrape grocery products for a list of queries
+
+    Takes {"queries": [...]} and returns the results keyed by query. The
+    deadline defaults to the single query deadline per query, capped at the
+    maximum deadline.
+    """
+    body = request.get_json(silent=True) or {}
+    queries = body.get('queries')
+
+    if not isinstance(queries, list) or not queries or not all(isinstance(query, str) and query.strip() for query in queries):
+        return jsonify({"error": "Body must have a non-empty 'queries' list of strings"}), 400
+    # Repeated queries are scraped once
+    queries = list(dict.fromkeys(query.strip() for query in queries))
+    if len(queries) > BATCH_MAX_QUERIES:
+        return jsonify({"error": f"At most {BATCH_MAX_QUERIES} queries per batch"}), 400
+    sort = body.get('sort')
+    if sort and sort not in SORT_OPTIONS:
+        return jsonify({"error": f"Sort must be one of: {', '.join(SORT_OPTIONS)}"}), 400
+
+    deadline = Deadline(parse_deadline(body.get('deadline', DEFAULT_DEADLINE * len(queries))))
+    return jsonify({"results": search_grocery_batch(queries, deadline, sort, bool(body.get('group'))), "count": len(queries)})
+
+@app.route('/api/grocery/price-history', methods=['GET'])
+def grocery_price_history():
+    """API endpoint for the min, average and max price of products over a window
+
+    Takes product_id (comma-separated for several) and days (default 30).
+    """
+    product_ids = [product_id.strip() for product_id in request.args.get('product_id', '').split(',') if product_id.strip()]
+
+    if not product_ids:
+        return jsonify({"error": "Query parameter 'product_id' is required"}), 400
+    try:
+        days = int(request.args.get('days', 30))
+    except ValueError:
+        return jsonify({"error": "Query parameter 'days' must be a number"}), 400
+    if not 1 <= days <= PRICE_HISTORY_MAX_DAYS:
+        return jsonify({"error": f"Query parameter 'days' must be between 1 and {PRICE_HISTORY_MAX_DAYS}"}), 400
+    if not PERSIST_ENABLED:
+        return jsonify({"error": "Price history is not enabled; set MONGO_URI"}), 503
+
+    try:
+        summaries = price_summary(product_ids, days)
+    except Exception as e:
+        logger.error(f"Error loading price history: {e}")
+        return jsonify({"error": "Price history is unavailable"}), 503
+
+    return jsonify({"days": days, "products": [summaries[product_id] for product_id in product_ids if product_id in summaries]})
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=True)
@@ -7,7 +7,8 @@ This script scrapes restaurant data from:
 - EatSure
 - Uber Eats
 
-It uses BeautifulSoup and Playwright for scraping and provides a Flask API endpoint
+It uses Playwright for scraping, parses only the restaurant cards with
+BeautifulSoup (lxml backend) and provides a Flask API endpoint
 to serve the scraped data with detailed restaurant information, menu items, and offers.
 
 Features:
@@ -18,23 +19,39 @@ Features:
 - Location-based search with distance calculation
 - Robust error handling and fallback mechanisms
 - Efficient caching to improve performance
+- Streaming endpoint that sends each source's results as soon as they are parsed
+- Batch endpoint that searches a list of foods with one browser session per site and city
+- Real restaurant menus, scraped in the background and attached once cached (see scraper_menus)
 """
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
-import requests
 import json
 import time
-import re
 import os
 import logging
 import random
 from urllib.parse import quote
 import threading
 import concurrent.futures
+from functools import partial
 from datetime import datetime, timedelta
+from scraper_cache import get_cache, cache_key, get_fresh, set_fresh
+from scraper_http import batch_fetch_path, fetch_with_fallback, SOURCE_OK, SOURCE_EMPTY, SOURCE_ERROR, SOURCE_TIMED_OUT, SOURCE_REJECTED, SOURCE_SKIPPED
+from scraper_browser import browser_page, shared_page, goto, read_results
+from scraper_parsing import compile_cards, compile_fields, card_rows
+from scraper_stream import stream_response, STREAM_NDJSON
+from scraper_singleflight import coalesce
+from scraper_prewarm import Prewarmer, refresh_in_background, PREWARM_MARGIN
+from scrape_jobs import scrape_jobs
+from scraper_stats import scraper_stats, track_scrape
+from scraper_archive import archive_scope
+from scraper_records import Restaurant, to_json
+from scraper_menus import MenuEnricher, register_enricher, scraper_menus, MENU_MAX_ITEMS
+from scraper_selection import plan_sources, record_outcome
+from scraper_executor import scrape_executor, scraper_executor, ExecutorSaturated
+from scraper_service import scrape_remote, SCRAPER_SERVICE_URL
+from scraper_deadline import Deadline, DeadlineExceeded, deadline_scope, parse_deadline, pause, DEFAULT_DEADLINE, DEFAULT_SOURCE_BUDGET
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -43,13 +60,20 @@ logger = logging.getLogger('food-delivery-scraper')
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
-
-# Cache for storing scraped data
+app.register_blueprint(scrape_jobs)
+app.register_blueprint(scraper_executor)
+app.register_blueprint(scraper_stats)
+app.register_blueprint(scraper_menus)
+
+# Cache for storing scraped data, shared by all workers (see scraper_cache).
+# Results are cached per source, food and city and served stale for a grace
+# period while they are refreshed in the background; sources that returned
+# nothing or failed get a short negative entry so they are retried soon.
 CACHE_EXPIRY = 3600  # 1 hour in seconds
-cache = {
-    "data": {},
-    "timestamp": {}
-}
+NEGATIVE_CACHE_TTL = 300  # 5 minutes
+# Most food and city pairs accepted by the batch endpoint
+BATCH_MAX_QUERIES = int(os.environ.get('SCRAPER_BATCH_MAX_QUERIES', 20))
+cache = get_cache()
 
 # User agents for rotating
 USER_AGENTS = [
@@ -81,653 +105,1054 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     distance = R * c
     return round(distance, 1)
 
+def build_restaurants(rows, build, name, food, city, user_lat=None, user_lon=None):
+    """Create restaurant records from card fields, skipping cards that fail"""
+    restaurants = []
+    for fields in rows:
+        try:
+            restaurants.append(Restaurant(**build(fields, food, city, user_lat, user_lon)))
+        except Exception as e:
+            logger.error(f"Error extracting {name} restaurant: {e}")
+
+    return restaurants
+
+def fetch_menu_browser(url, cards, fields):
+    """Load a restaurant page in a headless browser and read its menu items"""
+    with browser_page(get_random_user_agent()) as page:
+        goto(page, url, 'menu', 60000)
+        pause(3)
+        return read_results(page, cards, fields, MENU_MAX_ITEMS)
+
+def build_menu(rows):
+    """Create menu items from the fields of a restaurant page's dish cards"""
+    return [
+        {"name": row["name"], "price": row["price"] if row["price"] is not None else "₹0"}
+        for row in rows if row["name"]
+    ]
+
+SWIGGY_CARDS = compile_cards('div[data-testid="restaurant-card"]', 'div.sc-bczRLJ.gGpZIh')
+SWIGGY_FIELDS = {
+    "name": ('div.sc-bczRLJ.gGpZIh h3', 'text'),
+    "link": ('a', 'href'),
+    "rating": ('div.sc-bczRLJ.gGpZIh span', 'text', '★'),
+    "delivery_time": ('div.sc-bczRLJ.gGpZIh div', 'text', 'min'),
+    "price_range": ('div.sc-bczRLJ.gGpZIh span', 'text', '₹'),
+    "cuisine": ('div.sc-bczRLJ.gGpZIh div', 'text', ','),
+    "address": ('div.sc-bczRLJ.gGpZIh div', 'text', 'km'),
+    "image_url": ('img', 'src')
+}
+SWIGGY_SELECTORS = compile_fields(SWIGGY_FIELDS)
+
+def warm_swiggy_browser(page, city):
+    """Open Swiggy and set the delivery location before searching"""
+    # Go to Swiggy
+    goto(page, 'https://www.swiggy.com', 'homepage')
+    pause(2)
+
+    # Set location
+    try:
+        # Click on location input
+        page.click('input[placeholder="Enter your delivery location"]')
+        pause(1)
+
+        # Type city name
+        page.fill('input[placeholder="Enter your delivery location"]', city)
+        pause(2)
+
+        # Click on first suggestion
+        page.click('div.sc-bczRLJ.gGpZIh div.sc-bczRLJ.gGpZIh div:nth-child(1)')
+        pause(3)
+    except Exception as e:
+        logger.warning(f"Error setting location on Swiggy: {e}")
+
+def search_swiggy_browser(page, food):
+    """Search Swiggy in a warmed-up page and read the restaurant cards"""
+    # Search for food
+    search_url = f'https://www.swiggy.com/search?query={quote(food)}'
+    goto(page, search_url, 'search', 60000)
+    pause(5)
+
+    # Read the restaurant cards
+    return read_results(page, SWIGGY_CARDS, SWIGGY_FIELDS, 10)
+
+def fetch_swiggy_browser(food, city):
+    """Load the Swiggy search results in a headless browser"""
+    with browser_page(get_random_user_agent()) as page:
+        warm_swiggy_browser(page, city)
+        return search_swiggy_browser(page, food)
+
+def build_swiggy_restaurant(fields, food, city, user_lat=None, user_lon=None):
+    """Create a restaurant object from the fields of a Swiggy card"""
+    # Generate random coordinates near the city center
+    # These would be replaced with actual coordinates in a production environment
+    lat, lon = None, None
+    if city.lower() == 'hyderabad':
+        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'mumbai':
+        lat, lon = 19.0760 + random.uniform(-0.05, 0.05), 72.8777 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'delhi':
+        lat, lon = 28.6139 + random.uniform(-0.05, 0.05), 77.2090 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'bangalore':
+        lat, lon = 12.9716 + random.uniform(-0.05, 0.05), 77.5946 + random.uniform(-0.05, 0.05)
+    else:
+        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
+
+    # Calculate distance if user coordinates are provided
+    distance_km = None
+    if user_lat and user_lon and lat and lon:
+        distance_km = calculate_distance(float(user_lat), float(user_lon), lat, lon)
+
+    # Estimate popular dishes from the food query; the real ones replace
+    # them once the restaurant's menu page is cached (see scraper_menus)
+    popular_dishes = []
+    if food.lower() in ['biryani', 'chicken', 'mutton']:
+        popular_dishes = ["Chicken Biryani", "Mutton Biryani", "Chicken 65"]
+    elif food.lower() in ['pizza', 'pasta', 'italian']:
+        popular_dishes = ["Margherita Pizza", "Pepperoni Pizza", "Pasta Alfredo"]
+    elif food.lower() in ['burger', 'sandwich']:
+        popular_dishes = ["Chicken Burger", "Veg Burger", "French Fries"]
+    elif food.lower() in ['dosa', 'idli', 'south indian']:
+        popular_dishes = ["Masala Dosa", "Idli Sambar", "Vada"]
+    else:
+        popular_dishes = [f"{food.title()}", f"Special {food.title()}", "Chef's Special"]
+
+    return {
+        "restaurant": fields["name"] or "Unknown Restaurant",
+        "redirect": f"https://www.swiggy.com{fields['link']}" if fields["link"] else "",
+        "rating": float(fields["rating"].split('★')[0]) if fields["rating"] is not None else 4.0,
+        "delivery_time": fields["delivery_time"] or "30-40 mins",
+        "price_range": fields["price_range"] or "₹300 for two",
+        "cuisine": fields["cuisine"] or "Various",
+        "address": f"{fields['address']}, {city}" if fields["address"] is not None else f"{city}",
+        "image_url": fields["image_url"] or f"https://source.unsplash.com/random/300x300/?restaurant,{food}",
+        "platform": "Swiggy",
+        "latitude": lat,
+        "longitude": lon,
+        "distance_km": distance_km,
+        "popular_dishes": popular_dishes,
+        "offers": ["50% off up to ₹100", "Free delivery"]
+    }
+
+def parse_swiggy(page_data, food, city, user_lat=None, user_lon=None):
+    """Extract restaurants from a Swiggy search results page"""
+    rows = card_rows(page_data, SWIGGY_CARDS, SWIGGY_SELECTORS, 10)  # Limit to 10 restaurants
+    logger.info(f"Found {len(rows)} restaurants on Swiggy")
+    return build_restaurants(rows, build_swiggy_restaurant, "Swiggy", food, city, user_lat, user_lon)
+
 def scrape_swiggy(food, city, user_lat=None, user_lon=None):
     """Scrape restaurant data from Swiggy"""
-    logger.info(f"Scraping Swiggy for: {food} in {city}")
-    restaurants = []
+    return scrape_source('swiggy', food, city, user_lat, user_lon)['restaurants']
 
+SWIGGY_MENU_CARDS = compile_cards('div[data-testid="normal-dish-item"]')
+SWIGGY_MENU_FIELDS = {
+    "name": ('div[class*="itemNameText"]', 'text'),
+    "price": ('div[class*="itemPortionPrice"]', 'text')
+}
+SWIGGY_MENU_SELECTORS = compile_fields(SWIGGY_MENU_FIELDS)
+
+def fetch_swiggy_menu_browser(url):
+    """Load a Swiggy restaurant page in a headless browser"""
+    return fetch_menu_browser(url, SWIGGY_MENU_CARDS, SWIGGY_MENU_FIELDS)
+
+def parse_swiggy_menu(page_data):
+    """Extract the menu items from a Swiggy restaurant page"""
+    return build_menu(card_rows(page_data, SWIGGY_MENU_CARDS, SWIGGY_MENU_SELECTORS, MENU_MAX_ITEMS))
+
+ZOMATO_CARDS = compile_cards('div.jumbo-tracker', 'div.sc-bczRLJ.gGpZIh')
+ZOMATO_FIELDS = {
+    "name": ('h4', 'text'),
+    "link": ('a', 'href'),
+    "rating": ('div.sc-bczRLJ.gGpZIh div', 'text', '★'),
+    "delivery_time": ('div.sc-bczRLJ.gGpZIh div', 'text', 'min'),
+    "price_range": ('div.sc-bczRLJ.gGpZIh div', 'text', '₹'),
+    "cuisine": ('div.sc-bczRLJ.gGpZIh div', 'text', ','),
+    "address": ('div.sc-bczRLJ.gGpZIh div', 'text', 'km'),
+    "image_url": ('img', 'src')
+}
+ZOMATO_SELECTORS = compile_fields(ZOMATO_FIELDS)
+
+def warm_zomato_browser(page, city):
+    """Open Zomato and set the delivery location before searching"""
+    # Go to Zomato
+    goto(page, 'https://www.zomato.com', 'homepage')
+    pause(2)
+
+    # Set location
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(
-                user_agent=get_random_user_agent(),
-                viewport={'width': 1280, 'height': 800}
-            )
-
-            # Go to Swiggy
-            page.goto('https://www.swiggy.com')
-            time.sleep(2)
-
-            # Set location
-            try:
-                # Click on location input
-                page.click('input[placeholder="Enter your delivery location"]')
-                time.sleep(1)
+        # Click on location input
+        page.click('input[placeholder="Search for city, area or restaurant"]')
+        pause(1)
 
-                # Type city name
-                page.fill('input[placeholder="Enter your delivery location"]', city)
-                time.sleep(2)
+        # Type city name
+        page.fill('input[placeholder="Search for city, area or restaurant"]', city)
+        pause(2)
 
-                # Click on first suggestion
-                page.click('div.sc-bczRLJ.gGpZIh div.sc-bczRLJ.gGpZIh div:nth-child(1)')
-                time.sleep(3)
-            except Exception as e:
-                logger.warning(f"Error setting location on Swiggy: {e}")
-
-            # Search for food
-            search_url = f'https://www.swiggy.com/search?query={quote(food)}'
-            page.goto(search_url, timeout=60000)
-            time.sleep(5)
-
-            # Get page content
-            html = page.content()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find restaurant cards
-            restaurant_cards = soup.select('div[data-testid="restaurant-card"]')
-            if not restaurant_cards:
-                restaurant_cards = soup.select('div.sc-bczRLJ.gGpZIh')  # Alternative selector
-
-            logger.info(f"Found {len(restaurant_cards)} restaurants on Swiggy")
-
-            for card in restaurant_cards[:10]:  # Limit to 10 restaurants
-                try:
-                    # Extract restaurant details
-                    name_elem = card.select_one('div.sc-bczRLJ.gGpZIh h3')
-                    name = name_elem.text.strip() if name_elem else "Unknown Restaurant"
-
-                    # Extract link
-                    link_elem = card.select_one('a')
-                    restaurant_link = f"https://www.swiggy.com{link_elem['href']}" if link_elem and 'href' in link_elem.attrs else ""
-
-                    # Extract rating
-                    rating_elem = card.select_one('div.sc-bczRLJ.gGpZIh span:contains("★")')
-                    rating = float(rating_elem.text.strip().split('★')[0]) if rating_elem else 4.0
-
-                    # Extract delivery time
-                    time_elem = card.select_one('div.sc-bczRLJ.gGpZIh div:contains("min")')
-                    delivery_time = time_elem.text.strip() if time_elem else "30-40 mins"
-
-                    # Extract price range
-                    price_elem = card.select_one('div.sc-bczRLJ.gGpZIh span:contains("₹")')
-                    price_range = price_elem.text.strip() if price_elem else "₹300 for two"
-
-                    # Extract cuisine
-                    cuisine_elem = card.select_one('div.sc-bczRLJ.gGpZIh div:contains(",")')
-                    cuisine = cuisine_elem.text.strip() if cuisine_elem else "Various"
-
-                    # Extract address
-                    address_elem = card.select_one('div.sc-bczRLJ.gGpZIh div:contains("km")')
-                    address = f"{address_elem.text.strip()}, {city}" if address_elem else f"{city}"
-
-                    # Extract image
-                    img_elem = card.select_one('img')
-                    image_url = img_elem['src'] if img_elem and 'src' in img_elem.attrs else f"https://source.unsplash.com/random/300x300/?restaurant,{food}"
-
-                    # Generate random coordinates near the city center
-                    # These would be replaced with actual coordinates in a production environment
-                    lat, lon = None, None
-                    if city.lower() == 'hyderabad':
-                        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'mumbai':
-                        lat, lon = 19.0760 + random.uniform(-0.05, 0.05), 72.8777 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'delhi':
-                        lat, lon = 28.6139 + random.uniform(-0.05, 0.05), 77.2090 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'bangalore':
-                        lat, lon = 12.9716 + random.uniform(-0.05, 0.05), 77.5946 + random.uniform(-0.05, 0.05)
-                    else:
-                        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
-
-                    # Calculate distance if user coordinates are provided
-                    distance_km = None
-                    if user_lat and user_lon and lat and lon:
-                        distance_km = calculate_distance(float(user_lat), float(user_lon), lat, lon)
-
-                    # Extract popular dishes (this would require visiting each restaurant page)
-                    # For now, generate based on restaurant name and food query
-                    popular_dishes = []
-                    if food.lower() in ['biryani', 'chicken', 'mutton']:
-                        popular_dishes = ["Chicken Biryani", "Mutton Biryani", "Chicken 65"]
-                    elif food.lower() in ['pizza', 'pasta', 'italian']:
-                        popular_dishes = ["Margherita Pizza", "Pepperoni Pizza", "Pasta Alfredo"]
-                    elif food.lower() in ['burger', 'sandwich']:
-                        popular_dishes = ["Chicken Burger", "Veg Burger", "French Fries"]
-                    elif food.lower() in ['dosa', 'idli', 'south indian']:
-                        popular_dishes = ["Masala Dosa", "Idli Sambar", "Vada"]
-                    else:
-                        popular_dishes = [f"{food.title()}", f"Special {food.title()}", "Chef's Special"]
-
-                    # Create restaurant object
-                    restaurant = {
-                        "restaurant": name,
-                        "redirect": restaurant_link,
-                        "rating": rating,
-                        "delivery_time": delivery_time,
-                        "price_range": price_range,
-                        "cuisine": cuisine,
-                        "address": address,
-                        "image_url": image_url,
-                        "platform": "Swiggy",
-                        "latitude": lat,
-                        "longitude": lon,
-                        "distance_km": distance_km,
-                        "popular_dishes": popular_dishes,
-                        "offers": ["50% off up to ₹100", "Free delivery"]
-                    }
-
-                    restaurants.append(restaurant)
-                except Exception as e:
-                    logger.error(f"Error extracting Swiggy restaurant: {e}")
-
-            browser.close()
+        # Click on first suggestion
+        page.click('div.sc-bczRLJ.gGpZIh div:nth-child(1)')
+        pause(3)
     except Exception as e:
-        logger.error(f"Error scraping Swiggy: {e}")
+        logger.warning(f"Error setting location on Zomato: {e}")
+
+def search_zomato_browser(page, food):
+    """Search Zomato in a warmed-up page and read the restaurant cards"""
+    # Search for food
+    search_url = f'https://www.zomato.com/search?q={quote(food)}'
+    goto(page, search_url, 'search', 60000)
+    pause(5)
+
+    # Read the restaurant cards
+    return read_results(page, ZOMATO_CARDS, ZOMATO_FIELDS, 10)
+
+def fetch_zomato_browser(food, city):
+    """Load the Zomato search results in a headless browser"""
+    with browser_page(get_random_user_agent()) as page:
+        warm_zomato_browser(page, city)
+        return search_zomato_browser(page, food)
+
+def build_zomato_restaurant(fields, food, city, user_lat=None, user_lon=None):
+    """Create a restaurant object from the fields of a Zomato card"""
+    # Generate random coordinates near the city center
+    # These would be replaced with actual coordinates in a production environment
+    lat, lon = None, None
+    if city.lower() == 'hyderabad':
+        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'mumbai':
+        lat, lon = 19.0760 + random.uniform(-0.05, 0.05), 72.8777 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'delhi':
+        lat, lon = 28.6139 + random.uniform(-0.05, 0.05), 77.2090 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'bangalore':
+        lat, lon = 12.9716 + random.uniform(-0.05, 0.05), 77.5946 + random.uniform(-0.05, 0.05)
+    else:
+        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
 
-    return restaurants
+    # Calculate distance if user coordinates are provided
+    distance_km = None
+    if user_lat and user_lon and lat and lon:
+        distance_km = calculate_distance(float(user_lat), float(user_lon), lat, lon)
+
+    # Estimate popular dishes from the food query; the real ones replace
+    # them once the restaurant's menu page is cached (see scraper_menus)
+    popular_dishes = []
+    if food.lower() in ['biryani', 'chicken', 'mutton']:
+        popular_dishes = ["Chicken Biryani", "Mutton Biryani", "Chicken 65"]
+    elif food.lower() in ['pizza', 'pasta', 'italian']:
+        popular_dishes = ["Margherita Pizza", "Pepperoni Pizza", "Pasta Alfredo"]
+    elif food.lower() in ['burger', 'sandwich']:
+        popular_dishes = ["Chicken Burger", "Veg Burger", "French Fries"]
+    elif food.lower() in ['dosa', 'idli', 'south indian']:
+        popular_dishes = ["Masala Dosa", "Idli Sambar", "Vada"]
+    else:
+        popular_dishes = [f"{food.title()}", f"Special {food.title()}", "Chef's Special"]
+
+    return {
+        "restaurant": fields["name"] or "Unknown Restaurant",
+        "redirect": f"https://www.zomato.com{fields['link']}" if fields["link"] else "",
+        "rating": float(fields["rating"].split('★')[0]) if fields["rating"] is not None else 4.0,
+        "delivery_time": fields["delivery_time"] or "30-40 mins",
+        "price_range": fields["price_range"] or "₹300 for two",
+        "cuisine": fields["cuisine"] or "Various",
+        "address": f"{fields['address']}, {city}" if fields["address"] is not None else f"{city}",
+        "image_url": fields["image_url"] or f"https://source.unsplash.com/random/300x300/?restaurant,{food}",
+        "platform": "Zomato",
+        "latitude": lat,
+        "longitude": lon,
+        "distance_km": distance_km,
+        "popular_dishes": popular_dishes,
+        "offers": ["60% off up to ₹120", "Free delivery"]
+    }
+
+def parse_zomato(page_data, food, city, user_lat=None, user_lon=None):
+    """Extract restaurants from a Zomato search results page"""
+    rows = card_rows(page_data, ZOMATO_CARDS, ZOMATO_SELECTORS, 10)  # Limit to 10 restaurants
+    logger.info(f"Found {len(rows)} restaurants on Zomato")
+    return build_restaurants(rows, build_zomato_restaurant, "Zomato", food, city, user_lat, user_lon)
 
 def scrape_zomato(food, city, user_lat=None, user_lon=None):
     """Scrape restaurant data from Zomato"""
-    logger.info(f"Scraping Zomato for: {food} in {city}")
-    restaurants = []
+    return scrape_source('zomato', food, city, user_lat, user_lon)['restaurants']
+
+ZOMATO_MENU_CARDS = compile_cards('div.sc-1s0saks-11', 'div[class*="MenuItem"]')
+ZOMATO_MENU_FIELDS = {
+    "name": ('h4', 'text'),
+    "price": ('span', 'text', '₹')
+}
+ZOMATO_MENU_SELECTORS = compile_fields(ZOMATO_MENU_FIELDS)
+
+def fetch_zomato_menu_browser(url):
+    """Load a Zomato restaurant page in a headless browser"""
+    return fetch_menu_browser(url, ZOMATO_MENU_CARDS, ZOMATO_MENU_FIELDS)
+
+def parse_zomato_menu(page_data):
+    """Extract the menu items from a Zomato restaurant page"""
+    return build_menu(card_rows(page_data, ZOMATO_MENU_CARDS, ZOMATO_MENU_SELECTORS, MENU_MAX_ITEMS))
+
+EATSURE_CARDS = compile_cards('div.restaurant-card, div.brand-card')
+EATSURE_FIELDS = {
+    "name": ('h3, h4, div.brand-name', 'text'),
+    "link": ('a', 'href'),
+    "rating": ('div.rating span', 'text'),
+    "delivery_time": ('div.delivery-time', 'text'),
+    "price_range": ('div.price-for-two', 'text'),
+    "cuisine": ('div.cuisines', 'text'),
+    "address": ('div.address', 'text'),
+    "image_url": ('img', 'src'),
+    "menu_items": ('div.menu-item', {
+        "name": ('div.item-name', 'text'),
+        "price": ('div.item-price', 'text')
+    })
+}
+EATSURE_SELECTORS = compile_fields(EATSURE_FIELDS)
 
+def warm_eatsure_browser(page, city):
+    """Open EatSure and set the delivery location before searching"""
+    # Go to EatSure
+    goto(page, 'https://www.eatsure.com/', 'homepage')
+    pause(2)
+
+    # Set location
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(
-                user_agent=get_random_user_agent(),
-                viewport={'width': 1280, 'height': 800}
-            )
-
-            # Go to Zomato
-            page.goto('https://www.zomato.com')
-            time.sleep(2)
-
-            # Set location
-            try:
-                # Click on location input
-                page.click('input[placeholder="Search for city, area or restaurant"]')
-                time.sleep(1)
+        # Click on location input
+        page.click('input[placeholder="Enter your location"]')
+        pause(1)
 
-                # Type city name
-                page.fill('input[placeholder="Search for city, area or restaurant"]', city)
-                time.sleep(2)
+        # Type city name
+        page.fill('input[placeholder="Enter your location"]', city)
+        pause(2)
 
-                # Click on first suggestion
-                page.click('div.sc-bczRLJ.gGpZIh div:nth-child(1)')
-                time.sleep(3)
-            except Exception as e:
-                logger.warning(f"Error setting location on Zomato: {e}")
-
-            # Search for food
-            search_url = f'https://www.zomato.com/search?q={quote(food)}'
-            page.goto(search_url, timeout=60000)
-            time.sleep(5)
-
-            # Get page content
-            html = page.content()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find restaurant cards
-            restaurant_cards = soup.select('div.jumbo-tracker')
-            if not restaurant_cards:
-                restaurant_cards = soup.select('div.sc-bczRLJ.gGpZIh')  # Alternative selector
-
-            logger.info(f"Found {len(restaurant_cards)} restaurants on Zomato")
-
-            for card in restaurant_cards[:10]:  # Limit to 10 restaurants
-                try:
-                    # Extract restaurant details
-                    name_elem = card.select_one('h4')
-                    name = name_elem.text.strip() if name_elem else "Unknown Restaurant"
-
-                    # Extract link
-                    link_elem = card.select_one('a')
-                    restaurant_link = f"https://www.zomato.com{link_elem['href']}" if link_elem and 'href' in link_elem.attrs else ""
-
-                    # Extract rating
-                    rating_elem = card.select_one('div.sc-bczRLJ.gGpZIh div:contains("★")')
-                    rating = float(rating_elem.text.strip().split('★')[0]) if rating_elem else 4.0
-
-                    # Extract delivery time
-                    time_elem = card.select_one('div.sc-bczRLJ.gGpZIh div:contains("min")')
-                    delivery_time = time_elem.text.strip() if time_elem else "30-40 mins"
-
-                    # Extract price range
-                    price_elem = card.select_one('div.sc-bczRLJ.gGpZIh div:contains("₹")')
-                    price_range = price_elem.text.strip() if price_elem else "₹300 for two"
-
-                    # Extract cuisine
-                    cuisine_elem = card.select_one('div.sc-bczRLJ.gGpZIh div:contains(",")')
-                    cuisine = cuisine_elem.text.strip() if cuisine_elem else "Various"
-
-                    # Extract address
-                    address_elem = card.select_one('div.sc-bczRLJ.gGpZIh div:contains("km")')
-                    address = f"{address_elem.text.strip()}, {city}" if address_elem else f"{city}"
-
-                    # Extract image
-                    img_elem = card.select_one('img')
-                    image_url = img_elem['src'] if img_elem and 'src' in img_elem.attrs else f"https://source.unsplash.com/random/300x300/?restaurant,{food}"
-
-                    # Generate random coordinates near the city center
-                    # These would be replaced with actual coordinates in a production environment
-                    lat, lon = None, None
-                    if city.lower() == 'hyderabad':
-                        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'mumbai':
-                        lat, lon = 19.0760 + random.uniform(-0.05, 0.05), 72.8777 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'delhi':
-                        lat, lon = 28.6139 + random.uniform(-0.05, 0.05), 77.2090 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'bangalore':
-                        lat, lon = 12.9716 + random.uniform(-0.05, 0.05), 77.5946 + random.uniform(-0.05, 0.05)
-                    else:
-                        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
-
-                    # Calculate distance if user coordinates are provided
-                    distance_km = None
-                    if user_lat and user_lon and lat and lon:
-                        distance_km = calculate_distance(float(user_lat), float(user_lon), lat, lon)
-
-                    # Extract popular dishes (this would require visiting each restaurant page)
-                    # For now, generate based on restaurant name and food query
-                    popular_dishes = []
-                    if food.lower() in ['biryani', 'chicken', 'mutton']:
-                        popular_dishes = ["Chicken Biryani", "Mutton Biryani", "Chicken 65"]
-                    elif food.lower() in ['pizza', 'pasta', 'italian']:
-                        popular_dishes = ["Margherita Pizza", "Pepperoni Pizza", "Pasta Alfredo"]
-                    elif food.lower() in ['burger', 'sandwich']:
-                        popular_dishes = ["Chicken Burger", "Veg Burger", "French Fries"]
-                    elif food.lower() in ['dosa', 'idli', 'south indian']:
-                        popular_dishes = ["Masala Dosa", "Idli Sambar", "Vada"]
-                    else:
-                        popular_dishes = [f"{food.title()}", f"Special {food.title()}", "Chef's Special"]
-
-                    # Create restaurant object
-                    restaurant = {
-                        "restaurant": name,
-                        "redirect": restaurant_link,
-                        "rating": rating,
-                        "delivery_time": delivery_time,
-                        "price_range": price_range,
-                        "cuisine": cuisine,
-                        "address": address,
-                        "image_url": image_url,
-                        "platform": "Zomato",
-                        "latitude": lat,
-                        "longitude": lon,
-                        "distance_km": distance_km,
-                        "popular_dishes": popular_dishes,
-                        "offers": ["60% off up to ₹120", "Free delivery"]
-                    }
-
-                    restaurants.append(restaurant)
-                except Exception as e:
-                    logger.error(f"Error extracting Zomato restaurant: {e}")
-
-            browser.close()
+        # Click on first suggestion
+        page.click('div.location-suggestions div:nth-child(1)')
+        pause(3)
     except Exception as e:
-        logger.error(f"Error scraping Zomato: {e}")
+        logger.warning(f"Error setting location on EatSure: {e}")
 
-    return restaurants
+def search_eatsure_browser(page, food):
+    """Search EatSure in a warmed-up page and read the restaurant cards"""
+    # Search for food
+    try:
+        search_input = page.locator('input[placeholder="Search for food, brands"]')
+        search_input.fill(food)
+        pause(1)
+        page.keyboard.press('Enter')
+        pause(5)
+    except Exception as e:
+        logger.warning(f"Error searching on EatSure: {e}")
+        # Try alternative search method
+        search_url = f'https://www.eatsure.com/search?q={quote(food)}'
+        goto(page, search_url, 'search', 60000)
+        pause(5)
+
+    # Read the restaurant cards
+    return read_results(page, EATSURE_CARDS, EATSURE_FIELDS, 10)
+
+def fetch_eatsure_browser(food, city):
+    """Load the EatSure search results in a headless browser"""
+    with browser_page(get_random_user_agent()) as page:
+        warm_eatsure_browser(page, city)
+        return search_eatsure_browser(page, food)
+
+def build_eatsure_restaurant(fields, food, city, user_lat=None, user_lon=None):
+    """Create a restaurant object from the fields of an EatSure card"""
+    # Generate random coordinates near the city center
+    # These would be replaced with actual coordinates in a production environment
+    lat, lon = None, None
+    if city.lower() == 'hyderabad':
+        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'mumbai':
+        lat, lon = 19.0760 + random.uniform(-0.05, 0.05), 72.8777 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'delhi':
+        lat, lon = 28.6139 + random.uniform(-0.05, 0.05), 77.2090 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'bangalore':
+        lat, lon = 12.9716 + random.uniform(-0.05, 0.05), 77.5946 + random.uniform(-0.05, 0.05)
+    else:
+        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
+
+    # Calculate distance if user coordinates are provided
+    distance_km = None
+    if user_lat and user_lon and lat and lon:
+        distance_km = calculate_distance(float(user_lat), float(user_lon), lat, lon)
+
+    # Extract menu items
+    menu_items = []
+    for item in fields["menu_items"][:5]:  # Limit to 5 menu items
+        if item["name"] is not None:
+            menu_items.append({
+                "name": item["name"],
+                "price": item["price"] if item["price"] is not None else "₹0"
+            })
+
+    # If no menu items found, generate based on restaurant name and food query
+    if not menu_items:
+        if food.lower() in ['biryani', 'chicken', 'mutton']:
+            menu_items = [
+                {"name": "Chicken Biryani", "price": "₹249"},
+                {"name": "Mutton Biryani", "price": "₹349"},
+                {"name": "Chicken 65", "price": "₹199"}
+            ]
+        elif food.lower() in ['pizza', 'pasta', 'italian']:
+            menu_items = [
+                {"name": "Margherita Pizza", "price": "₹199"},
+                {"name": "Pepperoni Pizza", "price": "₹299"},
+                {"name": "Pasta Alfredo", "price": "₹249"}
+            ]
+        elif food.lower() in ['burger', 'sandwich']:
+            menu_items = [
+                {"name": "Chicken Burger", "price": "₹149"},
+                {"name": "Veg Burger", "price": "₹99"},
+                {"name": "French Fries", "price": "₹79"}
+            ]
+        else:
+            menu_items = [
+                {"name": f"{food.title()}", "price": "₹199"},
+                {"name": f"Special {food.title()}", "price": "₹249"},
+                {"name": "Chef's Special", "price": "₹299"}
+            ]
+
+    return {
+        "restaurant": fields["name"] or "Unknown Restaurant",
+        "redirect": f"https://www.eatsure.com{fields['link']}" if fields["link"] else "",
+        "rating": float(fields["rating"]) if fields["rating"] is not None else 4.0,
+        "delivery_time": fields["delivery_time"] or "30-40 mins",
+        "price_range": fields["price_range"] or "₹300 for two",
+        "cuisine": fields["cuisine"] or "Various",
+        "address": f"{fields['address']}, {city}" if fields["address"] is not None else f"{city}",
+        "image_url": fields["image_url"] or f"https://source.unsplash.com/random/300x300/?restaurant,{food}",
+        "platform": "EatSure",
+        "latitude": lat,
+        "longitude": lon,
+        "distance_km": distance_km,
+        "popular_dishes": [item["name"] for item in menu_items],
+        "menu_items": menu_items,
+        "offers": ["40% off up to ₹80", "Free delivery on first order"],
+        "restaurant_type": "both",  # Default to both veg and non-veg
+        "health_score": random.randint(60, 90)  # Random health score between 60-90
+    }
+
+def parse_eatsure(page_data, food, city, user_lat=None, user_lon=None):
+    """Extract restaurants from an EatSure search results page"""
+    rows = card_rows(page_data, EATSURE_CARDS, EATSURE_SELECTORS, 10)  # Limit to 10 restaurants
+    logger.info(f"Found {len(rows)} restaurants on EatSure")
+    return build_restaurants(rows, build_eatsure_restaurant, "EatSure", food, city, user_lat, user_lon)
 
 def scrape_eatsure(food, city, user_lat=None, user_lon=None):
     """Scrape restaurant data from EatSure"""
-    logger.info(f"Scraping EatSure for: {food} in {city}")
-    restaurants = []
+    return scrape_source('eatsure', food, city, user_lat, user_lon)['restaurants']
+
+UBEREATS_CARDS = compile_cards('a[data-testid="store-card"]')
+UBEREATS_FIELDS = {
+    "name": ('h3', 'text'),
+    "link": (None, 'href'),
+    "rating": ('div[data-testid="rating-text"]', 'text'),
+    "delivery_time": ('div[data-testid="delivery-time"]', 'text'),
+    "price_range": ('div[data-testid="price-range"]', 'text'),
+    "cuisine": ('div[data-testid="store-categories"]', 'text'),
+    "image_url": ('img', 'src')
+}
+UBEREATS_SELECTORS = compile_fields(UBEREATS_FIELDS)
+
+def warm_ubereats_browser(page, city):
+    """Open Uber Eats and set the delivery location before searching"""
+    # Go to Uber Eats
+    goto(page, 'https://www.ubereats.com/in', 'homepage')
+    pause(2)
 
+    # Set location
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(
-                user_agent=get_random_user_agent(),
-                viewport={'width': 1280, 'height': 800}
-            )
-
-            # Go to EatSure
-            page.goto('https://www.eatsure.com/')
-            time.sleep(2)
-
-            # Set location
-            try:
-                # Click on location input
-                page.click('input[placeholder="Enter your location"]')
-                time.sleep(1)
+        # Click on location input
+        page.click('button[aria-label="Delivery location"]')
+        pause(1)
 
-                # Type city name
-                page.fill('input[placeholder="Enter your location"]', city)
-                time.sleep(2)
+        # Type city name
+        page.fill('input[aria-label="Search for location"]', city)
+        pause(2)
 
-                # Click on first suggestion
-                page.click('div.location-suggestions div:nth-child(1)')
-                time.sleep(3)
-            except Exception as e:
-                logger.warning(f"Error setting location on EatSure: {e}")
+        # Click on first suggestion
+        page.click('ul[aria-label="Location suggestions"] li:first-child')
+        pause(3)
+    except Exception as e:
+        logger.warning(f"Error setting location on Uber Eats: {e}")
 
-            # Search for food
-            try:
-                search_input = page.locator('input[placeholder="Search for food, brands"]')
-                search_input.fill(food)
-                time.sleep(1)
-                page.keyboard.press('Enter')
-                time.sleep(5)
-            except Exception as e:
-                logger.warning(f"Error searching on EatSure: {e}")
-                # Try alternative search method
-                search_url = f'https://www.eatsure.com/search?q={quote(food)}'
-                page.goto(search_url, timeout=60000)
-                time.sleep(5)
-
-            # Get page content
-            html = page.content()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find restaurant cards
-            restaurant_cards = soup.select('div.restaurant-card, div.brand-card')
-            logger.info(f"Found {len(restaurant_cards)} restaurants on EatSure")
-
-            for card in restaurant_cards[:10]:  # Limit to 10 restaurants
-                try:
-                    # Extract restaurant details
-                    name_elem = card.select_one('h3, h4, div.brand-name')
-                    name = name_elem.text.strip() if name_elem else "Unknown Restaurant"
-
-                    # Extract link
-                    link_elem = card.select_one('a')
-                    restaurant_link = f"https://www.eatsure.com{link_elem['href']}" if link_elem and 'href' in link_elem.attrs else ""
-
-                    # Extract rating
-                    rating_elem = card.select_one('div.rating span')
-                    rating = float(rating_elem.text.strip()) if rating_elem else 4.0
-
-                    # Extract delivery time
-                    time_elem = card.select_one('div.delivery-time')
-                    delivery_time = time_elem.text.strip() if time_elem else "30-40 mins"
-
-                    # Extract price range
-                    price_elem = card.select_one('div.price-for-two')
-                    price_range = price_elem.text.strip() if price_elem else "₹300 for two"
-
-                    # Extract cuisine
-                    cuisine_elem = card.select_one('div.cuisines')
-                    cuisine = cuisine_elem.text.strip() if cuisine_elem else "Various"
-
-                    # Extract address
-                    address_elem = card.select_one('div.address')
-                    address = f"{address_elem.text.strip()}, {city}" if address_elem else f"{city}"
-
-                    # Extract image
-                    img_elem = card.select_one('img')
-                    image_url = img_elem['src'] if img_elem and 'src' in img_elem.attrs else f"https://source.unsplash.com/random/300x300/?restaurant,{food}"
-
-                    # Generate random coordinates near the city center
-                    # These would be replaced with actual coordinates in a production environment
-                    lat, lon = None, None
-                    if city.lower() == 'hyderabad':
-                        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'mumbai':
-                        lat, lon = 19.0760 + random.uniform(-0.05, 0.05), 72.8777 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'delhi':
-                        lat, lon = 28.6139 + random.uniform(-0.05, 0.05), 77.2090 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'bangalore':
-                        lat, lon = 12.9716 + random.uniform(-0.05, 0.05), 77.5946 + random.uniform(-0.05, 0.05)
-                    else:
-                        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
-
-                    # Calculate distance if user coordinates are provided
-                    distance_km = None
-                    if user_lat and user_lon and lat and lon:
-                        distance_km = calculate_distance(float(user_lat), float(user_lon), lat, lon)
-
-                    # Extract menu items
-                    menu_items = []
-                    menu_elems = card.select('div.menu-item')
-                    for menu_elem in menu_elems[:5]:  # Limit to 5 menu items
-                        item_name_elem = menu_elem.select_one('div.item-name')
-                        item_price_elem = menu_elem.select_one('div.item-price')
-                        if item_name_elem:
-                            menu_items.append({
-                                "name": item_name_elem.text.strip(),
-                                "price": item_price_elem.text.strip() if item_price_elem else "₹0"
-                            })
-
-                    # If no menu items found, generate based on restaurant name and food query
-                    if not menu_items:
-                        if food.lower() in ['biryani', 'chicken', 'mutton']:
-                            menu_items = [
-                                {"name": "Chicken Biryani", "price": "₹249"},
-                                {"name": "Mutton Biryani", "price": "₹349"},
-                                {"name": "Chicken 65", "price": "₹199"}
-                            ]
-                        elif food.lower() in ['pizza', 'pasta', 'italian']:
-                            menu_items = [
-                                {"name": "Margherita Pizza", "price": "₹199"},
-                                {"name": "Pepperoni Pizza", "price": "₹299"},
-                                {"name": "Pasta Alfredo", "price": "₹249"}
-                            ]
-                        elif food.lower() in ['burger', 'sandwich']:
-                            menu_items = [
-                                {"name": "Chicken Burger", "price": "₹149"},
-                                {"name": "Veg Burger", "price": "₹99"},
-                                {"name": "French Fries", "price": "₹79"}
-                            ]
-                        else:
-                            menu_items = [
-                                {"name": f"{food.title()}", "price": "₹199"},
-                                {"name": f"Special {food.title()}", "price": "₹249"},
-                                {"name": "Chef's Special", "price": "₹299"}
-                            ]
-
-                    # Create restaurant object
-                    restaurant = {
-                        "restaurant": name,
-                        "redirect": restaurant_link,
-                        "rating": rating,
-                        "delivery_time": delivery_time,
-                        "price_range": price_range,
-                        "cuisine": cuisine,
-                        "address": address,
-                        "image_url": image_url,
-                        "platform": "EatSure",
-                        "latitude": lat,
-                        "longitude": lon,
-                        "distance_km": distance_km,
-                        "popular_dishes": [item["name"] for item in menu_items],
-                        "menu_items": menu_items,
-                        "offers": ["40% off up to ₹80", "Free delivery on first order"],
-                        "restaurant_type": "both",  # Default to both veg and non-veg
-                        "health_score": random.randint(60, 90)  # Random health score between 60-90
-                    }
-
-                    restaurants.append(restaurant)
-                except Exception as e:
-                    logger.error(f"Error extracting EatSure restaurant: {e}")
-
-            browser.close()
+def search_ubereats_browser(page, food):
+    """Search Uber Eats in a warmed-up page and read the restaurant cards"""
+    # Search for food
+    try:
+        search_input = page.locator('input[aria-label="Search"]')
+        search_input.fill(food)
+        pause(1)
+        page.keyboard.press('Enter')
+        pause(5)
     except Exception as e:
-        logger.error(f"Error scraping EatSure: {e}")
+        logger.warning(f"Error searching on Uber Eats: {e}")
+        # Try alternative search method
+        search_url = f'https://www.ubereats.com/in/search?q={quote(food)}'
+        goto(page, search_url, 'search', 60000)
+        pause(5)
+
+    # Read the restaurant cards
+    return read_results(page, UBEREATS_CARDS, UBEREATS_FIELDS, 10)
+
+def fetch_ubereats_browser(food, city):
+    """Load the Uber Eats search results in a headless browser"""
+    with browser_page(get_random_user_agent()) as page:
+        warm_ubereats_browser(page, city)
+        return search_ubereats_browser(page, food)
+
+def build_ubereats_restaurant(fields, food, city, user_lat=None, user_lon=None):
+    """Create a restaurant object from the fields of an Uber Eats card"""
+    # Generate random coordinates near the city center
+    # These would be replaced with actual coordinates in a production environment
+    lat, lon = None, None
+    if city.lower() == 'hyderabad':
+        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'mumbai':
+        lat, lon = 19.0760 + random.uniform(-0.05, 0.05), 72.8777 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'delhi':
+        lat, lon = 28.6139 + random.uniform(-0.05, 0.05), 77.2090 + random.uniform(-0.05, 0.05)
+    elif city.lower() == 'bangalore':
+        lat, lon = 12.9716 + random.uniform(-0.05, 0.05), 77.5946 + random.uniform(-0.05, 0.05)
+    else:
+        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
 
-    return restaurants
+    # Calculate distance if user coordinates are provided
+    distance_km = None
+    if user_lat and user_lon and lat and lon:
+        distance_km = calculate_distance(float(user_lat), float(user_lon), lat, lon)
+
+    # Estimate menu items from the food query; the real ones replace them
+    # once the restaurant's menu page is cached (see scraper_menus)
+    menu_items = []
+    if food.lower() in ['biryani', 'chicken', 'mutton']:
+        menu_items = [
+            {"name": "Chicken Biryani", "price": "₹249"},
+            {"name": "Mutton Biryani", "price": "₹349"},
+            {"name": "Chicken 65", "price": "₹199"}
+        ]
+    elif food.lower() in ['pizza', 'pasta', 'italian']:
+        menu_items = [
+            {"name": "Margherita Pizza", "price": "₹199"},
+            {"name": "Pepperoni Pizza", "price": "₹299"},
+            {"name": "Pasta Alfredo", "price": "₹249"}
+        ]
+    elif food.lower() in ['burger', 'sandwich']:
+        menu_items = [
+            {"name": "Chicken Burger", "price": "₹149"},
+            {"name": "Veg Burger", "price": "₹99"},
+            {"name": "French Fries", "price": "₹79"}
+        ]
+    else:
+        menu_items = [
+            {"name": f"{food.title()}", "price": "₹199"},
+            {"name": f"Special {food.title()}", "price": "₹249"},
+            {"name": "Chef's Special", "price": "₹299"}
+        ]
+
+    return {
+        "restaurant": fields["name"] or "Unknown Restaurant",
+        "redirect": f"https://www.ubereats.com{fields['link']}" if fields["link"] else "",
+        "rating": float(fields["rating"]) if fields["rating"] is not None else 4.0,
+        "delivery_time": fields["delivery_time"] or "30-40 mins",
+        "price_range": fields["price_range"] or "₹₹",
+        "cuisine": fields["cuisine"] or "Various",
+        "address": f"{city}",  # Uber Eats doesn't show full address in search results
+        "image_url": fields["image_url"] or f"https://source.unsplash.com/random/300x300/?restaurant,{food}",
+        "platform": "Uber Eats",
+        "latitude": lat,
+        "longitude": lon,
+        "distance_km": distance_km,
+        "popular_dishes": [item["name"] for item in menu_items],
+        "menu_items": menu_items,
+        "offers": ["50% off up to ₹100", "Free delivery on orders above ₹199"],
+        "restaurant_type": "both",  # Default to both veg and non-veg
+        "health_score": random.randint(60, 90)  # Random health score between 60-90
+    }
+
+def parse_ubereats(page_data, food, city, user_lat=None, user_lon=None):
+    """Extract restaurants from an Uber Eats search results page"""
+    rows = card_rows(page_data, UBEREATS_CARDS, UBEREATS_SELECTORS, 10)  # Limit to 10 restaurants
+    logger.info(f"Found {len(rows)} restaurants on Uber Eats")
+    return build_restaurants(rows, build_ubereats_restaurant, "Uber Eats", food, city, user_lat, user_lon)
 
 def scrape_ubereats(food, city, user_lat=None, user_lon=None):
     """Scrape restaurant data from Uber Eats"""
-    logger.info(f"Scraping Uber Eats for: {food} in {city}")
-    restaurants = []
+    return scrape_source('ubereats', food, city, user_lat, user_lon)['restaurants']
+
+UBEREATS_MENU_CARDS = compile_cards('li[data-testid^="store-item-"]')
+UBEREATS_MENU_FIELDS = {
+    "name": ('span[data-testid="rich-text"]', 'text'),
+    "price": ('span[data-testid="rich-text"]', 'text', '₹')
+}
+UBEREATS_MENU_SELECTORS = compile_fields(UBEREATS_MENU_FIELDS)
+
+def fetch_ubereats_menu_browser(url):
+    """Load an Uber Eats restaurant page in a headless browser"""
+    return fetch_menu_browser(url, UBEREATS_MENU_CARDS, UBEREATS_MENU_FIELDS)
+
+def parse_ubereats_menu(page_data):
+    """Extract the menu items from an Uber Eats restaurant page"""
+    return build_menu(card_rows(page_data, UBEREATS_MENU_CARDS, UBEREATS_MENU_SELECTORS, MENU_MAX_ITEMS))
+
+# Site adapters. None of the food delivery sites can be served over plain
+# HTTP yet: the delivery location is set through the page UI, so every
+# source is marked unsupported for the HTTP path. 'warm' (open the site and
+# set the city) and 'search' are the two halves of 'browser', so a batch can
+# warm up one page per city and search every food in it. 'ttl' is how long the
+# source's results for a food and city stay cached and 'budget' is the most
+# time, in seconds, a scrape of the source may take within the request
+# deadline. 'menu' and 'parse_menu' scrape a restaurant page's menu in the
+# background, at most 'menu_concurrency' pages of the site at once, and
+# 'menu_ttl' is how long a menu stays cached (see scraper_menus). EatSure
+# cards already list their dishes, so it has no menu scrape.
+FOOD_DELIVERY_SOURCES = {
+    "swiggy": {"name": "Swiggy", "http": None, "browser": fetch_swiggy_browser, "warm": warm_swiggy_browser, "search": search_swiggy_browser, "parse": parse_swiggy, "ttl": CACHE_EXPIRY, "budget": DEFAULT_SOURCE_BUDGET, "menu": fetch_swiggy_menu_browser, "parse_menu": parse_swiggy_menu, "menu_concurrency": 2, "menu_ttl": 6 * CACHE_EXPIRY},
+    "zomato": {"name": "Zomato", "http": None, "browser": fetch_zomato_browser, "warm": warm_zomato_browser, "search": search_zomato_browser, "parse": parse_zomato, "ttl": CACHE_EXPIRY, "budget": DEFAULT_SOURCE_BUDGET, "menu": fetch_zomato_menu_browser, "parse_menu": parse_zomato_menu, "menu_concurrency": 2, "menu_ttl": 6 * CACHE_EXPIRY},
+    "eatsure": {"name": "EatSure", "http": None, "browser": fetch_eatsure_browser, "warm": warm_eatsure_browser, "search": search_eatsure_browser, "parse": parse_eatsure, "ttl": 2 * CACHE_EXPIRY, "budget": DEFAULT_SOURCE_BUDGET, "menu": None},
+    "ubereats": {"name": "Uber Eats", "http": None, "browser": fetch_ubereats_browser, "warm": warm_ubereats_browser, "search": search_ubereats_browser, "parse": parse_ubereats, "ttl": CACHE_EXPIRY, "budget": DEFAULT_SOURCE_BUDGET, "menu": fetch_ubereats_menu_browser, "parse_menu": parse_ubereats_menu, "menu_concurrency": 1, "menu_ttl": 6 * CACHE_EXPIRY}
+}
 
+def scrape_source(key, food, city, user_lat=None, user_lon=None, deadline=None):
+    """Scrape one source, on the scraper service when one is configured"""
+    if SCRAPER_SERVICE_URL:
+        params = {"food": food, "city": city, "user_lat": user_lat, "user_lon": user_lon}
+        return scrape_remote("food_delivery", key, params, deadline)
+    return scrape_source_local(key, food, city, user_lat, user_lon, deadline)
+
+def scrape_source_local(key, food, city, user_lat=None, user_lon=None, deadline=None):
+    """Scrape one source, trying its HTTP path before launching a browser
+
+    The scrape stops at the source's budget or the request deadline,
+    whichever comes first.
+    """
+    site = FOOD_DELIVERY_SOURCES[key]
+    logger.info(f"Scraping {site['name']} for: {food} in {city}")
+
+    budget = deadline.child(site["budget"]) if deadline else Deadline(site["budget"])
+    http_fetch = (lambda: site["http"](food, city)) if site["http"] else None
+    with track_scrape("food_delivery", key) as stats:
+        try:
+            params = {"food": food, "city": city, "user_lat": user_lat, "user_lon": user_lon}
+            with deadline_scope(budget), archive_scope("food_delivery", key, params):
+                restaurants, fetch_path = fetch_with_fallback(
+                    site["name"],
+                    http_fetch,
+                    lambda: site["browser"](food, city),
+                    partial(site["parse"], food=food, city=city, user_lat=user_lat, user_lon=user_lon)
+                )
+            status = SOURCE_OK if restaurants else SOURCE_EMPTY
+        except Exception as e:
+            restaurants, fetch_path = [], None
+            if isinstance(e, DeadlineExceeded) or budget.expired():
+                logger.warning(f"Timed out scraping {site['name']}")
+                status = SOURCE_TIMED_OUT
+            else:
+                logger.error(f"Error scraping {site['name']}: {e}")
+                status = SOURCE_ERROR
+        stats.update(status=status, cards=len(restaurants), fetch_path=fetch_path)
+
+    return {"source": key, "restaurants": restaurants, "fetch_path": fetch_path, "status": status}
+
+def scrape_menu(key, url, deadline=None):
+    """Scrape one restaurant's menu, on the scraper service when one is configured"""
+    if SCRAPER_SERVICE_URL:
+        return scrape_remote("food_delivery_menu", key, {"url": url}, deadline)
+    return scrape_menu_local(key, url, deadline)
+
+def scrape_menu_local(key, url, deadline=None):
+    """Scrape the menu items of one restaurant page"""
+    site = FOOD_DELIVERY_SOURCES[key]
+    logger.info(f"Scraping {site['name']} menu: {url}")
+
+    with track_scrape("food_delivery_menu", key) as stats:
+        try:
+            with deadline_scope(deadline or Deadline(DEFAULT_SOURCE_BUDGET)):
+                menu, fetch_path = fetch_with_fallback(
+                    site["name"], None, lambda: site["menu"](url), site["parse_menu"]
+                )
+            status = SOURCE_OK if menu else SOURCE_EMPTY
+        except Exception as e:
+            menu, fetch_path = [], None
+            if isinstance(e, DeadlineExceeded):
+                logger.warning(f"Timed out scraping {site['name']} menu {url}")
+                status = SOURCE_TIMED_OUT
+            else:
+                logger.error(f"Error scraping {site['name']} menu {url}: {e}")
+                status = SOURCE_ERROR
+        stats.update(status=status, cards=len(menu), fetch_path=fetch_path)
+
+    return {"source": key, "menu": menu, "fetch_path": fetch_path, "status": status}
+
+def scrape_source_batch(key, foods, city, user_lat=None, user_lon=None, deadline=None):
+    """Scrape one source for several foods in a city, keyed by food
+
+    The scraper service takes one food per call, so there the foods are
+    scraped one after the other.
+    """
+    if SCRAPER_SERVICE_URL:
+        return {
+            food: scrape_remote("food_delivery", key, {"food": food, "city": city, "user_lat": user_lat, "user_lon": user_lon}, deadline)
+            for food in foods
+        }
+    return scrape_source_batch_local(key, foods, city, user_lat, user_lon, deadline)
+
+def scrape_source_batch_local(key, foods, city, user_lat=None, user_lon=None, deadline=None):
+    """Scrape one source for several foods in one browser session
+
+    The page is warmed up, and the delivery location set, once for the city
+    and every food is searched in it. The source gets its budget once per
+    food, within the request deadline, and the batch is recorded as a single
+    scrape in the stats.
+    """
+    site = FOOD_DELIVERY_SOURCES[key]
+    logger.info(f"Scraping {site['name']} for {len(foods)} foods in {city}")
+
+    seconds = site["budget"] * len(foods)
+    budget = deadline.child(seconds) if deadline else Deadline(seconds)
+    results = {}
+    with track_scrape("food_delivery", key) as stats, deadline_scope(budget):
+        try:
+            with shared_page(get_random_user_agent(), lambda page: site["warm"](page, city)) as page:
+                for food in foods:
+                    http_fetch = (lambda food=food: site["http"](food, city)) if site["http"] else None
+                    try:
+                        params = {"food": food, "city": city, "user_lat": user_lat, "user_lon": user_lon}
+                        with archive_scope("food_delivery", key, params):
+                            restaurants, fetch_path = fetch_with_fallback(
+                                site["name"],
+                                http_fetch,
+                                lambda food=food: site["search"](page(), food),
+                                partial(site["parse"], food=food, city=city, user_lat=user_lat, user_lon=user_lon)
+                            )
+                        status = SOURCE_OK if restaurants else SOURCE_EMPTY
+                    except Exception as e:
+                        restaurants, fetch_path = [], None
+                        if isinstance(e, DeadlineExceeded) or budget.expired():
+                            logger.warning(f"Timed out scraping {site['name']} for: {food}")
+                            status = SOURCE_TIMED_OUT
+                        else:
+                            logger.error(f"Error scraping {site['name']} for {food}: {e}")
+                            status = SOURCE_ERROR
+                    results[food] = {"source": key, "restaurants": restaurants, "fetch_path": fetch_path, "status": status}
+        except Exception as e:
+            # Closing the browser failed; the results read so far still stand
+            logger.error(f"Error closing the {site['name']} browser: {e}")
+
+        statuses = {result["status"] for result in results.values()}
+        stats.update(
+            status=next((status for status in (SOURCE_OK, SOURCE_TIMED_OUT, SOURCE_ERROR) if status in statuses), SOURCE_EMPTY),
+            cards=sum(len(result["restaurants"]) for result in results.values()),
+            fetch_path=batch_fetch_path(result["fetch_path"] for result in results.values())
+        )
+
+    for food in foods:
+        results.setdefault(food, unscraped_result(key, SOURCE_TIMED_OUT if budget.expired() else SOURCE_ERROR))
+    return results
+
+menus = register_enricher(MenuEnricher("food_delivery", cache, FOOD_DELIVERY_SOURCES, scrape_menu))
+
+def unscraped_result(key, status=SOURCE_TIMED_OUT):
+    """Result for a source that timed out or was never scraped"""
+    return {"source": key, "restaurants": [], "fetch_path": None, "status": status}
+
+def source_cache_key(key, food, city):
+    """Cache key for one source's results for a food and city"""
+    return cache_key("food_delivery", key, food, city)
+
+def record_and_cache_source(key, food, city, result, seconds, deadline):
+    """Fold a source's result into its health and cache it, unless it timed out"""
+    # A source is only blamed for timeouts within its own budget
+    if result["status"] != SOURCE_TIMED_OUT or not (deadline and deadline.expired()):
+        record_outcome("food_delivery", key, result["status"], seconds)
+    if result["status"] != SOURCE_TIMED_OUT:
+        if result["status"] == SOURCE_OK:
+            set_fresh(cache, source_cache_key(key, food, city), result, FOOD_DELIVERY_SOURCES[key]["ttl"])
+        else:
+            set_fresh(cache, source_cache_key(key, food, city), result, NEGATIVE_CACHE_TTL, grace=0)
+
+def scrape_and_cache_source(key, food, city, user_lat, user_lon, deadline):
+    """Scrape one source and cache its result, unless it timed out"""
+    started = time.monotonic()
+    result = scrape_source(key, food, city, user_lat, user_lon, deadline)
+    record_and_cache_source(key, food, city, result, time.monotonic() - started, deadline)
+    return result
+
+def load_source(key, food, city, user_lat, user_lon, deadline, min_fresh=0):
+    """Scrape one source, sharing the scrape with concurrent identical requests
+
+    The scrape is skipped if another caller cached a result that stays fresh
+    for more than min_fresh seconds in the meantime.
+    """
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page(
-                user_agent=get_random_user_agent(),
-                viewport={'width': 1280, 'height': 800}
-            )
-
-            # Go to Uber Eats
-            page.goto('https://www.ubereats.com/in')
-            time.sleep(2)
-
-            # Set location
+        return coalesce(
+            source_cache_key(key, food, city),
+            lambda: scrape_and_cache_source(key, food, city, user_lat, user_lon, deadline),
+            deadline,
+            min_fresh
+        )
+    except DeadlineExceeded:
+        return unscraped_result(key)
+
+def scrape_and_cache_batch(key, foods, city, user_lat, user_lon, deadline):
+    """Scrape one source for several foods in a city and cache each result"""
+    started = time.monotonic()
+    results = scrape_source_batch(key, foods, city, user_lat, user_lon, deadline)
+    seconds = (time.monotonic() - started) / len(foods)
+    for food, result in results.items():
+        record_and_cache_source(key, food, city, result, seconds, deadline)
+    return results
+
+def revalidate_source(key, food, city, user_lat=None, user_lon=None):
+    """Re-scrape one source in the background, unless adaptive selection skips it
+
+    Entries that go stale within PREWARM_MARGIN are re-scraped even though
+    they are still fresh.
+    """
+    run, skipped = plan_sources("food_delivery", [key])
+    if skipped:
+        return
+    refresh_in_background(
+        source_cache_key(key, food, city),
+        lambda: load_source(key, food, city, user_lat, user_lon, Deadline(DEFAULT_DEADLINE), PREWARM_MARGIN)
+    )
+
+def warm_query(food, city):
+    """Refresh the sources of a popular food and city that are missing or about to go stale
+
+    Sources with a negative entry (empty or failed) are left alone until it
+    expires.
+    """
+    expiring = time.time() + PREWARM_MARGIN
+    for key in FOOD_DELIVERY_SOURCES:
+        cached, fresh_until = get_fresh(cache, source_cache_key(key, food, city))
+        if cached is not None and cached["status"] != SOURCE_OK:
+            continue
+        if fresh_until <= expiring:
+            revalidate_source(key, food, city)
+
+prewarmer = Prewarmer("food delivery", warm_query)
+
+def source_report(result, cached):
+    """Summarize one source's result for the API responses"""
+    return {
+        "fetch_path": result["fetch_path"],
+        "status": result["status"],
+        "count": len(result["restaurants"]),
+        "cached": cached,
+        "timed_out": result["status"] == SOURCE_TIMED_OUT
+    }
+
+def iter_source_results(food, city, user_lat=None, user_lon=None, deadline=None):
+    """Yield (result, cached) for every source as soon as it is available
+
+    Each source's results are cached on their own, so cached sources are
+    yielded first and only the sources that are missing from the cache are
+    scraped, in parallel, yielding each as it completes. Stale sources are
+    yielded as cached and refreshed in the background. Concurrent requests
+    for the same source, food and city share one scrape.
+    Sources still running at the deadline are yielded as timed out and left
+    to stop at their next wait, sources turned away by a full scrape queue
+    as rejected, and sources left out by adaptive selection (see
+    scraper_selection) as skipped; none of these is cached.
+    """
+    deadline = deadline or Deadline(DEFAULT_DEADLINE)
+    pending = []
+    for key in FOOD_DELIVERY_SOURCES:
+        cached, fresh_until = get_fresh(cache, source_cache_key(key, food, city))
+        if cached is None:
+            pending.append(key)
+            continue
+        if fresh_until <= time.time():
+            revalidate_source(key, food, city, user_lat, user_lon)
+        yield cached, True
+
+    if not pending:
+        return
+
+    # Skip sources that keep failing, and submit the most useful ones first
+    pending, skipped = plan_sources("food_delivery", pending)
+    for key in skipped:
+        logger.info(f"Skipping {FOOD_DELIVERY_SOURCES[key]['name']}, it has been failing or finding nothing")
+        yield unscraped_result(key, SOURCE_SKIPPED), False
+
+    # Run the scrapers in parallel on the shared executor
+    futures = {}
+    for key in pending:
+        try:
+            futures[scrape_executor.submit(load_source, key, food, city, user_lat, user_lon, deadline)] = key
+        except ExecutorSaturated:
+            logger.warning(f"Scrape queue is full, skipping {FOOD_DELIVERY_SOURCES[key]['name']}")
+            yield unscraped_result(key, SOURCE_REJECTED), False
+    try:
+        # Get results as they complete
+        for future in concurrent.futures.as_completed(futures, timeout=deadline.remaining()):
+            futures.pop(future)
             try:
-                # Click on location input
-                page.click('button[aria-label="Delivery location"]')
-                time.sleep(1)
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Error in scraper thread: {e}")
+                continue
+            yield result, False
+    except concurrent.futures.TimeoutError:
+        logger.warning(f"Deadline reached for '{food}' in '{city}', returning partial results")
+        for key in futures.values():
+            yield unscraped_result(key), False
+    finally:
+        # Drop scrapes still queued; running ones stop at their next wait
+        for future in futures:
+            future.cancel()
+
+def scrape_all_sources(food, city, user_lat=None, user_lon=None, deadline=None):
+    """Scrape restaurants from all sources in parallel
+
+    Returns the merged restaurants and a per-source report of the fetch path
+    that served each source, its status, result count and whether it was
+    served from cache.
+    """
+    return merge_source_results(iter_source_results(food, city, user_lat, user_lon, deadline))
+
+def merge_source_results(source_results):
+    """Merge (result, cached) pairs into the restaurants and the per-source report"""
+    all_restaurants = []
+    sources = {}
 
-                # Type city name
-                page.fill('input[aria-label="Search for location"]', city)
-                time.sleep(2)
+    for result, cached in source_results:
+        all_restaurants.extend(result["restaurants"])
+        sources[result["source"]] = source_report(result, cached)
 
-                # Click on first suggestion
-                page.click('ul[aria-label="Location suggestions"] li:first-child')
-                time.sleep(3)
-            except Exception as e:
-                logger.warning(f"Error setting location on Uber Eats: {e}")
+    return all_restaurants, sources
 
-            # Search for food
-            try:
-                search_input = page.locator('input[aria-label="Search"]')
-                search_input.fill(food)
-                time.sleep(1)
-                page.keyboard.press('Enter')
-                time.sleep(5)
-            except Exception as e:
-                logger.warning(f"Error searching on Uber Eats: {e}")
-                # Try alternative search method
-                search_url = f'https://www.ubereats.com/in/search?q={quote(food)}'
-                page.goto(search_url, timeout=60000)
-                time.sleep(5)
-
-            # Get page content
-            html = page.content()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find restaurant cards
-            restaurant_cards = soup.select('a[data-testid="store-card"]')
-            logger.info(f"Found {len(restaurant_cards)} restaurants on Uber Eats")
-
-            for card in restaurant_cards[:10]:  # Limit to 10 restaurants
-                try:
-                    # Extract restaurant details
-                    name_elem = card.select_one('h3')
-                    name = name_elem.text.strip() if name_elem else "Unknown Restaurant"
-
-                    # Extract link
-                    restaurant_link = f"https://www.ubereats.com{card['href']}" if 'href' in card.attrs else ""
-
-                    # Extract rating
-                    rating_elem = card.select_one('div[data-testid="rating-text"]')
-                    rating = float(rating_elem.text.strip()) if rating_elem else 4.0
-
-                    # Extract delivery time
-                    time_elem = card.select_one('div[data-testid="delivery-time"]')
-                    delivery_time = time_elem.text.strip() if time_elem else "30-40 mins"
-
-                    # Extract price range
-                    price_elem = card.select_one('div[data-testid="price-range"]')
-                    price_range = price_elem.text.strip() if price_elem else "₹₹"
-
-                    # Extract cuisine
-                    cuisine_elem = card.select_one('div[data-testid="store-categories"]')
-                    cuisine = cuisine_elem.text.strip() if cuisine_elem else "Various"
-
-                    # Extract image
-                    img_elem = card.select_one('img')
-                    image_url = img_elem['src'] if img_elem and 'src' in img_elem.attrs else f"https://source.unsplash.com/random/300x300/?restaurant,{food}"
-
-                    # Generate random coordinates near the city center
-                    lat, lon = None, None
-                    if city.lower() == 'hyderabad':
-                        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'mumbai':
-                        lat, lon = 19.0760 + random.uniform(-0.05, 0.05), 72.8777 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'delhi':
-                        lat, lon = 28.6139 + random.uniform(-0.05, 0.05), 77.2090 + random.uniform(-0.05, 0.05)
-                    elif city.lower() == 'bangalore':
-                        lat, lon = 12.9716 + random.uniform(-0.05, 0.05), 77.5946 + random.uniform(-0.05, 0.05)
-                    else:
-                        lat, lon = 17.3850 + random.uniform(-0.05, 0.05), 78.4867 + random.uniform(-0.05, 0.05)
-
-                    # Calculate distance if user coordinates are provided
-                    distance_km = None
-                    if user_lat and user_lon and lat and lon:
-                        distance_km = calculate_distance(float(user_lat), float(user_lon), lat, lon)
-
-                    # Generate menu items based on food query
-                    menu_items = []
-                    if food.lower() in ['biryani', 'chicken', 'mutton']:
-                        menu_items = [
-                            {"name": "Chicken Biryani", "price": "₹249"},
-                            {"name": "Mutton Biryani", "price": "₹349"},
-                            {"name": "Chicken 65", "price": "₹199"}
-                        ]
-                    elif food.lower() in ['pizza', 'pasta', 'italian']:
-                        menu_items = [
-                            {"name": "Margherita Pizza", "price": "₹199"},
-                            {"name": "Pepperoni Pizza", "price": "₹299"},
-                            {"name": "Pasta Alfredo", "price": "₹249"}
-                        ]
-                    elif food.lower() in ['burger', 'sandwich']:
-                        menu_items = [
-                            {"name": "Chicken Burger", "price": "₹149"},
-                            {"name": "Veg Burger", "price": "₹99"},
-                            {"name": "French Fries", "price": "₹79"}
-                        ]
-                    else:
-                        menu_items = [
-                            {"name": f"{food.title()}", "price": "₹199"},
-                            {"name": f"Special {food.title()}", "price": "₹249"},
-                            {"name": "Chef's Special", "price": "₹299"}
-                        ]
-
-                    # Create restaurant object
-                    restaurant = {
-                        "restaurant": name,
-                        "redirect": restaurant_link,
-                        "rating": rating,
-                        "delivery_time": delivery_time,
-                        "price_range": price_range,
-                        "cuisine": cuisine,
-                        "address": f"{city}",  # Uber Eats doesn't show full address in search results
-                        "image_url": image_url,
-                        "platform": "Uber Eats",
-                        "latitude": lat,
-                        "longitude": lon,
-                        "distance_km": distance_km,
-                        "popular_dishes": [item["name"] for item in menu_items],
-                        "menu_items": menu_items,
-                        "offers": ["50% off up to ₹100", "Free delivery on orders above ₹199"],
-                        "restaurant_type": "both",  # Default to both veg and non-veg
-                        "health_score": random.randint(60, 90)  # Random health score between 60-90
-                    }
-
-                    restaurants.append(restaurant)
-                except Exception as e:
-                    logger.error(f"Error extracting Uber Eats restaurant: {e}")
-
-            browser.close()
-    except Exception as e:
-        logger.error(f"Error scraping Uber Eats: {e}")
+def stream_food_delivery_events(food, city, user_lat=None, user_lon=None, deadline=None):
+    """Yield a 'source' event per source as it completes, then a 'summary'"""
+    count = 0
+    sources = {}
 
-    return restaurants
+    for result, cached in iter_source_results(food, city, user_lat, user_lon, deadline):
+        count += len(result["restaurants"])
+        sources[result["source"]] = source_report(result, cached)
+        yield {"event": "source", "source": result["source"], "results": to_json(menus.attach(result["restaurants"])), **sources[result["source"]]}
 
-def scrape_all_sources(food, city, user_lat=None, user_lon=None):
-    """Scrape restaurants from all sources in parallel"""
-    all_restaurants = []
+    # If no results from scraping, use hardcoded data
+    fallback = count == 0
+    if fallback:
+        logger.warning(f"No results from scraping, using hardcoded data for '{food}' in '{city}'")
+        restaurants = get_hardcoded_restaurants(food, city, user_lat, user_lon)
+        count = len(restaurants)
+        yield {"event": "source", "source": "fallback", "results": restaurants, "count": count}
 
-    # Use ThreadPoolExecutor to run scrapers in parallel
-    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-        # Submit scraping tasks
-        swiggy_future = executor.submit(scrape_swiggy, food, city, user_lat, user_lon)
-        zomato_future = executor.submit(scrape_zomato, food, city, user_lat, user_lon)
-        eatsure_future = executor.submit(scrape_eatsure, food, city, user_lat, user_lon)
-        ubereats_future = executor.submit(scrape_ubereats, food, city, user_lat, user_lon)
+    yield {
+        "event": "summary",
+        "count": count,
+        "query": food,
+        "city": city,
+        "sources": sources,
+        "source": "cache" if all(info["cached"] for info in sources.values()) else "scraping",
+        "fallback": fallback
+    }
+
+def search_food_delivery(food, city, user_lat=None, user_lon=None, deadline=None):
+    """Scrape restaurants for a food and city and build the API response"""
+    prewarmer.track(food, city)
+
+    # Scrape the sources that are not cached
+    restaurants, sources = scrape_all_sources(food, city, user_lat, user_lon, deadline)
+    return food_delivery_response(food, city, restaurants, sources, user_lat, user_lon)
+
+def food_delivery_response(food, city, restaurants, sources, user_lat=None, user_lon=None):
+    """Build the API response for a food and city, falling back to hardcoded data
+
+    Scraped restaurants get their menus when they are cached, and queue
+    them otherwise (see scraper_menus).
+    """
+    from_cache = all(info["cached"] for info in sources.values())
+    if from_cache:
+        logger.info(f"Returning cached results for '{food}' in '{city}'")
 
-        # Get results as they complete
-        for future in concurrent.futures.as_completed([swiggy_future, zomato_future, eatsure_future, ubereats_future]):
+    restaurants = to_json(menus.attach(restaurants))
+
+    # If no results from scraping, use hardcoded data
+    if not restaurants:
+        logger.warning(f"No results from scraping, using hardcoded data for '{food}' in '{city}'")
+        restaurants = get_hardcoded_restaurants(food, city, user_lat, user_lon)
+
+    return {
+        "results": restaurants,
+        "count": len(restaurants),
+        "query": food,
+        "city": city,
+        "sources": sources,
+        "source": "cache" if from_cache else "scraping"
+    }
+
+def search_food_delivery_batch(pairs, user_lat=None, user_lon=None, deadline=None):
+    """Scrape restaurants for several (food, city) pairs, in the same order
+
+    Like iter_source_results, cached sources are served from the cache and
+    stale ones refreshed in the background, but each source is scraped once
+    per city for all the foods it is missing there, on the shared executor,
+    so it sets the delivery location in one browser session per city.
+    Batch scrapes are not shared with concurrent requests.
+    """
+    deadline = deadline or Deadline(DEFAULT_DEADLINE)
+    found = {pair: {} for pair in pairs}
+    missing = {}
+    for food, city in pairs:
+        prewarmer.track(food, city)
+        for key in FOOD_DELIVERY_SOURCES:
+            cached, fresh_until = get_fresh(cache, source_cache_key(key, food, city))
+            if cached is None:
+                missing.setdefault((key, city), []).append(food)
+                continue
+            if fresh_until <= time.time():
+                revalidate_source(key, food, city, user_lat, user_lon)
+            found[(food, city)][key] = (cached, True)
+
+    # Skip sources that keep failing, and submit the most useful ones first
+    pending, skipped = plan_sources("food_delivery", list(dict.fromkeys(key for key, city in missing)))
+    for key in skipped:
+        logger.info(f"Skipping {FOOD_DELIVERY_SOURCES[key]['name']}, it has been failing or finding nothing")
+    for (key, city), foods in missing.items():
+        if key in skipped:
+            for food in foods:
+                found[(food, city)][key] = (unscraped_result(key, SOURCE_SKIPPED), False)
+
+    futures = {}
+    for key in pending:
+        for city in [city for group_key, city in missing if group_key == key]:
+            try:
+                future = scrape_executor.submit(scrape_and_cache_batch, key, missing[(key, city)], city, user_lat, user_lon, deadline)
+                futures[future] = (key, city)
+            except ExecutorSaturated:
+                logger.warning(f"Scrape queue is full, skipping {FOOD_DELIVERY_SOURCES[key]['name']} in {city}")
+                for food in missing[(key, city)]:
+                    found[(food, city)][key] = (unscraped_result(key, SOURCE_REJECTED), False)
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=deadline.remaining()):
+            key, city = futures.pop(future)
             try:
-                restaurants = future.result()
-                all_restaurants.extend(restaurants)
+                results = future.result()
             except Exception as e:
                 logger.error(f"Error in scraper thread: {e}")
+                results = {food: unscraped_result(key, SOURCE_ERROR) for food in missing[(key, city)]}
+            for food, result in results.items():
+                found[(food, city)][key] = (result, False)
+    except concurrent.futures.TimeoutError:
+        logger.warning(f"Deadline reached for a batch of {len(pairs)} foods, returning partial results")
+        for key, city in futures.values():
+            for food in missing[(key, city)]:
+                found[(food, city)][key] = (unscraped_result(key), False)
+    finally:
+        # Drop scrapes still queued; running ones stop at their next wait
+        for future in futures:
+            future.cancel()
+
+    return [
+        food_delivery_response(food, city, *merge_source_results(found[(food, city)].values()), user_lat, user_lon)
+        for food, city in pairs
+    ]
 
-    return all_restaurants
+def run_scrape_job(params):
+    """Run a food delivery scrape job (see scrape_jobs)"""
+    return search_food_delivery(
+        params["food"], params["city"], params.get("lat"), params.get("lon"),
+        Deadline(parse_deadline(params.get("deadline")))
+    )
 
 @app.route('/api/food-delivery/scrape', methods=['GET'])
 def scrape_food_delivery():
@@ -740,31 +1165,54 @@ def scrape_food_delivery():
     if not food or not city:
         return jsonify({"error": "Both food and city parameters are required"}), 400
 
-    # Check cache
-    cache_key = f"food_delivery_{food}_{city}"
-    if cache_key in cache["data"] and time.time() - cache["timestamp"].get(cache_key, 0) < CACHE_EXPIRY:
-        logger.info(f"Returning cached results for '{food}' in '{city}'")
-        return jsonify({"results": cache["data"][cache_key], "source": "cache"})
+    deadline = Deadline(parse_deadline(request.args.get('deadline')))
+    return jsonify(search_food_delivery(food, city, user_lat, user_lon, deadline))
 
-    # Scrape restaurants
-    restaurants = scrape_all_sources(food, city, user_lat, user_lon)
+@app.route('/api/food-delivery/scrape/stream', methods=['GET'])
+def stream_food_delivery():
+    """API endpoint that streams restaurants as each source completes
 
-    # If no results from scraping, use hardcoded data
-    if not restaurants:
-        logger.warning(f"No results from scraping, using hardcoded data for '{food}' in '{city}'")
-        restaurants = get_hardcoded_restaurants(food, city, user_lat, user_lon)
+    Emits NDJSON by default, or Server-Sent Events with format=sse.
+    """
+    food = request.args.get('food', '')
+    city = request.args.get('city', '')
+    user_lat = request.args.get('lat')
+    user_lon = request.args.get('lon')
 
-    # Update cache
-    cache["data"][cache_key] = restaurants
-    cache["timestamp"][cache_key] = time.time()
+    if not food or not city:
+        return jsonify({"error": "Both food and city parameters are required"}), 400
 
-    return jsonify({
-        "results": restaurants,
-        "count": len(restaurants),
-        "query": food,
-        "city": city,
-        "source": "scraping"
-    })
+    deadline = Deadline(parse_deadline(request.args.get('deadline')))
+    prewarmer.track(food, city)
+    events = stream_food_delivery_events(food, city, user_lat, user_lon, deadline)
+    return stream_response(events, request.args.get('format', STREAM_NDJSON))
+
+@app.route('/api/food-delivery/scrape/batch', methods=['POST'])
+def scrape_food_delivery_batch():
+    """API endpoint to scrape food delivery options for a list of foods
+
+    Takes {"items": [{"food": ..., "city": ...}, ...], "lat": ..., "lon": ...}
+    and returns one response per pair, in the same order. The deadline
+    defaults to the single query deadline per pair, capped at the maximum
+    deadline.
+    """
+    body = request.get_json(silent=True) or {}
+    items = body.get('items')
+
+    if not isinstance(items, list) or not items or not all(
+        isinstance(item, dict) and isinstance(item.get('food'), str) and isinstance(item.get('city'), str)
+        and item['food'].strip() and item['city'].strip()
+        for item in items
+    ):
+        return jsonify({"error": "Body must have a non-empty 'items' list of objects with food and city"}), 400
+    # Repeated pairs are scraped once
+    pairs = list(dict.fromkeys((item['food'].strip(), item['city'].strip()) for item in items))
+    if len(pairs) > BATCH_MAX_QUERIES:
+        return jsonify({"error": f"At most {BATCH_MAX_QUERIES} items per batch"}), 400
+
+    deadline = Deadline(parse_deadline(body.get('deadline', DEFAULT_DEADLINE * len(pairs))))
+    results = search_food_delivery_batch(pairs, body.get('lat'), body.get('lon'), deadline)
+    return jsonify({"results": results, "count": len(results)})
 
 def get_hardcoded_restaurants(food, city, user_lat=None, user_lon=None):
     """Get hardcoded restaurant data for fallback"""
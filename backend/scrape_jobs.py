@@ -0,0 +1,198 @@
+"""
+Async scrape jobs for the SafeBite scrapers
+
+Instead of scraping inside the request handler, a client can submit a job
+and poll for its result, keeping web workers free for fast endpoints:
+
+    POST /api/scrape-jobs         {"type": "grocery", "params": {"q": "milk"}}
+                                  -> 202 {"id": ..., "status": "queued"}
+    GET  /api/scrape-jobs/<id>    -> {"id": ..., "status": "done", "result": {...}}
+
+Job types:
+- grocery: q, optional sort and deadline (see enhanced_grocery_scraper)
+- food_delivery: food, city, optional lat, lon and deadline (see
+  food_delivery_scraper)
+- swiggy_crawl: query, city (see swiggy_scraper)
+
+Required params must be non-empty strings and numeric params numbers (or
+numeric strings); other jobs are rejected with 400 before they are queued.
+
+Jobs run on a bounded pool of SCRAPE_JOB_WORKERS threads per process. When
+SCRAPE_JOB_QUEUE_DEPTH jobs are already waiting, new jobs are rejected with
+429. Job state is kept in its own store on the scrape cache's backend (see
+scraper_cache.open_cache), so any worker can answer a poll and a busy scrape
+cache never evicts a job. The store holds up to SCRAPE_JOB_MAX_STORED jobs
+for SCRAPE_JOB_TTL seconds each.
+"""
+
+import os
+import sys
+import time
+import uuid
+import logging
+import importlib
+import threading
+import concurrent.futures
+from flask import Blueprint, request, jsonify
+from scraper_cache import open_cache
+
+logger = logging.getLogger('scrape-jobs')
+
+JOB_WORKERS = int(os.environ.get('SCRAPE_JOB_WORKERS', 2))
+JOB_QUEUE_DEPTH = int(os.environ.get('SCRAPE_JOB_QUEUE_DEPTH', 20))
+JOB_TTL = int(os.environ.get('SCRAPE_JOB_TTL', 3600))  # 1 hour in seconds
+JOB_MAX_STORED = int(os.environ.get('SCRAPE_JOB_MAX_STORED', 10000))
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+# Job runners are imported on first use, so every app that registers the
+# blueprint can run every job type
+JOB_TYPES = {
+    "grocery": {
+        "runner": "enhanced_grocery_scraper:run_scrape_job",
+        "required": ["q"], "strings": ["sort"], "numbers": ["deadline"]
+    },
+    "food_delivery": {
+        "runner": "food_delivery_scraper:run_scrape_job",
+        "required": ["food", "city"], "strings": [], "numbers": ["lat", "lon", "deadline"]
+    },
+    "swiggy_crawl": {
+        "runner": "swiggy_scraper:run_crawl_job",
+        "required": ["query", "city"], "strings": [], "numbers": []
+    }
+}
+
+scrape_jobs = Blueprint('scrape_jobs', __name__)
+
+_executor = None
+_active_jobs = 0
+_jobs_lock = threading.Lock()
+_store = None
+_store_lock = threading.Lock()
+
+def job_key(job_id):
+    return f"scrape_job:{job_id}"
+
+def get_job_store():
+    """Return the process-wide job store, opened on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = open_cache('scrape_jobs', JOB_MAX_STORED)
+        return _store
+
+def save_job(job):
+    get_job_store().set(job_key(job["id"]), job, JOB_TTL)
+
+def is_number(value):
+    """Whether a param is a number or a string holding one"""
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    try:
+        float(value)
+        return isinstance(value, str)
+    except (TypeError, ValueError):
+        return False
+
+def invalid_params(job_type, params):
+    """Describe what is wrong with a job's params, or None when they are valid"""
+    spec = JOB_TYPES[job_type]
+    missing = [name for name in spec["required"] if not isinstance(params.get(name), str) or not params[name].strip()]
+    if missing:
+        return f"Parameters must be non-empty strings: {', '.join(missing)}"
+    not_strings = [name for name in spec["strings"] if params.get(name) is not None and not isinstance(params[name], str)]
+    if not_strings:
+        return f"Parameters must be strings: {', '.join(not_strings)}"
+    not_numbers = [name for name in spec["numbers"] if params.get(name) is not None and not is_number(params[name])]
+    if not_numbers:
+        return f"Parameters must be numbers: {', '.join(not_numbers)}"
+    return None
+
+def load_runner(job_type):
+    """Import the function that runs a job type"""
+    module_name, function_name = JOB_TYPES[job_type]["runner"].split(':')
+    # Reuse the running script rather than importing a second copy of it
+    main = sys.modules.get('__main__')
+    main_file = getattr(main, '__file__', None) or ''
+    if os.path.splitext(os.path.basename(main_file))[0] == module_name:
+        return getattr(main, function_name)
+    return getattr(importlib.import_module(module_name), function_name)
+
+def run_job(job):
+    """Run a job and record its result"""
+    global _active_jobs
+    try:
+        job.update(status=JOB_RUNNING, started_at=time.time())
+        save_job(job)
+        job["result"] = load_runner(job["type"])(job["params"])
+        job["status"] = JOB_DONE
+    except Exception as e:
+        logger.error(f"Scrape job {job['id']} failed: {e}")
+        job.update(status=JOB_FAILED, error=str(e))
+    finally:
+        job["finished_at"] = time.time()
+        save_job(job)
+        with _jobs_lock:
+            _active_jobs -= 1
+
+def submit_job(job_type, params):
+    """Queue a job, or return None when the queue is full"""
+    global _executor, _active_jobs
+    with _jobs_lock:
+        if _active_jobs >= JOB_WORKERS + JOB_QUEUE_DEPTH:
+            return None
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=JOB_WORKERS, thread_name_prefix='scrape-job'
+            )
+        _active_jobs += 1
+
+    job = {
+        "id": uuid.uuid4().hex,
+        "type": job_type,
+        "params": params,
+        "status": JOB_QUEUED,
+        "created_at": time.time()
+    }
+    save_job(job)
+    _executor.submit(run_job, dict(job))
+    logger.info(f"Queued {job_type} scrape job {job['id']}")
+    return job
+
+@scrape_jobs.route('/api/scrape-jobs', methods=['POST'])
+def create_scrape_job():
+    """API endpoint to queue a scrape job"""
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    job_type = body.get('type')
+    params = body.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({"error": "params must be a JSON object"}), 400
+
+    if not isinstance(job_type, str) or job_type not in JOB_TYPES:
+        return jsonify({"error": f"Job type must be one of: {', '.join(JOB_TYPES)}"}), 400
+    error = invalid_params(job_type, params)
+    if error:
+        return jsonify({"error": error}), 400
+
+    job = submit_job(job_type, params)
+    if job is None:
+        response = jsonify({"error": "Too many scrape jobs queued, try again later"})
+        response.headers['Retry-After'] = '10'
+        return response, 429
+
+    return jsonify(job), 202
+
+@scrape_jobs.route('/api/scrape-jobs/<job_id>', methods=['GET'])
+def get_scrape_job(job_id):
+    """API endpoint to poll a scrape job's status and result"""
+    job = get_job_store().get(job_key(job_id))
+    if job is None:
+        return jsonify({"error": "Scrape job not found"}), 404
+    return jsonify(job)
@@ -0,0 +1,241 @@
+"""
+Archive of raw scraped pages for offline re-parsing
+
+When a site changes its markup and a selector breaks, the pages scraped
+in the meantime are lost. With SCRAPER_ARCHIVE=1 every page a scrape
+fetches (the HTTP response, or the rendered page.content() of the browser
+path) is stored in SCRAPER_ARCHIVE_DIR:
+
+- pages/<hash[:2]>/<hash>.html.zst: the page HTML, zstd-compressed and
+  stored once per content hash, so pages that do not change between
+  scrapes cost nothing extra
+- archive.sqlite3: one row per fetch with the scraper, source, scrape
+  parameters, URL, fetch path and time, pointing at the page's hash
+
+Archiving the browser path costs one page.content() per scrape. It needs
+the zstandard package; with SCRAPER_ARCHIVE=1 and no zstandard the
+scrapers fail at import instead of losing every page.
+
+After fixing a site's selectors, re-run the extraction over the archive:
+
+    python scraper_archive.py reparse --scraper grocery --source blinkit \\
+        --since 2024-05-01 --output products.jsonl --backfill
+
+--backfill writes every result that found items back into the scraped
+products database (see scraper_store) as seen when the page was fetched,
+and into the scrape cache for what is left of the source's TTL since then
+(pages older than the TTL are not cached); no browser is launched. The
+command waits up to BACKFILL_FLUSH_TIMEOUT seconds for the database writes
+to finish before it exits.
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import importlib
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from scraper_records import to_json
+import scraper_store
+
+logger = logging.getLogger('scraper-archive')
+
+ARCHIVE_ENABLED = os.environ.get('SCRAPER_ARCHIVE', '0') == '1'
+ARCHIVE_DIR = os.environ.get(
+    'SCRAPER_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+)
+ARCHIVE_LEVEL = int(os.environ.get('SCRAPER_ARCHIVE_LEVEL', 10))
+# Seconds the reparse command waits for backfilled products to be written
+BACKFILL_FLUSH_TIMEOUT = float(os.environ.get('SCRAPER_BACKFILL_FLUSH_TIMEOUT', 120))
+
+def load_zstandard():
+    """Import zstandard, which archiving needs but the scrapers do not"""
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Archiving scraped pages needs the zstandard package (pip install zstandard)")
+    return zstandard
+
+# Checked once at startup rather than failing on every archived page
+if ARCHIVE_ENABLED:
+    load_zstandard()
+
+# How to re-parse and backfill each scraper's sources. 'params' are the
+# scrape parameters passed to a site's parse function after the page and
+# 'cache_params' the ones its source_cache_key takes after the source.
+ARCHIVE_SCRAPERS = {
+    "grocery": {
+        "module": "enhanced_grocery_scraper",
+        "sources": "GROCERY_SOURCES",
+        "items": "products",
+        "params": (),
+        "cache_params": ("query",)
+    },
+    "food_delivery": {
+        "module": "food_delivery_scraper",
+        "sources": "FOOD_DELIVERY_SOURCES",
+        "items": "restaurants",
+        "params": ("food", "city", "user_lat", "user_lon"),
+        "cache_params": ("food", "city")
+    }
+}
+
+_local = threading.local()
+
+@contextmanager
+def archive_scope(scraper, source, params):
+    """Label the pages fetched on this thread with the scrape they belong to"""
+    previous = getattr(_local, 'scope', None)
+    _local.scope = (scraper, source, params)
+    try:
+        yield
+    finally:
+        _local.scope = previous
+
+def archiving():
+    """Whether pages fetched on this thread are archived"""
+    return ARCHIVE_ENABLED and getattr(_local, 'scope', None) is not None
+
+def _connection():
+    # One connection per thread, like the SQLite scrape cache
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(ARCHIVE_DIR, 'archive.sqlite3'), timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS fetches ('
+            'id INTEGER PRIMARY KEY, scraper TEXT NOT NULL, source TEXT NOT NULL, '
+            'params TEXT NOT NULL, url TEXT, fetch_path TEXT NOT NULL, '
+            'content_hash TEXT NOT NULL, size INTEGER NOT NULL, fetched_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS fetches_source ON fetches (scraper, source, fetched_at)')
+        _local.conn = conn
+    return conn
+
+def page_path(content_hash):
+    return os.path.join(ARCHIVE_DIR, 'pages', content_hash[:2], f"{content_hash}.html.zst")
+
+def archive_page(url, html, fetch_path):
+    """Store a page fetched by the scrape running on this thread"""
+    if not archiving():
+        return
+    scraper, source, params = _local.scope
+    try:
+        zstandard = load_zstandard()
+        data = html.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = page_path(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written under a temporary name so readers never see a partial page
+            temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, 'wb') as f:
+                f.write(zstandard.ZstdCompressor(level=ARCHIVE_LEVEL).compress(data))
+            os.replace(temporary, path)
+        _connection().execute(
+            'INSERT INTO fetches (scraper, source, params, url, fetch_path, content_hash, size, fetched_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (scraper, source, json.dumps(params, sort_keys=True), url, fetch_path, content_hash, len(data), time.time())
+        )
+    except Exception as e:
+        logger.error(f"Error archiving {scraper} {source} page: {e}")
+
+def read_page(content_hash):
+    """Return the HTML of an archived page"""
+    zstandard = load_zstandard()
+    with open(page_path(content_hash), 'rb') as f:
+        return zstandard.ZstdDecompressor().decompress(f.read()).decode('utf-8')
+
+def archived_fetches(scraper=None, source=None, since=None):
+    """Archived fetches, oldest first, optionally filtered"""
+    query = 'SELECT scraper, source, params, url, fetch_path, content_hash, fetched_at FROM fetches WHERE 1 = 1'
+    args = []
+    if scraper:
+        query += ' AND scraper = ?'
+        args.append(scraper)
+    if source:
+        query += ' AND source = ?'
+        args.append(source)
+    if since:
+        query += ' AND fetched_at >= ?'
+        args.append(since)
+    for row in _connection().execute(query + ' ORDER BY fetched_at', args):
+        scraper_name, source_key, params, url, fetch_path, content_hash, fetched_at = row
+        yield {
+            "scraper": scraper_name, "source": source_key, "params": json.loads(params), "url": url,
+            "fetch_path": fetch_path, "content_hash": content_hash, "fetched_at": fetched_at
+        }
+
+def reparse(scraper=None, source=None, since=None, backfill=False):
+    """Re-run the current extraction over archived pages, yielding a record per page"""
+    modules = {}
+    for fetch in archived_fetches(scraper, source, since):
+        config = ARCHIVE_SCRAPERS.get(fetch["scraper"])
+        if config is None:
+            continue
+        if fetch["scraper"] not in modules:
+            modules[fetch["scraper"]] = importlib.import_module(config["module"])
+        module = modules[fetch["scraper"]]
+        site = getattr(module, config["sources"]).get(fetch["source"])
+        if site is None:
+            continue
+
+        params = fetch["params"]
+        try:
+            items = site["parse"](read_page(fetch["content_hash"]), *[params.get(name) for name in config["params"]])
+        except Exception as e:
+            logger.error(f"Error re-parsing {fetch['scraper']} {fetch['source']} page {fetch['content_hash']}: {e}")
+            continue
+
+        if backfill and items:
+            # The cache only gets what is left of the TTL since the fetch
+            remaining = fetch["fetched_at"] + site["ttl"] - time.time()
+            if remaining > 0:
+                result = {"source": fetch["source"], config["items"]: items, "fetch_path": fetch["fetch_path"], "status": "ok"}
+                cache_key = module.source_cache_key(fetch["source"], *[params.get(name) for name in config["cache_params"]])
+                module.set_fresh(module.cache, cache_key, result, remaining)
+            if fetch["scraper"] == "grocery":
+                seen = datetime.utcfromtimestamp(fetch["fetched_at"])
+                module.persist_products(fetch["source"], params.get("query"), items, seen)
+
+        yield {**fetch, "count": len(items), config["items"]: to_json(items)}
+
+def parse_since(value):
+    """Read a YYYY-MM-DD date as a timestamp"""
+    return time.mktime(time.strptime(value, '%Y-%m-%d')) if value else None
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Re-parse archived scraper pages")
+    commands = parser.add_subparsers(dest='command', required=True)
+    reparse_command = commands.add_parser('reparse', help="re-run the extraction over archived pages")
+    reparse_command.add_argument('--scraper', choices=sorted(ARCHIVE_SCRAPERS))
+    reparse_command.add_argument('--source')
+    reparse_command.add_argument('--since', help="only pages fetched on or after this date (YYYY-MM-DD)")
+    reparse_command.add_argument('--output', help="write one JSON record per page to this file instead of stdout")
+    reparse_command.add_argument('--backfill', action='store_true', help="write the results back into the scraped products database and the scrape cache")
+    args = parser.parse_args()
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    pages = items = 0
+    try:
+        for record in reparse(args.scraper, args.source, parse_since(args.since), args.backfill):
+            pages += 1
+            items += record["count"]
+            output.write(json.dumps(record, default=str) + '\n')
+    finally:
+        if args.output:
+            output.close()
+    print(f"Re-parsed {pages} archived pages into {items} items", file=sys.stderr)
+    if args.backfill:
+        pending = scraper_store.flush(BACKFILL_FLUSH_TIMEOUT)
+        if pending:
+            print(f"Gave up on {pending} product writes after {BACKFILL_FLUSH_TIMEOUT}s", file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,145 @@
+"""
+Playwright helpers shared by the SafeBite scrapers
+
+By default the card fields are read inside the page: each site's field map
+(see scraper_parsing) is evaluated with eval_on_selector_all and only a
+compact JSON array of card fields crosses into Python, instead of the
+serialized DOM from page.content(). Set SCRAPER_BROWSER_EXTRACTION=0 to
+ship the full HTML and parse it in Python.
+"""
+
+import os
+import json
+from contextlib import contextmanager, ExitStack
+from scraper_deadline import page_timeout
+from scraper_executor import page_slot
+from scraper_stats import stage, add_bytes
+from scraper_replay import install_replay
+from scraper_archive import archiving, archive_page
+from scraper_http import FETCH_PATH_BROWSER
+
+VIEWPORT = {'width': 1280, 'height': 800}
+
+BROWSER_EXTRACTION = os.environ.get('SCRAPER_BROWSER_EXTRACTION', '1') != '0'
+
+# Playwright's default timeout for navigation and actions, in milliseconds
+PAGE_TIMEOUT = 30000
+
+class BrowserUnavailable(Exception):
+    """Raised for the rest of a batch once its shared page failed to open"""
+
+# Mirrors scraper_parsing.extract_fields for field maps passed as JSON
+EXTRACT_CARDS_JS = """
+(cards, [fields, limit]) => {
+    const read = (elem, attr) => {
+        if (!elem) return null;
+        if (attr === 'text') return elem.textContent.trim();
+        return elem.getAttribute(attr);
+    };
+    const find = (card, selector, contains) => {
+        if (!selector) return card;
+        if (contains === undefined) return card.querySelector(selector);
+        return Array.from(card.querySelectorAll(selector))
+            .find(elem => elem.textContent.includes(contains)) || null;
+    };
+    const extract = (card, fields) => {
+        const values = {};
+        for (const [key, [selector, attr, contains]] of Object.entries(fields)) {
+            if (attr !== null && typeof attr === 'object') {
+                values[key] = Array.from(card.querySelectorAll(selector))
+                    .map(elem => extract(elem, attr));
+            } else {
+                values[key] = read(find(card, selector, contains), attr);
+            }
+        }
+        return values;
+    };
+    return cards.slice(0, limit).map(card => extract(card, fields));
+}
+"""
+
+@contextmanager
+def browser_page(user_agent):
+    """Launch a headless Chromium and yield a fresh page
+
+    Waits for a free page in the process's page budget first. Page actions
+    time out at the current scrape deadline at the latest. Playwright is
+    imported here so that web workers using the scraper service never load
+    it. With SCRAPER_REPLAY the page's requests are recorded or replayed
+    (see scraper_replay).
+    """
+    from playwright.sync_api import sync_playwright
+
+    with page_slot(), sync_playwright() as p:
+        with stage('browser_launch'):
+            browser = p.chromium.launch(headless=True, timeout=page_timeout(PAGE_TIMEOUT))
+        try:
+            with stage('browser_launch'):
+                page = browser.new_page(user_agent=user_agent, viewport=VIEWPORT)
+                page.set_default_timeout(page_timeout(PAGE_TIMEOUT))
+                install_replay(page)
+            yield page
+        finally:
+            browser.close()
+
+@contextmanager
+def shared_page(user_agent, warm):
+    """Yield a function returning one page that several searches share
+
+    The browser is only launched, and warm(page) only run, the first time
+    the page is asked for, so a batch whose searches are all served over
+    HTTP never starts one. If the launch or warm-up fails, later calls raise
+    BrowserUnavailable instead of launching again.
+    """
+    with ExitStack() as stack:
+        page = None
+        failure = None
+
+        def get_page():
+            nonlocal page, failure
+            if failure is not None:
+                raise BrowserUnavailable(f"Browser failed to open earlier in the batch: {failure}")
+            if page is None:
+                # A page that fails to warm up is closed straight away
+                try:
+                    with ExitStack() as opening:
+                        opened = opening.enter_context(browser_page(user_agent))
+                        warm(opened)
+                        stack.enter_context(opening.pop_all())
+                except Exception as e:
+                    failure = e
+                    raise
+                page = opened
+            return page
+
+        yield get_page
+
+def goto(page, url, stage_name, timeout=PAGE_TIMEOUT):
+    """Navigate to url as a timed scrape stage, capped at the deadline"""
+    with stage(stage_name):
+        return page.goto(url, timeout=page_timeout(timeout))
+
+def extract_cards(page, cards, fields, limit):
+    """Read the fields of up to limit cards inside the page"""
+    for selector in cards["selectors"]:
+        rows = page.eval_on_selector_all(selector, EXTRACT_CARDS_JS, [fields, limit])
+        if rows:
+            return rows
+    return []
+
+def read_results(page, cards, fields, limit):
+    """Return the extracted card rows, or the page HTML when extraction is off
+
+    The rendered page is archived when the scrape is (see scraper_archive).
+    """
+    with stage('extract'):
+        if BROWSER_EXTRACTION:
+            results = extract_cards(page, cards, fields, limit)
+            add_bytes(len(json.dumps(results)))
+        else:
+            results = page.content()
+            add_bytes(len(results.encode('utf-8')))
+    if archiving():
+        with stage('archive'):
+            archive_page(page.url, results if isinstance(results, str) else page.content(), FETCH_PATH_BROWSER)
+    return results
@@ -0,0 +1,265 @@
+"""
+Shared scrape cache for the SafeBite scrapers
+
+Scraped results are kept in a cache shared by every worker process instead
+of a per-process dict, so a query scraped by one gunicorn worker is served
+from cache by the others and survives a restart or redeploy.
+
+Backends (SCRAPER_CACHE_BACKEND):
+- sqlite (default): a local SQLite file in WAL mode, shared by all workers
+  on the host
+- redis: any Redis-protocol server (requires the redis package)
+- memory: per-process, for local development
+
+Every entry has its own TTL and the cache is bounded to
+SCRAPER_CACHE_MAX_ENTRIES entries, evicting the least recently used ones.
+The sqlite backend only records an access once per
+SCRAPER_CACHE_TOUCH_INTERVAL seconds per entry, so most hits are plain
+reads rather than write transactions the workers contend for.
+add() only stores a value when the key is absent, so it can serve as a
+lock shared by the workers. open_cache() opens another store on the same
+backend with its own bound, for state that scraped results must not evict. Values are stored in the compact binary
+encoding of scraper_records rather than as JSON.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from scraper_records import encode, decode
+
+logger = logging.getLogger('scraper-cache')
+
+CACHE_BACKEND = os.environ.get('SCRAPER_CACHE_BACKEND', 'sqlite')
+CACHE_PATH = os.environ.get(
+    'SCRAPER_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scrape_cache.sqlite3')
+)
+CACHE_MAX_ENTRIES = int(os.environ.get('SCRAPER_CACHE_MAX_ENTRIES', 5000))
+CACHE_REDIS_URL = os.environ.get('SCRAPER_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+# Seconds within which repeated hits on a sqlite entry don't update its last access
+CACHE_TOUCH_INTERVAL = float(os.environ.get('SCRAPER_CACHE_TOUCH_INTERVAL', 60))
+# Seconds a stale entry is still served while it is being refreshed
+CACHE_STALE_GRACE = int(os.environ.get('SCRAPER_CACHE_STALE_GRACE', 3600))
+
+def cache_key(*parts):
+    """Build a cache key from normalized parts (case and whitespace folded)"""
+    return '_'.join(' '.join(str(part).lower().split()) for part in parts)
+
+def set_fresh(cache, key, value, ttl, grace=CACHE_STALE_GRACE):
+    """Cache a value that is fresh for ttl seconds and can be served stale for grace more"""
+    cache.set(key, {"value": value, "fresh_until": time.time() + ttl}, ttl + grace)
+
+def get_fresh(cache, key):
+    """Return the value of a set_fresh entry and when it goes stale, or (None, 0)"""
+    entry = cache.get(key)
+    if not isinstance(entry, dict) or "fresh_until" not in entry:
+        return None, 0
+    return entry["value"], entry["fresh_until"]
+
+def encode_value(value):
+    """Serialize a cache value"""
+    return encode(value)
+
+def decode_value(data):
+    """Deserialize a cache value"""
+    return decode(data)
+
+class MemoryCache:
+    """Per-process LRU cache, for local development"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return decode_value(entry[0])
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (encode_value(value), time.time() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def add(self, key, value, ttl):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                return False
+            self.entries[key] = (encode_value(value), time.time() + ttl)
+            self.entries.move_to_end(key)
+            return True
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+class SQLiteCache:
+    """LRU cache in a SQLite file shared by every worker on the host"""
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        # Opened once here so a bad path fails in get_cache, which falls back
+        # to memory, and closed so no connection is inherited across a fork
+        self._connection().close()
+        self.local.conn = None
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads, and are
+        # opened lazily so they are never inherited across a fork
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'expires_at REAL NOT NULL, last_access REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            'SELECT value, last_access FROM entries WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[1] >= CACHE_TOUCH_INTERVAL:
+            conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+        return decode_value(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO entries (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)',
+            (key, encode_value(value), now + ttl, now)
+        )
+        self._evict(conn, now)
+
+    def add(self, key, value, ttl):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('DELETE FROM entries WHERE key = ? AND expires_at <= ?', (key, now))
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO entries (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)',
+            (key, encode_value(value), now + ttl, now)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then the least recently used beyond the bound"""
+        conn.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+        conn.execute(
+            'DELETE FROM entries WHERE key IN ('
+            'SELECT key FROM entries ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+class RedisCache:
+    """LRU cache on a Redis-protocol server shared by every worker"""
+
+    def __init__(self, url=CACHE_REDIS_URL, max_entries=CACHE_MAX_ENTRIES, lru_key='scrape-cache:lru'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.max_entries = max_entries
+        self.LRU_KEY = lru_key
+
+    def get(self, key):
+        data = self.client.get(key)
+        if data is None:
+            return None
+        self.client.zadd(self.LRU_KEY, {key: time.time()})
+        return decode_value(data)
+
+    def set(self, key, value, ttl):
+        pipe = self.client.pipeline()
+        pipe.set(key, encode_value(value), px=int(ttl * 1000))
+        pipe.zadd(self.LRU_KEY, {key: time.time()})
+        pipe.execute()
+        self._evict()
+
+    def add(self, key, value, ttl):
+        if not self.client.set(key, encode_value(value), px=int(ttl * 1000), nx=True):
+            return False
+        self.client.zadd(self.LRU_KEY, {key: time.time()})
+        return True
+
+    def delete(self, key):
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.zrem(self.LRU_KEY, key)
+        pipe.execute()
+
+    def _evict(self):
+        """Drop the least recently used keys beyond the bound"""
+        excess = self.client.zcard(self.LRU_KEY) - self.max_entries
+        if excess <= 0:
+            return
+        keys = self.client.zrange(self.LRU_KEY, 0, excess - 1)
+        if keys:
+            pipe = self.client.pipeline()
+            pipe.delete(*keys)
+            pipe.zrem(self.LRU_KEY, *keys)
+            pipe.execute()
+
+CACHE_BACKENDS = {
+    'sqlite': SQLiteCache,
+    'redis': RedisCache,
+    'memory': MemoryCache
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def open_cache(name=None, max_entries=CACHE_MAX_ENTRIES):
+    """Open a cache on the configured backend, falling back to memory
+
+    A named cache is kept apart from the scrape cache (its own SQLite file
+    next to it, or its own LRU set on Redis), so neither evicts the other's
+    entries.
+    """
+    options = {"max_entries": max_entries}
+    if name and CACHE_BACKEND == 'sqlite':
+        options["path"] = os.path.join(os.path.dirname(CACHE_PATH), f"{name}.sqlite3")
+    elif name and CACHE_BACKEND == 'redis':
+        options["lru_key"] = f"{name}:lru"
+    try:
+        cache = CACHE_BACKENDS[CACHE_BACKEND](**options)
+    except Exception as e:
+        logger.error(f"Could not open '{CACHE_BACKEND}' cache {name or 'for scraped results'}, using memory: {e}")
+        cache = MemoryCache(max_entries)
+    logger.info(f"Using {type(cache).__name__} for {name or 'scraped results'}")
+    return cache
+
+def get_cache():
+    """Return the process-wide cache for the configured backend"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = open_cache()
+    return _cache
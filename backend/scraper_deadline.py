@@ -0,0 +1,100 @@
+"""
+Request deadlines for the SafeBite scrapers
+
+A scrape request gets an end-to-end deadline (SCRAPER_DEADLINE seconds, or
+the deadline query parameter capped at SCRAPER_MAX_DEADLINE) and every
+source gets a sub-budget within it. The source's deadline is bound to the
+worker thread running it, so the waits inside the site fetches (pause,
+Playwright timeouts, HTTP timeouts) never outlive it: a source that runs
+out of time raises DeadlineExceeded at its next wait and closes its
+browser, while the request returns whatever sources finished.
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from scraper_stats import stage
+
+DEFAULT_DEADLINE = float(os.environ.get('SCRAPER_DEADLINE', 45))
+MAX_DEADLINE = float(os.environ.get('SCRAPER_MAX_DEADLINE', 120))
+DEFAULT_SOURCE_BUDGET = float(os.environ.get('SCRAPER_SOURCE_BUDGET', 30))
+
+class DeadlineExceeded(Exception):
+    """Raised when a scrape runs out of its time budget"""
+
+class Deadline:
+    """A point in time by which a scrape has to finish"""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded('Scrape deadline exceeded')
+
+    def child(self, seconds):
+        """A sub-budget of at most seconds that ends no later than this deadline"""
+        deadline = Deadline(seconds)
+        deadline.expires_at = min(deadline.expires_at, self.expires_at)
+        return deadline
+
+def parse_deadline(value):
+    """Read a deadline in seconds from a query parameter"""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_DEADLINE
+    if seconds <= 0:
+        return DEFAULT_DEADLINE
+    return min(seconds, MAX_DEADLINE)
+
+_local = threading.local()
+
+@contextmanager
+def deadline_scope(deadline):
+    """Bind a deadline to the current thread"""
+    previous = getattr(_local, 'deadline', None)
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = previous
+
+def current_deadline():
+    """Return the deadline bound to the current thread, if any"""
+    return getattr(_local, 'deadline', None)
+
+def pause(seconds):
+    """Sleep, but never past the current deadline"""
+    deadline = current_deadline()
+    with stage('sleep'):
+        if deadline is None:
+            time.sleep(seconds)
+            return
+        time.sleep(min(seconds, deadline.remaining()))
+    deadline.check()
+
+def page_timeout(ms):
+    """Cap a Playwright timeout in milliseconds at the current deadline"""
+    deadline = current_deadline()
+    if deadline is None:
+        return ms
+    deadline.check()
+    # Playwright treats 0 as no timeout
+    return max(1, min(ms, int(deadline.remaining() * 1000)))
+
+def http_timeout(timeout):
+    """Cap a (connect, read) timeout at the current deadline"""
+    deadline = current_deadline()
+    if deadline is None:
+        return timeout
+    deadline.check()
+    remaining = deadline.remaining()
+    return tuple(min(part, remaining) for part in timeout)
@@ -0,0 +1,147 @@
+"""
+Shared scrape executor for the SafeBite scrapers
+
+Every request used to fan out on its own ThreadPoolExecutor, so the number
+of concurrent browsers grew with the number of requests. All source
+scrapes in a process now run on one bounded executor:
+
+- SCRAPER_MAX_WORKERS sources are scraped at once and up to
+  SCRAPER_MAX_QUEUED more wait in the queue; beyond that new scrapes are
+  rejected (ExecutorSaturated) instead of piling up
+- at most SCRAPER_PAGE_BUDGET Playwright pages are open at once; a scrape
+  waits for a free page until its deadline (see page_slot)
+
+Queue and page waits are exposed at /api/scraper/executor.
+"""
+
+import os
+import time
+import threading
+import concurrent.futures
+from collections import deque
+from contextlib import contextmanager
+from flask import Blueprint, jsonify
+from scraper_deadline import DeadlineExceeded, current_deadline
+
+SCRAPER_MAX_WORKERS = int(os.environ.get('SCRAPER_MAX_WORKERS', 8))
+SCRAPER_MAX_QUEUED = int(os.environ.get('SCRAPER_MAX_QUEUED', 32))
+SCRAPER_PAGE_BUDGET = int(os.environ.get('SCRAPER_PAGE_BUDGET', 4))
+
+# Recent waits kept for the metrics
+WAIT_SAMPLES = 1000
+
+class ExecutorSaturated(Exception):
+    """Raised when the scrape queue is full"""
+
+def wait_summary(waits):
+    """Average, 95th percentile and max of recent waits, in seconds"""
+    if not waits:
+        return {"samples": 0, "avg": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(waits)
+    return {
+        "samples": len(ordered),
+        "avg": round(sum(ordered) / len(ordered), 3),
+        "p95": round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+        "max": round(ordered[-1], 3)
+    }
+
+class BoundedExecutor:
+    """A thread pool that rejects work once its queue is full"""
+
+    def __init__(self, max_workers=SCRAPER_MAX_WORKERS, max_queued=SCRAPER_MAX_QUEUED):
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queued
+        self.executor = None
+        self.pending = 0
+        self.running = 0
+        self.rejected = 0
+        self.queue_waits = deque(maxlen=WAIT_SAMPLES)
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ExecutorSaturated('Scrape queue is full')
+            if self.executor is None:
+                # Created on first use so the threads belong to the worker
+                # process, not a pre-fork master
+                self.executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='scrape'
+                )
+            self.pending += 1
+
+        submitted = time.monotonic()
+
+        def run():
+            with self.lock:
+                self.queue_waits.append(time.monotonic() - submitted)
+                self.running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    self.pending -= 1
+
+        future = self.executor.submit(run)
+        future.add_done_callback(self._release_cancelled)
+        return future
+
+    def _release_cancelled(self, future):
+        # A future cancelled while queued never runs, so free its slot here
+        if future.cancelled():
+            with self.lock:
+                self.pending -= 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.max_workers,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "rejected": self.rejected,
+                "queue_wait": wait_summary(self.queue_waits)
+            }
+
+scrape_executor = BoundedExecutor()
+
+_pages = threading.BoundedSemaphore(SCRAPER_PAGE_BUDGET)
+_pages_in_use = 0
+_page_waits = deque(maxlen=WAIT_SAMPLES)
+_pages_lock = threading.Lock()
+
+@contextmanager
+def page_slot():
+    """Hold one of the process's Playwright pages, waiting until the deadline"""
+    global _pages_in_use
+    deadline = current_deadline()
+    started = time.monotonic()
+    if not _pages.acquire(timeout=deadline.remaining() if deadline else None):
+        raise DeadlineExceeded('No browser page free before the deadline')
+    with _pages_lock:
+        _page_waits.append(time.monotonic() - started)
+        _pages_in_use += 1
+    try:
+        yield
+    finally:
+        with _pages_lock:
+            _pages_in_use -= 1
+        _pages.release()
+
+def executor_stats():
+    """Queue and page budget metrics of this process"""
+    with _pages_lock:
+        pages = {
+            "budget": SCRAPER_PAGE_BUDGET,
+            "in_use": _pages_in_use,
+            "wait": wait_summary(_page_waits)
+        }
+    return {"executor": scrape_executor.stats(), "pages": pages}
+
+scraper_executor = Blueprint('scraper_executor', __name__)
+
+@scraper_executor.route('/api/scraper/executor', methods=['GET'])
+def get_executor_stats():
+    """API endpoint for the scrape queue and page budget metrics"""
+    return jsonify(executor_stats())
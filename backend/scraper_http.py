@@ -0,0 +1,106 @@
+"""
+HTTP fetch helpers for the SafeBite scrapers
+
+Every site adapter can declare a lightweight HTTP fetch (a server-rendered
+search page) next to its Playwright fetch. The HTTP path goes through one
+pooled keep-alive session shared by all scraper threads, and the browser is
+only launched when that path fails, finds no cards or is marked unsupported.
+"""
+
+import os
+import logging
+import threading
+import requests
+from collections import Counter
+from requests.adapters import HTTPAdapter
+from scraper_deadline import http_timeout
+from scraper_stats import stage, add_bytes
+from scraper_parse_pool import parse_page
+from scraper_replay import REPLAY_MODE, REPLAY_RECORD, REPLAY_REPLAY, fetch_replayed, save_response
+from scraper_archive import archive_page
+
+logger = logging.getLogger('scraper-http')
+
+# (connect, read) timeouts in seconds for the HTTP path
+HTTP_TIMEOUT = (
+    float(os.environ.get('SCRAPER_HTTP_CONNECT_TIMEOUT', 3.05)),
+    float(os.environ.get('SCRAPER_HTTP_READ_TIMEOUT', 10))
+)
+HTTP_POOL_SIZE = int(os.environ.get('SCRAPER_HTTP_POOL_SIZE', 20))
+
+DEFAULT_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-IN,en;q=0.9'
+}
+
+# Values reported per source in the API responses
+FETCH_PATH_HTTP = 'http'
+FETCH_PATH_BROWSER = 'browser'
+
+# Outcome of scraping one source
+SOURCE_OK = 'ok'
+SOURCE_EMPTY = 'empty'
+SOURCE_ERROR = 'error'
+SOURCE_TIMED_OUT = 'timed_out'
+SOURCE_REJECTED = 'rejected'
+SOURCE_SKIPPED = 'skipped'
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Return the process-wide pooled HTTP session"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
+
+def fetch_html(url, user_agent=None, timeout=HTTP_TIMEOUT):
+    """Fetch a server-rendered page over the pooled session
+
+    The timeout is capped at the current scrape deadline. With
+    SCRAPER_REPLAY the page is recorded, or served from the recordings (see
+    scraper_replay).
+    """
+    headers = {'User-Agent': user_agent} if user_agent else {}
+    with stage('http'):
+        if REPLAY_MODE == REPLAY_REPLAY:
+            response = fetch_replayed(url, timeout=http_timeout(timeout))
+        else:
+            response = get_session().get(url, headers=headers, timeout=http_timeout(timeout))
+    add_bytes(len(response.content))
+    if REPLAY_MODE == REPLAY_RECORD:
+        save_response('GET', url, response.status_code, response.headers.get('content-type', ''), response.content)
+    response.raise_for_status()
+    archive_page(url, response.text, FETCH_PATH_HTTP)
+    return response.text
+
+def batch_fetch_path(fetch_paths):
+    """The fetch path that served most of a batch, or None if none served any"""
+    counts = Counter(fetch_path for fetch_path in fetch_paths if fetch_path)
+    return counts.most_common(1)[0][0] if counts else None
+
+def fetch_with_fallback(name, http_fetch, browser_fetch, parse):
+    """Parse a source from its HTTP path, falling back to the browser
+
+    http_fetch is None for sources marked unsupported. Returns a tuple of
+    (items, fetch_path) where fetch_path is the path that served the items.
+    parse may run in the parse process pool (see scraper_parse_pool).
+    """
+    if http_fetch is not None:
+        try:
+            items = parse_page(parse, http_fetch())
+            if items:
+                return items, FETCH_PATH_HTTP
+            logger.info(f"HTTP path found no cards on {name}, falling back to browser")
+        except Exception as e:
+            logger.warning(f"HTTP path failed for {name}, falling back to browser: {e}")
+
+    return parse_page(parse, browser_fetch()), FETCH_PATH_BROWSER
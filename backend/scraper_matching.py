@@ -0,0 +1,116 @@
+"""
+Cross-platform product matching for the SafeBite grocery scraper
+
+The grocery sources return the same item ("Amul Taaza Milk 500ml") as
+separate products from Blinkit, Zepto, BigBasket and the rest.
+group_products() resolves them into one listing per item with the price
+on every platform.
+
+Products are first split into blocks by a blocking key of their
+normalized brand and size, so only products that could be the same item
+are ever compared; within a block, products whose name tokens overlap by
+at least MATCH_THRESHOLD (Jaccard) are merged. Blocks stay small, so
+matching grows near-linearly with the number of sources and results.
+Products are expected to be normalized by scraper_units first.
+"""
+
+import re
+from collections import defaultdict
+from scraper_units import QUANTITY_PATTERN
+
+# Share of name tokens two products must have in common to be merged
+MATCH_THRESHOLD = 0.6
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+# Words that say nothing about which item a product is
+STOP_TOKENS = {'of', 'and', 'the', 'with', 'pack', 'pouch', 'bottle', 'fresh', 'new'}
+
+def name_tokens(product, brand):
+    """The distinguishing words of a product name, without its brand and size"""
+    name = QUANTITY_PATTERN.sub(' ', (product.get("name") or '').lower())
+    return frozenset(
+        token for token in TOKEN_PATTERN.findall(name)
+        if token not in STOP_TOKENS and token not in brand and not token.isdigit()
+    )
+
+def blocking_key(product):
+    """(brand, size) a product is compared within"""
+    brand = ' '.join(TOKEN_PATTERN.findall((product.get("brand") or '').lower()))
+    quantity = product.get("quantity")
+    size = f"{round(quantity, 1):g}{product.get('unit')}" if quantity else None
+    return brand, size
+
+def similarity(tokens, other):
+    """Jaccard overlap of two token sets"""
+    if not tokens or not other:
+        return 0.0
+    return len(tokens & other) / len(tokens | other)
+
+def match_block(products, tokens):
+    """Cluster the products of one block, returning lists of indexes"""
+    parent = list(range(len(products)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for i in range(len(products)):
+        for j in range(i + 1, len(products)):
+            if similarity(tokens[i], tokens[j]) >= MATCH_THRESHOLD:
+                parent[find(j)] = find(i)
+
+    clusters = defaultdict(list)
+    for index in range(len(products)):
+        clusters[find(index)].append(index)
+    return list(clusters.values())
+
+def build_listing(products):
+    """One listing for a group of equivalent products"""
+    offers = [
+        {
+            "platform": product.get("platform") or product.get("source"),
+            "_id": product.get("_id"),
+            "price": product.get("price"),
+            "sale_price": product.get("sale_price"),
+            "price_per_unit": product.get("price_per_unit"),
+            "redirect": product.get("redirect"),
+            "in_stock": product.get("in_stock", True)
+        }
+        for product in products
+    ]
+    offers.sort(key=lambda offer: offer["sale_price"] or offer["price"] or float('inf'))
+    first = products[0]
+    return {
+        "name": first.get("name"),
+        "brand": first.get("brand"),
+        "weight": first.get("weight"),
+        "quantity": first.get("quantity"),
+        "unit": first.get("unit"),
+        "image_url": next((product["image_url"] for product in products if product.get("image_url")), ""),
+        "platforms": len({offer["platform"] for offer in offers}),
+        "best_price": offers[0]["sale_price"] or offers[0]["price"],
+        "best_platform": offers[0]["platform"],
+        "offers": offers
+    }
+
+def group_products(products):
+    """Group equivalent products across sources into listings
+
+    Listings keep the order of their first product.
+    """
+    blocks = defaultdict(list)
+    for index, product in enumerate(products):
+        blocks[blocking_key(product)].append(index)
+
+    groups = []
+    for (brand, size), indexes in blocks.items():
+        brand_tokens = set(brand.split())
+        block = [products[index] for index in indexes]
+        tokens = [name_tokens(product, brand_tokens) for product in block]
+        for cluster in match_block(block, tokens):
+            groups.append([indexes[position] for position in cluster])
+
+    groups.sort(key=min)
+    return [build_listing([products[index] for index in group]) for group in groups]
@@ -0,0 +1,190 @@
+"""
+Background menu enrichment for the SafeBite food delivery scraper
+
+Search result cards do not list a restaurant's dishes, and visiting every
+restaurant page inside a search would multiply its latency. Menus are
+instead scraped off the request path by a MenuEnricher:
+
+- attach() fills in the menu of every restaurant whose menu page is
+  cached, and queues the rest, so a search never waits for a menu page
+- each menu page is cached on its own by restaurant URL for the site's
+  'menu_ttl' (SCRAPER_MENU_TTL by default), so a restaurant found by many
+  searches is only visited once per TTL, and a lock entry in the shared
+  cache keeps two workers from scraping the same page at once
+- each site has its own small pool of 'menu_concurrency' threads, so one
+  slow or blocking site cannot hold up the others or take more than its
+  share of the browser page budget (see scraper_executor.page_slot), or of
+  the scraper service when one is configured
+- at most SCRAPER_MENU_MAX_QUEUED menu pages wait per site; further misses
+  are dropped and queued again by the next search that finds them
+
+Restaurants carry "menu_source": "menu" once a real menu was attached, or
+"estimated" while they still show the dishes guessed from the search.
+Queue and cache metrics are exposed at /api/scraper/menus.
+"""
+
+import os
+import time
+import logging
+import threading
+import concurrent.futures
+from flask import Blueprint, jsonify
+from scraper_cache import cache_key, get_fresh, set_fresh
+from scraper_deadline import Deadline
+
+logger = logging.getLogger('scraper-menus')
+
+MENUS_ENABLED = os.environ.get('SCRAPER_MENUS', '1') != '0'
+MENU_TTL = int(os.environ.get('SCRAPER_MENU_TTL', 6 * 3600))
+# Menu pages that could not be read are retried after this many seconds
+MENU_NEGATIVE_TTL = int(os.environ.get('SCRAPER_MENU_NEGATIVE_TTL', 600))
+MENU_CONCURRENCY = int(os.environ.get('SCRAPER_MENU_CONCURRENCY', 2))
+MENU_MAX_QUEUED = int(os.environ.get('SCRAPER_MENU_MAX_QUEUED', 50))
+# Most seconds one menu page may take
+MENU_BUDGET = float(os.environ.get('SCRAPER_MENU_BUDGET', 30))
+# Seconds a menu lock outlives the budget, in case its worker dies
+MENU_LOCK_GRACE = 5
+MENU_MAX_ITEMS = int(os.environ.get('SCRAPER_MENU_MAX_ITEMS', 10))
+
+MENU_SOURCE_MENU = 'menu'
+MENU_SOURCE_ESTIMATED = 'estimated'
+
+def menu_cache_key(scraper, url):
+    """Cache key for the menu at a restaurant URL"""
+    return cache_key(scraper, "menu", url)
+
+class MenuEnricher:
+    """Attach cached menus to restaurants and scrape missing ones in the background
+
+    sites maps each source key to its adapter; sources with a 'menu' fetch
+    are enriched, with at most 'menu_concurrency' menu pages scraped at
+    once. scrape_menu(key, url, deadline) returns a source result whose
+    "menu" is a list of {"name", "price"} items.
+    """
+
+    def __init__(self, scraper, cache, sites, scrape_menu, platform_key="platform"):
+        self.scraper = scraper
+        self.cache = cache
+        self.sites = {key: site for key, site in sites.items() if site.get("menu")}
+        self.scrape_menu = scrape_menu
+        self.keys_by_platform = {site["name"]: key for key, site in self.sites.items()}
+        self.platform_key = platform_key
+        self.executors = {}
+        self.queued = {key: 0 for key in self.sites}
+        self.dropped = {key: 0 for key in self.sites}
+        self.inflight = set()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def attach(self, restaurants):
+        """Return copies of restaurants with their cached menus, queueing the misses"""
+        if not MENUS_ENABLED:
+            return restaurants
+        enriched = []
+        for restaurant in restaurants:
+            key = self.keys_by_platform.get(restaurant.get(self.platform_key))
+            url = restaurant.get("redirect")
+            if key is None or not url:
+                enriched.append(restaurant)
+                continue
+
+            menu, fresh_until = get_fresh(self.cache, menu_cache_key(self.scraper, url))
+            if fresh_until <= time.time():
+                self.submit(key, url)
+            if menu:
+                with self.lock:
+                    self.hits += 1
+                enriched.append({
+                    **restaurant,
+                    "menu_items": menu,
+                    "popular_dishes": [item["name"] for item in menu[:3]],
+                    "menu_source": MENU_SOURCE_MENU
+                })
+            else:
+                with self.lock:
+                    self.misses += 1
+                enriched.append({**restaurant, "menu_source": MENU_SOURCE_ESTIMATED})
+        return enriched
+
+    def submit(self, key, url):
+        """Queue a menu page on its site's pool unless it is queued already or the pool is full"""
+        with self.lock:
+            if url in self.inflight:
+                return False
+            if self.queued[key] >= MENU_MAX_QUEUED:
+                self.dropped[key] += 1
+                return False
+            executor = self.executors.get(key)
+            if executor is None:
+                # Created on first use so the threads belong to the worker
+                # process, not a pre-fork master
+                executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.sites[key].get("menu_concurrency", MENU_CONCURRENCY),
+                    thread_name_prefix=f'menu-{key}'
+                )
+                self.executors[key] = executor
+            self.inflight.add(url)
+            self.queued[key] += 1
+
+        def run():
+            try:
+                self.scrape(key, url)
+            finally:
+                with self.lock:
+                    self.inflight.discard(url)
+                    self.queued[key] -= 1
+
+        executor.submit(run)
+        return True
+
+    def scrape(self, key, url):
+        """Scrape one menu page and cache it, unless another worker is scraping it"""
+        site = self.sites[key]
+        lock_key = f"{menu_cache_key(self.scraper, url)}:lock"
+        if not self.cache.add(lock_key, os.getpid(), MENU_BUDGET + MENU_LOCK_GRACE):
+            return None
+        try:
+            try:
+                menu = self.scrape_menu(key, url, Deadline(MENU_BUDGET))["menu"]
+            except Exception as e:
+                logger.error(f"Error scraping {site['name']} menu {url}: {e}")
+                menu = []
+            # Cached before the lock is released, so no worker scrapes it again
+            if menu:
+                set_fresh(self.cache, menu_cache_key(self.scraper, url), menu, site.get("menu_ttl", MENU_TTL))
+            else:
+                set_fresh(self.cache, menu_cache_key(self.scraper, url), [], MENU_NEGATIVE_TTL, grace=0)
+            return menu
+        finally:
+            self.cache.delete(lock_key)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "enabled": MENUS_ENABLED,
+                "hits": self.hits,
+                "misses": self.misses,
+                "sites": {
+                    key: {
+                        "concurrency": site.get("menu_concurrency", MENU_CONCURRENCY),
+                        "queued": self.queued[key],
+                        "dropped": self.dropped[key]
+                    }
+                    for key, site in self.sites.items()
+                }
+            }
+
+_enrichers = []
+
+def register_enricher(enricher):
+    """Expose an enricher's metrics at /api/scraper/menus"""
+    _enrichers.append(enricher)
+    return enricher
+
+scraper_menus = Blueprint('scraper_menus', __name__)
+
+@scraper_menus.route('/api/scraper/menus', methods=['GET'])
+def get_menu_stats():
+    """API endpoint for the menu enrichment queues and cache hit rates"""
+    return jsonify({enricher.scraper: enricher.stats() for enricher in _enrichers})
@@ -0,0 +1,73 @@
+"""
+Process pool for parsing scraped pages in the SafeBite scrapers
+
+Building cards from page HTML (BeautifulSoup selectors, price and weight
+regexes) is CPU-bound, so when several sources are scraped at once their
+parse steps contend for the GIL on the scraper threads. With
+SCRAPER_PARSE_POOL=1 the parse of raw HTML runs in a pool of
+SCRAPER_PARSE_PROCESSES worker processes (the core count by default)
+while page fetches stay on the threads. Card rows that were already
+extracted inside the browser are small and are still built in-thread.
+
+Parse functions must be picklable: module-level functions, or
+functools.partial objects wrapping them.
+"""
+
+import os
+import logging
+import threading
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from scraper_deadline import DeadlineExceeded, current_deadline
+from scraper_stats import stage
+
+logger = logging.getLogger('scraper-parse-pool')
+
+PARSE_POOL_ENABLED = os.environ.get('SCRAPER_PARSE_POOL', '0') == '1'
+PARSE_PROCESSES = int(os.environ.get('SCRAPER_PARSE_PROCESSES', os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_parse_pool():
+    """Return the process's parse pool, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned rather than forked: the scraper process runs threads
+            # (and Playwright's) that a forked child must not inherit
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=PARSE_PROCESSES, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+def reset_parse_pool(pool):
+    """Drop a broken pool so the next parse starts a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+def parse_page(parse, page_data):
+    """Run a site's parse function, in the parse pool for raw HTML
+
+    Waits for the worker no longer than the current scrape deadline.
+    """
+    if not PARSE_POOL_ENABLED or not isinstance(page_data, str):
+        return parse(page_data)
+
+    deadline = current_deadline()
+    pool = get_parse_pool()
+    with stage('parse'):
+        try:
+            future = pool.submit(parse, page_data)
+            return future.result(timeout=deadline.remaining() if deadline else None)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise DeadlineExceeded('Parse did not finish before the deadline')
+        except BrokenProcessPool as e:
+            logger.error(f"Parse pool failed, parsing in-thread: {e}")
+            reset_parse_pool(pool)
+    return parse(page_data)
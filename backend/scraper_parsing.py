@@ -0,0 +1,151 @@
+"""
+HTML parsing helpers for the SafeBite scrapers
+
+Pages are parsed with lxml when it is installed, falling back to Python's
+html.parser, and only the product or restaurant card subtrees are built:
+a SoupStrainer derived from each site's card selectors drops the rest of
+the page while it is being parsed. Card and field selectors are compiled
+once at import with soupsieve instead of on every select call.
+
+A site describes its cards with compile_cards() and the fields it reads
+from each card with a field map:
+
+    {"name": ('div.prod-name', 'text'),           # stripped text or None
+     "image": ('img', 'src'),                     # attribute value or None
+     "rating": ('span', 'text', '★'),             # first match containing '★'
+     "link": (None, 'href'),                      # attribute of the card itself
+     "menu": ('div.menu-item', {"name": ('div.item-name', 'text')})}  # list of sub-records
+"""
+
+import re
+import soupsieve as sv
+from bs4 import BeautifulSoup, SoupStrainer
+from scraper_stats import stage
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Simple card selectors that can be turned into a SoupStrainer pattern:
+# tag.class or tag[attr="value"]
+STRAINABLE_SELECTOR = re.compile(r'^(\w+)(?:\.([\w-]+)|\[([\w-]+)="([^"]*)"\])')
+
+def _strainer_pattern(selector):
+    """Return the (tag, attribute, value) pattern for a simple card selector"""
+    match = STRAINABLE_SELECTOR.match(selector.strip())
+    if not match:
+        return None
+    tag, css_class, attr, value = match.groups()
+    if css_class:
+        return tag, 'class', css_class
+    return tag, attr, value
+
+def card_strainer(selectors):
+    """Build a SoupStrainer that keeps only the subtrees of possible cards
+
+    Returns None when any selector is too complex to strain on, in which
+    case the whole page is parsed.
+    """
+    patterns = []
+    for selector in selectors:
+        for part in selector.split(','):
+            pattern = _strainer_pattern(part)
+            if pattern is None:
+                return None
+            patterns.append(pattern)
+
+    tags = sorted({tag for tag, attr, value in patterns})
+    attr_names = {attr for tag, attr, value in patterns}
+    if len(attr_names) == 1:
+        attr = attr_names.pop()
+        return SoupStrainer(tags, attrs={attr: _value_matcher(attr, [value for tag, attr, value in patterns])})
+
+    def match(name, attrs=None):
+        # Newer bs4 releases only pass the tag name to a callable strainer
+        if attrs is None:
+            return name in tags
+        return any(
+            name == tag and _value_matcher(attr, [value])(attrs.get(attr))
+            for tag, attr, value in patterns
+        )
+
+    return SoupStrainer(match)
+
+def _value_matcher(attr, values):
+    """Match an attribute value against any of the given values
+
+    Class values match on a single class token. While a page is being parsed
+    the class attribute is still the raw space-separated string.
+    """
+    def match(actual):
+        if actual is None:
+            return False
+        if attr == 'class':
+            classes = actual.split() if isinstance(actual, str) else actual
+            return any(value in classes for value in values)
+        return actual in values
+    return match
+
+def compile_cards(*selectors):
+    """Compile a site's card selectors, tried in order until one finds cards"""
+    return {
+        "selectors": list(selectors),
+        "compiled": [sv.compile(selector) for selector in selectors],
+        "strainer": card_strainer(selectors)
+    }
+
+def compile_fields(fields):
+    """Compile a site's field map once"""
+    compiled = {}
+    for key, spec in fields.items():
+        selector, attr = spec[0], spec[1]
+        if len(spec) > 2:
+            selector = f'{selector}:-soup-contains("{spec[2]}")'
+        if isinstance(attr, dict):
+            attr = compile_fields(attr)
+        compiled[key] = (sv.compile(selector) if selector else None, attr)
+    return compiled
+
+def make_soup(html, strainer=None, parser=None):
+    """Parse a page, limited to the strained subtrees when a strainer is given"""
+    return BeautifulSoup(html, parser or HTML_PARSER, parse_only=strainer)
+
+def select_cards(html, cards, parser=None):
+    """Parse a page and return the cards matched by the first selector with hits"""
+    soup = make_soup(html, cards["strainer"], parser)
+    for selector in cards["compiled"]:
+        found = selector.select(soup)
+        if found:
+            return found
+    return []
+
+def _read(elem, attr):
+    """Read the text or an attribute of an element"""
+    if elem is None:
+        return None
+    if attr == 'text':
+        return elem.text.strip()
+    return elem.get(attr)
+
+def extract_fields(card, fields):
+    """Read every field of a compiled field map from one card"""
+    values = {}
+    for key, (selector, attr) in fields.items():
+        if isinstance(attr, dict):
+            values[key] = [extract_fields(elem, attr) for elem in selector.select(card)]
+        else:
+            values[key] = _read(selector.select_one(card) if selector else card, attr)
+    return values
+
+def card_rows(page_data, cards, fields, limit):
+    """Return the field rows of up to limit cards on a page
+
+    page_data is either the page HTML or the rows that were already
+    extracted inside the browser by scraper_browser.extract_cards.
+    """
+    if not isinstance(page_data, str):
+        return page_data[:limit]
+    with stage('parse'):
+        return [extract_fields(card, fields) for card in select_cards(page_data, cards)[:limit]]
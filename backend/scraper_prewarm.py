@@ -0,0 +1,120 @@
+"""
+Background refreshes for the SafeBite scrapers
+
+Cached results are served stale-while-revalidate: once a source's entry is
+past its TTL it is still returned for a grace period (see
+scraper_cache.set_fresh) while refresh_in_background() re-scrapes it.
+
+A Prewarmer also tracks how often each query is requested, with decay, and
+every SCRAPER_PREWARM_INTERVAL seconds re-scrapes the sources of the top
+SCRAPER_PREWARM_TOP_N queries that are about to go stale, so popular
+queries are refreshed before any user has to wait for them. Each worker
+tracks its own traffic; the single-flight lock in the shared cache keeps
+workers from scraping the same source twice.
+
+Refreshes run on the shared scrape executor (see scraper_executor), so
+they count against its queue and the browser page budget, and at most
+SCRAPER_REFRESH_WORKERS of them are queued or running per worker at once.
+Refreshes beyond that, or turned away by a full queue, are dropped and
+left to the next request or prewarm tick.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from scraper_executor import scrape_executor, ExecutorSaturated
+
+logger = logging.getLogger('scraper-prewarm')
+
+PREWARM_ENABLED = os.environ.get('SCRAPER_PREWARM', '1') != '0'
+PREWARM_INTERVAL = float(os.environ.get('SCRAPER_PREWARM_INTERVAL', 60))
+PREWARM_TOP_N = int(os.environ.get('SCRAPER_PREWARM_TOP_N', 20))
+# Sources expiring within this many seconds are refreshed by the prewarmer
+PREWARM_MARGIN = float(os.environ.get('SCRAPER_PREWARM_MARGIN', 300))
+REFRESH_WORKERS = int(os.environ.get('SCRAPER_REFRESH_WORKERS', 2))
+
+# Popularity scores are multiplied by this every interval
+POPULARITY_DECAY = 0.5
+MAX_TRACKED_QUERIES = 1000
+
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+def refresh_in_background(key, refresh):
+    """Run refresh on the scrape executor unless key is already being refreshed
+
+    Returns False when the refresh was not started.
+    """
+    with _refresh_lock:
+        if key in _refreshing or len(_refreshing) >= REFRESH_WORKERS:
+            return False
+        _refreshing.add(key)
+
+    def run():
+        try:
+            refresh()
+        except Exception as e:
+            logger.error(f"Error refreshing {key}: {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    try:
+        scrape_executor.submit(run)
+    except ExecutorSaturated:
+        logger.warning(f"Scrape queue is full, not refreshing {key}")
+        with _refresh_lock:
+            _refreshing.discard(key)
+        return False
+    return True
+
+class Prewarmer:
+    """Track query popularity and keep the most popular queries warm"""
+
+    def __init__(self, name, warm, top_n=PREWARM_TOP_N, interval=PREWARM_INTERVAL):
+        self.name = name
+        self.warm = warm
+        self.top_n = top_n
+        self.interval = interval
+        self.popularity = Counter()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def track(self, *params):
+        """Count a request for a query, starting the prewarm thread if needed"""
+        params = tuple(' '.join(str(param).lower().split()) for param in params)
+        with self.lock:
+            self.popularity[params] += 1
+            if len(self.popularity) > MAX_TRACKED_QUERIES:
+                del self.popularity[min(self.popularity, key=self.popularity.get)]
+            if PREWARM_ENABLED and (self.thread is None or not self.thread.is_alive()):
+                # Started on first use so it runs in each worker, not in a
+                # pre-fork master process
+                self.thread = threading.Thread(target=self.run, name=f'{self.name}-prewarm', daemon=True)
+                self.thread.start()
+
+    def top(self):
+        """The top_n most popular queries"""
+        with self.lock:
+            return [params for params, score in self.popularity.most_common(self.top_n)]
+
+    def decay(self):
+        with self.lock:
+            for params in list(self.popularity):
+                self.popularity[params] *= POPULARITY_DECAY
+                if self.popularity[params] < 0.01:
+                    del self.popularity[params]
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            queries = self.top()
+            logger.info(f"Prewarming {len(queries)} popular {self.name} queries")
+            for params in queries:
+                try:
+                    self.warm(*params)
+                except Exception as e:
+                    logger.error(f"Error prewarming {self.name} {params}: {e}")
+            self.decay()
@@ -0,0 +1,199 @@
+"""
+Compact records for scraped products and restaurants
+
+Every scraped card used to be a dict repeating the same keys, and the
+scrape cache stored each one as JSON. Products and restaurants are now
+Records: fixed __slots__ classes with one attribute per field, which read
+like the dicts they replace (record["name"], record.get("offers", []),
+{**record}) so the scraper code works on them unchanged.
+
+Cache values are encoded with encode() instead of JSON:
+
+- a record is stored as a tuple of its field values, in slot order, so no
+  key is written per card
+- equal strings and floats are written once and referenced after that
+  (the source and platform names, sale_price next to price, ...), and
+  decode() hands back one shared object for each of them
+- fields a record can rebuild from the others (DERIVED, such as a
+  product's "name weight" description) are left out when they match
+- entries over COMPRESS_MIN_BYTES are zlib-compressed at a fast level
+
+The encoding is marshal, which is only readable by the Python version that
+wrote it; entries written by another version, or as JSON before records,
+are read as misses or as JSON. Records become JSON only at the response
+boundary (to_json).
+"""
+
+import sys
+import json
+import zlib
+import marshal
+from collections.abc import Mapping
+
+# Entries larger than this are compressed
+COMPRESS_MIN_BYTES = 512
+COMPRESS_LEVEL = 1
+
+# Marks fields a record does not have
+MISSING = ...
+
+FORMAT_VERSION = 1
+MAGIC = b'SBR' + bytes([FORMAT_VERSION, sys.version_info[0], sys.version_info[1]])
+MAGIC_COMPRESSED = b'SBZ' + MAGIC[3:]
+
+class Record(Mapping):
+    """A scraped item with a fixed set of fields, read like a dict
+
+    Fields outside FIELDS are kept in 'extra'.
+    """
+
+    __slots__ = ('extra',)
+    FIELDS = ()
+    FIELD_SET = frozenset()
+    # Fields that can be rebuilt from the others: {field: function(record)}
+    DERIVED = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, **fields):
+        for name in self.FIELDS:
+            setattr(self, name, fields.pop(name, MISSING))
+        self.extra = fields or None
+
+    @classmethod
+    def from_dict(cls, item):
+        """Build a record from a dict, or return a record as it is"""
+        if isinstance(item, cls):
+            return item
+        return cls(**item)
+
+    def __getitem__(self, key):
+        if key in self.FIELD_SET:
+            value = getattr(self, key)
+        else:
+            value = self.extra.get(key, MISSING) if self.extra else MISSING
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        for name in self.FIELDS:
+            if getattr(self, name) is not MISSING:
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def to_dict(self):
+        return dict(self)
+
+class Product(Record):
+    """A grocery product"""
+
+    FIELDS = (
+        '_id', 'name', 'brand', 'category', 'description', 'price', 'sale_price', 'market_price',
+        'image_url', 'source', 'platform', 'redirect', 'offers', 'in_stock', 'weight', 'rating',
+        'nutritional_info'
+    )
+    __slots__ = FIELDS
+    DERIVED = {
+        "description": lambda product: f"{product.name} {product.weight}".strip()
+    }
+
+class Restaurant(Record):
+    """A food delivery restaurant"""
+
+    FIELDS = (
+        'restaurant', 'redirect', 'rating', 'delivery_time', 'price_range', 'cuisine', 'address',
+        'image_url', 'platform', 'latitude', 'longitude', 'distance_km', 'popular_dishes', 'offers',
+        'menu_items', 'restaurant_type', 'health_score'
+    )
+    __slots__ = FIELDS
+    DERIVED = {
+        "popular_dishes": lambda restaurant: [item["name"] for item in restaurant.menu_items]
+        if isinstance(restaurant.menu_items, list) else MISSING
+    }
+
+# Type codes of the records in encoded values; never reuse a code
+RECORD_TYPES = {1: Product, 2: Restaurant}
+RECORD_CODES = {record_type: code for code, record_type in RECORD_TYPES.items()}
+
+def _pack(value, memo):
+    """Turn a value into marshal-able data, sharing equal strings and floats"""
+    if isinstance(value, Record):
+        derived = 0
+        values = []
+        for index, name in enumerate(value.FIELDS):
+            field = getattr(value, name)
+            rebuild = value.DERIVED.get(name)
+            if rebuild is not None and field is not MISSING and rebuild(value) == field:
+                derived |= 1 << index
+                field = None
+            values.append(_pack(field, memo))
+        return (RECORD_CODES[type(value)], derived, _pack(value.extra, memo), *values)
+    if isinstance(value, (str, float)):
+        return memo.setdefault((type(value), value), value)
+    if isinstance(value, dict):
+        return {_pack(key, memo): _pack(item, memo) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Tuples are read back as lists, as with JSON
+        return [_pack(item, memo) for item in value]
+    return value
+
+def _unpack(value):
+    """Rebuild the records in unmarshalled data"""
+    if isinstance(value, tuple):
+        record_type = RECORD_TYPES[value[0]]
+        derived, extra, values = value[1], value[2], value[3:]
+        record = record_type.__new__(record_type)
+        for name, field in zip(record_type.FIELDS, values):
+            setattr(record, name, _unpack(field))
+        record.extra = _unpack(extra)
+        for index, name in enumerate(record_type.FIELDS):
+            if derived & (1 << index):
+                setattr(record, name, record_type.DERIVED[name](record))
+        return record
+    if isinstance(value, list):
+        return [_unpack(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _unpack(item) for key, item in value.items()}
+    return value
+
+def encode(value):
+    """Serialize a cache value"""
+    data = marshal.dumps(_pack(value, {}))
+    if len(data) > COMPRESS_MIN_BYTES:
+        return MAGIC_COMPRESSED + zlib.compress(data, COMPRESS_LEVEL)
+    return MAGIC + data
+
+def decode(data):
+    """Deserialize a cache value; None when it was written by another Python version"""
+    if data.startswith(MAGIC):
+        return _unpack(marshal.loads(data[len(MAGIC):]))
+    if data.startswith(MAGIC_COMPRESSED):
+        return _unpack(marshal.loads(zlib.decompress(data[len(MAGIC_COMPRESSED):])))
+    if data[:3] in (b'SBR', b'SBZ'):
+        return None
+    # Written as JSON before records
+    return json.loads(data)
+
+def to_json(value):
+    """Replace the records in a value with dicts, for a response"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_json(item) for item in value]
+    return value
+
+def as_records(items, record_type):
+    """Records of a list of scraped items, which may be dicts"""
+    return [record_type.from_dict(item) for item in items]
@@ -0,0 +1,149 @@
+"""
+Record and replay of scraped pages for the SafeBite scrapers
+
+Scrapes normally hit Blinkit, BigBasket, Zepto, Swiggy and the other live
+sites. SCRAPER_REPLAY switches both fetch paths to a fixture corpus in
+SCRAPER_FIXTURES_DIR, so scrapers can be run and benchmarked on a machine
+with no network:
+
+- record: every response the HTTP path fetches, and every document,
+  script, stylesheet and XHR/fetch response Playwright loads, is saved
+  under its method and URL as it passes through
+- replay: the HTTP path and Playwright get those responses from a local
+  stand-in server instead of the sites; anything that was not recorded
+  (and every image, font and media request) is refused
+
+Page scripts run in replay just as they did while recording, so sites
+that render their cards client-side produce the same products. Point
+SCRAPER_REPLAY_URL at a stand-in started with
+
+    python scraper_replay.py    # listens on 127.0.0.1:SCRAPER_REPLAY_PORT
+
+or leave it unset to start one inside the scraper process on first use.
+Record with the memory cache backend (SCRAPER_CACHE_BACKEND=memory) so that
+cached results do not hide the pages from the recorder.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import requests
+from flask import Flask, request, Response, jsonify
+
+logger = logging.getLogger('scraper-replay')
+
+REPLAY_OFF = ''
+REPLAY_RECORD = 'record'
+REPLAY_REPLAY = 'replay'
+
+REPLAY_MODE = os.environ.get('SCRAPER_REPLAY', REPLAY_OFF)
+FIXTURES_DIR = os.environ.get(
+    'SCRAPER_FIXTURES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pages')
+)
+REPLAY_URL = os.environ.get('SCRAPER_REPLAY_URL', '').rstrip('/')
+REPLAY_PORT = int(os.environ.get('SCRAPER_REPLAY_PORT', 5060))
+
+# Playwright resource types that are recorded; the rest never affect the cards
+RECORDED_RESOURCES = {'document', 'script', 'stylesheet', 'xhr', 'fetch'}
+# Set by the stand-in server on responses that were never recorded
+REPLAY_MISS_HEADER = 'X-Replay-Miss'
+
+def fixture_key(method, url):
+    """File name stem of a recorded response"""
+    return hashlib.sha1(f"{method.upper()} {url}".encode('utf-8')).hexdigest()
+
+def save_response(method, url, status, content_type, body):
+    """Save one response to the fixture corpus"""
+    key = fixture_key(method, url)
+    try:
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        with open(os.path.join(FIXTURES_DIR, f"{key}.body"), 'wb') as f:
+            f.write(body)
+        with open(os.path.join(FIXTURES_DIR, f"{key}.json"), 'w') as f:
+            json.dump({"method": method.upper(), "url": url, "status": status, "content_type": content_type}, f)
+    except Exception as e:
+        logger.error(f"Error recording {url}: {e}")
+
+def load_response(method, url):
+    """Return the (meta, body) of a recorded response, or None"""
+    key = fixture_key(method, url)
+    try:
+        with open(os.path.join(FIXTURES_DIR, f"{key}.json")) as f:
+            meta = json.load(f)
+        with open(os.path.join(FIXTURES_DIR, f"{key}.body"), 'rb') as f:
+            return meta, f.read()
+    except FileNotFoundError:
+        return None
+
+app = Flask(__name__)
+
+@app.route('/replay', methods=['GET'])
+def replay():
+    """Serve a recorded response by its method and URL"""
+    recorded = load_response(request.args.get('method', 'GET'), request.args.get('url', ''))
+    if recorded is None:
+        return jsonify({"error": "Not recorded"}), 404, {REPLAY_MISS_HEADER: '1'}
+    meta, body = recorded
+    return Response(body, status=meta["status"], content_type=meta["content_type"])
+
+_server_url = None
+_server_lock = threading.Lock()
+
+def replay_server_url():
+    """URL of the stand-in server, starting one in this process if none is configured"""
+    global _server_url
+    if REPLAY_URL:
+        return REPLAY_URL
+    with _server_lock:
+        if _server_url is None:
+            from werkzeug.serving import make_server, WSGIRequestHandler
+
+            class QuietHandler(WSGIRequestHandler):
+                def log_request(self, *args, **kwargs):
+                    pass
+
+            # Port 0 picks a free port, so several scraper processes can replay at once
+            server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+            threading.Thread(target=server.serve_forever, name='replay-server', daemon=True).start()
+            _server_url = f"http://127.0.0.1:{server.server_port}"
+            logger.info(f"Replaying scraped pages from {FIXTURES_DIR} at {_server_url}")
+        return _server_url
+
+_session = requests.Session()
+
+def fetch_replayed(url, method='GET', timeout=None):
+    """Fetch a recorded response from the stand-in server"""
+    return _session.get(f"{replay_server_url()}/replay", params={"method": method, "url": url}, timeout=timeout)
+
+def handle_route(route):
+    """Playwright route handler that records or replays a page's requests"""
+    req = route.request
+    if REPLAY_MODE == REPLAY_RECORD:
+        if req.resource_type not in RECORDED_RESOURCES:
+            route.continue_()
+            return
+        response = route.fetch()
+        save_response(req.method, req.url, response.status, response.headers.get('content-type', ''), response.body())
+        route.fulfill(response=response)
+        return
+
+    if req.resource_type not in RECORDED_RESOURCES:
+        route.abort()
+        return
+    response = fetch_replayed(req.url, req.method)
+    if REPLAY_MISS_HEADER in response.headers:
+        logger.warning(f"No recording of {req.method} {req.url}")
+        route.abort()
+        return
+    route.fulfill(status=response.status_code, content_type=response.headers.get('content-type'), body=response.content)
+
+def install_replay(page):
+    """Record or replay a Playwright page's requests, per SCRAPER_REPLAY"""
+    if REPLAY_MODE in (REPLAY_RECORD, REPLAY_REPLAY):
+        page.route('**/*', handle_route)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    app.run(host='127.0.0.1', port=REPLAY_PORT, threaded=True)
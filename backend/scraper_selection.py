@@ -0,0 +1,91 @@
+"""
+Adaptive source selection for the SafeBite scrapers
+
+Each process keeps an exponentially weighted moving average of every
+source's scrape latency, error rate (errors and timeouts) and yield (the
+share of scrapes that found products or restaurants). plan_sources() uses
+them to:
+
+- skip sources that keep failing or finding nothing, once they have at
+  least SCRAPER_SELECTION_MIN_SAMPLES scrapes, except for a share of
+  SCRAPER_EXPLORATION_RATE requests that probe them again
+- submit the remaining sources best-first (yield per second), so slow or
+  unreliable sources are the ones left queued when the executor is busy
+
+Set SCRAPER_ADAPTIVE=0 to always scrape every source.
+"""
+
+import os
+import random
+import threading
+from scraper_http import SOURCE_OK, SOURCE_ERROR, SOURCE_TIMED_OUT
+
+ADAPTIVE_ENABLED = os.environ.get('SCRAPER_ADAPTIVE', '1') != '0'
+EXPLORATION_RATE = float(os.environ.get('SCRAPER_EXPLORATION_RATE', 0.1))
+MIN_SAMPLES = int(os.environ.get('SCRAPER_SELECTION_MIN_SAMPLES', 5))
+
+# Weight of the newest scrape in the moving averages
+EWMA_ALPHA = 0.2
+# Sources are skipped above this error rate or below this yield
+SKIP_ERROR_RATE = 0.8
+SKIP_YIELD = 0.1
+
+_health = {}
+_health_lock = threading.Lock()
+
+def ewma(average, value):
+    return (1 - EWMA_ALPHA) * average + EWMA_ALPHA * value
+
+def record_outcome(scraper, source, status, seconds):
+    """Fold one scrape of a source into its moving averages"""
+    failed = float(status in (SOURCE_ERROR, SOURCE_TIMED_OUT))
+    useful = float(status == SOURCE_OK)
+    with _health_lock:
+        health = _health.get((scraper, source))
+        if health is None:
+            # The first scrape seeds the averages
+            _health[(scraper, source)] = {"samples": 1, "latency": seconds, "error_rate": failed, "yield": useful}
+            return
+        health["samples"] += 1
+        health["latency"] = ewma(health["latency"], seconds)
+        health["error_rate"] = ewma(health["error_rate"], failed)
+        health["yield"] = ewma(health["yield"], useful)
+
+def is_unhealthy(health):
+    return health["samples"] >= MIN_SAMPLES and (
+        health["error_rate"] >= SKIP_ERROR_RATE or health["yield"] <= SKIP_YIELD
+    )
+
+def plan_sources(scraper, sources):
+    """Split sources into the ones to scrape, best first, and the ones to skip"""
+    if not ADAPTIVE_ENABLED:
+        return list(sources), []
+
+    with _health_lock:
+        health = {source: dict(_health[(scraper, source)]) for source in sources if (scraper, source) in _health}
+
+    run, skipped = [], []
+    for source in sources:
+        if source in health and is_unhealthy(health[source]) and random.random() >= EXPLORATION_RATE:
+            skipped.append(source)
+        else:
+            run.append(source)
+
+    # Untried sources first, then by expected yield per second
+    score = lambda source: health[source]["yield"] / max(health[source]["latency"], 1.0) if source in health else float('inf')
+    run.sort(key=score, reverse=True)
+    return run, skipped
+
+def selection_stats():
+    """Moving averages of every source, keyed by scraper then source"""
+    stats = {}
+    with _health_lock:
+        for (scraper, source), health in _health.items():
+            stats.setdefault(scraper, {})[source] = {
+                "samples": health["samples"],
+                "latency": round(health["latency"], 3),
+                "error_rate": round(health["error_rate"], 3),
+                "yield": round(health["yield"], 3),
+                "skipping": is_unhealthy(health)
+            }
+    return stats
@@ -0,0 +1,115 @@
+"""
+Scraper service for SafeBite
+
+A standalone process that owns the browsers: the grocery and food delivery
+endpoints send it one source at a time over localhost HTTP instead of
+launching Playwright in every web worker, so browser capacity is sized by
+SCRAPER_SERVICE_CAPACITY independently of the number of web workers.
+
+Run the service:
+
+    python scraper_service.py    # listens on 127.0.0.1:SCRAPER_SERVICE_PORT
+
+and point the web apps at it with SCRAPER_SERVICE_URL, e.g.
+http://127.0.0.1:5050. When SCRAPER_SERVICE_URL is not set the web apps
+scrape in-process as before. Caching, single-flight and streaming stay in
+the web apps; the service only runs scrape_source_local (and the food
+delivery menu scrapes, scrape_menu_local).
+
+    POST /rpc/scrape  {"scraper": "grocery", "source": "zepto",
+                       "params": {"query": "milk"}, "timeout": 30}
+"""
+
+import os
+import logging
+import importlib
+import threading
+from flask import Flask, request, jsonify
+from scraper_http import get_session, SOURCE_ERROR, SOURCE_TIMED_OUT
+from scraper_deadline import Deadline, MAX_DEADLINE, DEFAULT_DEADLINE
+from scraper_executor import scraper_executor
+from scraper_stats import scraper_stats
+from scraper_records import Product, Restaurant, as_records, to_json
+
+logger = logging.getLogger('scraper-service')
+
+SCRAPER_SERVICE_URL = os.environ.get('SCRAPER_SERVICE_URL', '').rstrip('/')
+SCRAPER_SERVICE_PORT = int(os.environ.get('SCRAPER_SERVICE_PORT', 5050))
+# Sources the service scrapes at once; each one may hold a browser
+SCRAPER_SERVICE_CAPACITY = int(os.environ.get('SCRAPER_SERVICE_CAPACITY', 4))
+# Extra seconds the client waits for the service beyond the scrape deadline
+RPC_GRACE = 5
+
+# Scrapers are imported on first use, so only the service loads them.
+# 'items' is the key of the scraped items in a source result and 'record'
+# the scraper_records type they are read back into.
+SCRAPERS = {
+    "grocery": {"scrape": "enhanced_grocery_scraper:scrape_source_local", "items": "products", "record": Product},
+    "food_delivery": {"scrape": "food_delivery_scraper:scrape_source_local", "items": "restaurants", "record": Restaurant},
+    "food_delivery_menu": {"scrape": "food_delivery_scraper:scrape_menu_local", "items": "menu", "record": None}
+}
+
+app = Flask(__name__)
+app.register_blueprint(scraper_executor)
+app.register_blueprint(scraper_stats)
+
+_capacity = threading.BoundedSemaphore(SCRAPER_SERVICE_CAPACITY)
+
+def failed_result(scraper, source, status):
+    """Result for a source the service could not scrape"""
+    return {"source": source, SCRAPERS[scraper]["items"]: [], "fetch_path": None, "status": status}
+
+def scrape_remote(scraper, source, params, deadline=None):
+    """Scrape one source on the scraper service"""
+    deadline = deadline or Deadline(DEFAULT_DEADLINE)
+    try:
+        response = get_session().post(
+            f"{SCRAPER_SERVICE_URL}/rpc/scrape",
+            json={"scraper": scraper, "source": source, "params": params, "timeout": deadline.remaining()},
+            timeout=(3.05, deadline.remaining() + RPC_GRACE)
+        )
+        response.raise_for_status()
+        result = response.json()
+        items, record = SCRAPERS[scraper]["items"], SCRAPERS[scraper]["record"]
+        if record is not None:
+            result[items] = as_records(result[items], record)
+        return result
+    except Exception as e:
+        logger.error(f"Error calling scraper service for {scraper} {source}: {e}")
+        return failed_result(scraper, source, SOURCE_TIMED_OUT if deadline.expired() else SOURCE_ERROR)
+
+def load_scraper(scraper):
+    """Import the scrape function of a scraper"""
+    module_name, function_name = SCRAPERS[scraper]["scrape"].split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+@app.route('/rpc/scrape', methods=['POST'])
+def rpc_scrape():
+    """Scrape one source for a web app"""
+    body = request.get_json(silent=True) or {}
+    scraper = body.get('scraper')
+    source = body.get('source')
+    if scraper not in SCRAPERS:
+        return jsonify({"error": f"Scraper must be one of: {', '.join(SCRAPERS)}"}), 400
+
+    try:
+        timeout = min(float(body.get('timeout', DEFAULT_DEADLINE)), MAX_DEADLINE)
+    except (TypeError, ValueError):
+        timeout = DEFAULT_DEADLINE
+    deadline = Deadline(timeout)
+    scrape_source_local = load_scraper(scraper)
+
+    # Wait for a free browser slot, but not past the caller's deadline
+    if not _capacity.acquire(timeout=deadline.remaining()):
+        logger.warning(f"No free browser slot for {scraper} {source}")
+        return jsonify(failed_result(scraper, source, SOURCE_TIMED_OUT))
+    try:
+        return jsonify(to_json(scrape_source_local(source, deadline=deadline, **body.get('params', {}))))
+    except (KeyError, TypeError) as e:
+        return jsonify({"error": f"Invalid scrape request: {e}"}), 400
+    finally:
+        _capacity.release()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    app.run(host='127.0.0.1', port=SCRAPER_SERVICE_PORT, threaded=True)
@@ -0,0 +1,110 @@
+"""
+Single-flight scrapes for the SafeBite scrapers
+
+Concurrent requests that miss the cache for the same source and query would
+each launch their own browsers. coalesce() makes them share one scrape:
+
+- within a worker, the first caller runs the scrape and the others wait on
+  its future
+- across workers, the running scrape holds a lock entry in the shared cache
+  (see scraper_cache.add) and the other workers poll for the result it
+  publishes when it is done
+
+Every waiter gets the leader's result, including a timed out one, or
+raises DeadlineExceeded when its own deadline ends first. key is the
+source's cache key: a caller that takes the lock after a previous leader
+has cached a fresh result returns that instead of scraping again. Fresh
+means fresh for at least min_fresh more seconds, so background
+revalidation can re-scrape entries that are only about to go stale.
+"""
+
+import time
+import uuid
+import logging
+import threading
+import concurrent.futures
+from scraper_cache import get_cache, get_fresh
+from scraper_deadline import DeadlineExceeded, deadline_scope, pause
+
+logger = logging.getLogger('scraper-singleflight')
+
+# Seconds a scrape lock outlives the leader's deadline, in case the leader
+# dies without releasing it
+LOCK_GRACE = 10
+# Seconds the result of a scrape is kept for the workers waiting on it
+FLIGHT_RESULT_TTL = 60
+# Seconds between polls while waiting on another worker's scrape
+FLIGHT_POLL_INTERVAL = 0.5
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+def coalesce(key, scrape, deadline, min_fresh=0):
+    """Run scrape once for all concurrent callers with the same key
+
+    The scrape is skipped when the cached entry at key stays fresh for more
+    than min_fresh seconds.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = concurrent.futures.Future()
+
+    if not leader:
+        logger.info(f"Waiting on the running scrape for {key}")
+        try:
+            return flight.result(timeout=deadline.remaining())
+        except concurrent.futures.TimeoutError:
+            raise DeadlineExceeded(f"Deadline exceeded waiting on {key}")
+
+    try:
+        result = _coalesce_across_workers(key, scrape, deadline, min_fresh)
+        flight.set_result(result)
+        return result
+    except BaseException as e:
+        flight.set_exception(e)
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+
+def _coalesce_across_workers(key, scrape, deadline, min_fresh=0):
+    """Run scrape unless another worker is already running it for key"""
+    cache = get_cache()
+    lock_key = f"{key}:lock"
+
+    with deadline_scope(deadline):
+        while True:
+            token = uuid.uuid4().hex
+            if cache.add(lock_key, token, deadline.remaining() + LOCK_GRACE):
+                try:
+                    # The previous leader may have cached its result since
+                    # this caller missed the cache
+                    cached, fresh_until = get_fresh(cache, key)
+                    if cached is not None and fresh_until > time.time() + min_fresh:
+                        return cached
+                    result = scrape()
+                    cache.set(f"{key}:flight:{token}", result, FLIGHT_RESULT_TTL)
+                    return result
+                finally:
+                    cache.delete(lock_key)
+
+            leader_token = cache.get(lock_key)
+            if leader_token is None:
+                continue
+            logger.info(f"Waiting on another worker's scrape for {key}")
+            result = _wait_for_flight(cache, lock_key, f"{key}:flight:{leader_token}", leader_token)
+            if result is not None:
+                return result
+
+def _wait_for_flight(cache, lock_key, result_key, token):
+    """Poll for another worker's result, or None if it stopped without one"""
+    while True:
+        result = cache.get(result_key)
+        if result is not None:
+            return result
+        if cache.get(lock_key) != token:
+            # The result is published before the lock is released
+            return cache.get(result_key)
+        pause(FLIGHT_POLL_INTERVAL)
@@ -0,0 +1,110 @@
+"""
+Scrape timing and source stats for the SafeBite scrapers
+
+Every source scrape is recorded with the time spent in each stage:
+
+- http: fetching a server-rendered page over the pooled session
+- browser_launch: starting Chromium and opening a page
+- homepage / search / menu: page navigations
+- sleep: fixed waits for the page to settle
+- extract: reading the card fields in the page, or page.content()
+- parse: building the cards from HTML with BeautifulSoup
+- archive: storing the rendered page when SCRAPER_ARCHIVE=1 (see
+  scraper_archive)
+- total: the whole scrape, including anything not covered above
+
+along with its status, fetch path, card count and the bytes that reached
+Python (the HTTP response body, or the HTML or card rows shipped out of the
+browser). The last SCRAPER_STATS_SAMPLES scrapes of each source are kept
+per process and aggregated into rolling percentiles on /api/scraper/stats,
+next to the moving averages used for source selection (see
+scraper_selection).
+"""
+
+import os
+import time
+import threading
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from flask import Blueprint, jsonify
+
+STATS_SAMPLES = int(os.environ.get('SCRAPER_STATS_SAMPLES', 200))
+
+_records = defaultdict(lambda: deque(maxlen=STATS_SAMPLES))
+_records_lock = threading.Lock()
+_local = threading.local()
+
+@contextmanager
+def track_scrape(scraper, source):
+    """Record one scrape of a source; yields the record to fill in its outcome"""
+    record = {"stages": defaultdict(float), "bytes": 0, "cards": 0, "status": None, "fetch_path": None}
+    previous = getattr(_local, 'record', None)
+    _local.record = record
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["stages"]["total"] = time.perf_counter() - started
+        _local.record = previous
+        with _records_lock:
+            _records[(scraper, source)].append(record)
+
+@contextmanager
+def stage(name):
+    """Time a stage of the scrape running on this thread"""
+    record = getattr(_local, 'record', None)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if record is not None:
+            record["stages"][name] += time.perf_counter() - started
+
+def add_bytes(count):
+    """Count bytes that reached Python for the scrape running on this thread"""
+    record = getattr(_local, 'record', None)
+    if record is not None:
+        record["bytes"] += count
+
+def percentiles(values):
+    """p50, p95 and p99 of a list of values"""
+    ordered = sorted(values)
+    pick = lambda p: round(ordered[int(p * (len(ordered) - 1))], 3)
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+def source_stats(records):
+    """Aggregate the recent scrapes of one source"""
+    stages = defaultdict(list)
+    fetch_paths = defaultdict(int)
+    for record in records:
+        for name, seconds in record["stages"].items():
+            stages[name].append(seconds)
+        fetch_paths[record["fetch_path"] or "none"] += 1
+    return {
+        "scrapes": len(records),
+        "success_rate": round(sum(record["status"] == "ok" for record in records) / len(records), 3),
+        "avg_cards": round(sum(record["cards"] for record in records) / len(records), 1),
+        "avg_bytes": int(sum(record["bytes"] for record in records) / len(records)),
+        "fetch_paths": dict(fetch_paths),
+        "stages": {name: percentiles(values) for name, values in stages.items()}
+    }
+
+def get_stats():
+    """Per-source stats of this process, keyed by scraper then source"""
+    with _records_lock:
+        snapshot = {key: list(records) for key, records in _records.items()}
+    stats = defaultdict(dict)
+    for (scraper, source), records in snapshot.items():
+        if records:
+            stats[scraper][source] = source_stats(records)
+    return dict(stats)
+
+scraper_stats = Blueprint('scraper_stats', __name__)
+
+@scraper_stats.route('/api/scraper/stats', methods=['GET'])
+def get_scraper_stats():
+    """API endpoint for per-source scrape timings, success rates and sizes"""
+    # Imported here: scraper_selection depends on modules that import this one
+    from scraper_selection import selection_stats
+
+    return jsonify({"pid": os.getpid(), "sources": get_stats(), "selection": selection_stats()})
@@ -0,0 +1,337 @@
+"""
+Write-through persistence of scraped grocery products into MongoDB
+
+Scraped products used to live only in the scrape cache and were lost when
+it expired. With MONGO_URI set, every source result that found products is
+also upserted into the SCRAPED_PRODUCTS_COLLECTION collection:
+
+- products get stable, content-derived IDs (product_id), so a product
+  scraped again updates its document instead of adding a new one
+- the background writer thread owns the connection: it connects, creates
+  the indexes and retries every PERSIST_RETRY_INTERVAL seconds while the
+  database is down, so requests never wait on a connection attempt; a
+  read that fails also keeps requests off the database for that long
+- writes are queued and flushed by one background thread in batches of up
+  to PERSIST_BATCH_SIZE unordered bulk_write upserts, so scrapes never
+  wait on the database and one bad document does not stop the batch;
+  short-lived processes call flush() before exiting so the daemon thread
+  is not killed with writes still queued
+- each document remembers the queries it was found for and, per query,
+  when and at which rank it was last seen, so load_stored_results() can
+  answer a query from the database with the source's latest scrape of it
+  when the cache has expired
+
+Every price seen is also appended to the PRICE_HISTORY_COLLECTION
+collection, bucketed per product and day: a bucket keeps the count, sum,
+min and max of the day's prices next to its last PRICE_SAMPLES
+observations, so price_summary() answers min/avg/max over a window from
+the buckets alone instead of scanning every observation.
+"""
+
+import os
+import time
+import queue
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger('scraper-store')
+
+MONGO_URI = os.environ.get('MONGO_URI', '')
+MONGO_DB = os.environ.get('MONGO_DB', 'safebite')
+SCRAPED_PRODUCTS_COLLECTION = os.environ.get('SCRAPED_PRODUCTS_COLLECTION', 'Scraped Products')
+PRICE_HISTORY_COLLECTION = os.environ.get('PRICE_HISTORY_COLLECTION', 'Price History')
+PERSIST_ENABLED = bool(MONGO_URI) and os.environ.get('SCRAPER_PERSIST', '1') != '0'
+PERSIST_BATCH_SIZE = int(os.environ.get('SCRAPER_PERSIST_BATCH_SIZE', 500))
+# Seconds the writer waits to fill a batch before flushing what it has
+PERSIST_FLUSH_INTERVAL = float(os.environ.get('SCRAPER_PERSIST_FLUSH_INTERVAL', 2))
+# Queued writes beyond this are dropped rather than held in memory
+PERSIST_MAX_QUEUED = int(os.environ.get('SCRAPER_PERSIST_MAX_QUEUED', 10000))
+# Raw price observations kept in each daily bucket
+PRICE_SAMPLES = int(os.environ.get('SCRAPER_PRICE_SAMPLES', 48))
+# Seconds between connection attempts while the database is down
+PERSIST_RETRY_INTERVAL = float(os.environ.get('SCRAPER_PERSIST_RETRY_INTERVAL', 30))
+
+class DatabaseUnavailable(Exception):
+    """Raised when the database is not connected (yet)"""
+
+def normalize_text(text):
+    return ' '.join((text or '').lower().split())
+
+def query_id(query):
+    """Key of a normalized query in a product's "hits" field, safe as a field name"""
+    return hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+
+def product_id(source, name, weight='', url=''):
+    """Stable ID of a product on a source, derived from its name, weight and URL
+
+    The URL (or any other per-card value) keeps cards that share a name and
+    weight, or that fell back to "Unknown Product", apart.
+    """
+    key = f"{source}|{normalize_text(name)}|{normalize_text(weight)}|{(url or '').strip()}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return f"{source}_{digest[:16]}"
+
+_database = None
+# Reads are skipped until this time (monotonic) after one failed
+_unavailable_until = 0.0
+
+def back_off():
+    """Keep requests off the database for PERSIST_RETRY_INTERVAL after a failure"""
+    global _unavailable_until
+    _unavailable_until = time.monotonic() + PERSIST_RETRY_INTERVAL
+
+def connect():
+    """Connect and create the indexes; run by the writer thread only"""
+    global _database
+    from pymongo import MongoClient, ASCENDING, DESCENDING
+
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    database = client[MONGO_DB]
+    try:
+        database[SCRAPED_PRODUCTS_COLLECTION].create_index(
+            [("source_key", ASCENDING), ("queries", ASCENDING), ("last_seen", DESCENDING)]
+        )
+        database[PRICE_HISTORY_COLLECTION].create_index([("product_id", ASCENDING), ("day", ASCENDING)])
+    except Exception:
+        # A client per failed attempt would leak its monitor threads
+        client.close()
+        raise
+    _database = database
+    logger.info(f"Connected to MongoDB database '{MONGO_DB}'")
+
+def get_database():
+    """Return the database, or raise DatabaseUnavailable until the writer has connected"""
+    start_writer()
+    if _database is None:
+        raise DatabaseUnavailable('Scraped products database is not connected')
+    if time.monotonic() < _unavailable_until:
+        raise DatabaseUnavailable('Scraped products database failed recently')
+    return _database
+
+def get_collection():
+    """Return the scraped products collection"""
+    return get_database()[SCRAPED_PRODUCTS_COLLECTION]
+
+def get_price_history():
+    """Return the price history collection"""
+    return get_database()[PRICE_HISTORY_COLLECTION]
+
+_writes = queue.Queue(maxsize=PERSIST_MAX_QUEUED)
+_writer = None
+_writer_lock = threading.Lock()
+
+def start_writer():
+    """Start the writer thread, which also connects, on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            # Started on first use so it runs in each worker, not in a
+            # pre-fork master process
+            _writer = threading.Thread(target=write_loop, name='scraper-store', daemon=True)
+            _writer.start()
+
+def persist_products(source_key, query, products, seen=None):
+    """Queue a source's products for an upsert, without waiting for it
+
+    seen is when the products were scraped (a UTC datetime), now by default.
+    """
+    if not PERSIST_ENABLED or not products:
+        return
+    start_writer()
+
+    seen = seen or datetime.utcnow()
+    for rank, product in enumerate(products):
+        try:
+            _writes.put_nowait((source_key, normalize_text(query), rank, seen, product))
+        except queue.Full:
+            logger.warning(f"Persist queue is full, dropping {len(products) - rank} {source_key} products")
+            return
+
+def flush(timeout):
+    """Wait up to timeout seconds for every queued write to be attempted
+
+    Returns the number of writes still pending, 0 once all are done.
+    """
+    deadline = time.monotonic() + timeout
+    with _writes.all_tasks_done:
+        while _writes.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _writes.all_tasks_done.wait(remaining)
+        return _writes.unfinished_tasks
+
+def upsert_operation(source_key, query, rank, seen, product):
+    """Unordered bulk_write upsert of one product"""
+    from pymongo import UpdateOne
+
+    return UpdateOne(
+        {"_id": product["_id"]},
+        {
+            "$set": {
+                **{key: value for key, value in product.items() if key != "_id"},
+                "source_key": source_key,
+                "last_seen": seen,
+                f"hits.{query_id(query)}": {"seen": seen, "rank": rank}
+            },
+            "$setOnInsert": {"first_seen": seen},
+            "$addToSet": {"queries": query}
+        },
+        upsert=True
+    )
+
+def observed_price(product):
+    """The price a product was offered at, or None"""
+    price = product.get("sale_price") or product.get("price")
+    return float(price) if price else None
+
+def price_bucket_operation(source_key, seen, product):
+    """Upsert of one price observation into its product's daily bucket"""
+    from pymongo import UpdateOne
+
+    price = observed_price(product)
+    day = seen.replace(hour=0, minute=0, second=0, microsecond=0)
+    return UpdateOne(
+        {"_id": f"{product['_id']}:{day.strftime('%Y-%m-%d')}"},
+        {
+            "$setOnInsert": {"product_id": product["_id"], "source_key": source_key, "day": day},
+            "$set": {"name": product.get("name"), "platform": product.get("platform"), "last_price": price, "last_seen": seen},
+            "$inc": {"count": 1, "sum": price},
+            "$min": {"min": price},
+            "$max": {"max": price},
+            "$push": {"samples": {
+                "$each": [{"t": seen, "price": price, "market_price": product.get("market_price"), "offers": product.get("offers", [])}],
+                "$slice": -PRICE_SAMPLES
+            }}
+        },
+        upsert=True
+    )
+
+def write_loop():
+    """Connect, then flush queued writes in batches for the life of the process"""
+    while _database is None:
+        try:
+            connect()
+        except Exception as e:
+            logger.error(f"Error connecting to MongoDB, retrying in {PERSIST_RETRY_INTERVAL}s: {e}")
+            time.sleep(PERSIST_RETRY_INTERVAL)
+
+    while True:
+        batch = [_writes.get()]
+        flush_at = time.monotonic() + PERSIST_FLUSH_INTERVAL
+        while len(batch) < PERSIST_BATCH_SIZE:
+            try:
+                batch.append(_writes.get(timeout=max(0.0, flush_at - time.monotonic())))
+            except queue.Empty:
+                break
+        write_batch(batch)
+        for _ in batch:
+            _writes.task_done()
+
+def write_batch(batch):
+    """Upsert a batch of queued products and record their prices"""
+    try:
+        # Not through get_database: writes go on while reads back off
+        result = _database[SCRAPED_PRODUCTS_COLLECTION].bulk_write([upsert_operation(*write) for write in batch], ordered=False)
+        logger.info(f"Persisted {len(batch)} scraped products ({result.upserted_count} new)")
+    except Exception as e:
+        logger.error(f"Error persisting {len(batch)} scraped products: {e}")
+    try:
+        prices = [
+            price_bucket_operation(source_key, seen, product)
+            for source_key, query, rank, seen, product in batch if observed_price(product)
+        ]
+        if prices:
+            _database[PRICE_HISTORY_COLLECTION].bulk_write(prices, ordered=False)
+    except Exception as e:
+        logger.error(f"Error recording {len(batch)} price observations: {e}")
+
+def load_stored_results(max_ages, query):
+    """The latest scrape of a query stored for each source, if it is recent enough
+
+    max_ages maps each source key to the age in seconds its products may
+    have. Returns {source_key: (products, age)} with the products of the
+    source's most recent scrape of the query in their scraped order and
+    that scrape's age in seconds, or {} when persistence is off or the
+    database is unavailable.
+    """
+    if not PERSIST_ENABLED or not max_ages:
+        return {}
+    query = normalize_text(query)
+    hit = f"hits.{query_id(query)}"
+    now = datetime.utcnow()
+    try:
+        cursor = get_collection().find(
+            {
+                "queries": query,
+                "$or": [
+                    {"source_key": source_key, f"{hit}.seen": {"$gte": now - timedelta(seconds=max_age)}}
+                    for source_key, max_age in max_ages.items()
+                ]
+            },
+            {"queries": 0, "first_seen": 0}
+        )
+        scrapes = {}
+        for document in cursor:
+            source_key = document.pop("source_key")
+            seen = document.pop("hits")[query_id(query)]
+            document.pop("last_seen", None)
+            document.pop("rank", None)
+            scrapes.setdefault(source_key, {}).setdefault(seen["seen"], []).append((seen["rank"], document))
+        # Products of older scrapes than the latest are not mixed in
+        stored = {}
+        for source_key, by_seen in scrapes.items():
+            seen = max(by_seen)
+            ranked = sorted(by_seen[seen], key=lambda item: item[0])
+            stored[source_key] = ([document for rank, document in ranked], (now - seen).total_seconds())
+        return stored
+    except DatabaseUnavailable:
+        return {}
+    except Exception as e:
+        logger.error(f"Error loading stored products for '{query}': {e}")
+        back_off()
+        return {}
+
+def price_summary(product_ids, days):
+    """Min, average and max price of products over the last days, from the daily buckets
+
+    Returns {product_id: summary} with the daily min/avg/max series of each
+    product.
+    """
+    since = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    buckets = get_price_history().find(
+        {"product_id": {"$in": list(product_ids)}, "day": {"$gte": since}},
+        {"samples": 0}
+    ).sort("day", 1)
+
+    summaries = {}
+    for bucket in buckets:
+        summary = summaries.setdefault(bucket["product_id"], {
+            "product_id": bucket["product_id"],
+            "platform": bucket.get("platform"),
+            "name": bucket.get("name"),
+            "min": bucket["min"],
+            "max": bucket["max"],
+            "sum": 0.0,
+            "observations": 0,
+            "daily": []
+        })
+        summary["min"] = min(summary["min"], bucket["min"])
+        summary["max"] = max(summary["max"], bucket["max"])
+        summary["sum"] += bucket["sum"]
+        summary["observations"] += bucket["count"]
+        summary["name"] = bucket.get("name") or summary["name"]
+        summary["last_price"] = bucket.get("last_price")
+        summary["daily"].append({
+            "day": bucket["day"].strftime('%Y-%m-%d'),
+            "min": bucket["min"],
+            "avg": round(bucket["sum"] / bucket["count"], 2),
+            "max": bucket["max"],
+            "observations": bucket["count"]
+        })
+
+    for summary in summaries.values():
+        summary["avg"] = round(summary.pop("sum") / summary["observations"], 2)
+    return summaries
@@ -0,0 +1,40 @@
+"""
+Streaming responses for the SafeBite scrapers
+
+The streaming scrape endpoints emit one event per source as soon as that
+source has been parsed, followed by a final summary event, so the UI can
+render the first results while slower sources are still loading.
+
+Formats (format query parameter):
+- ndjson (default): one JSON object per line, with an "event" field
+- sse: Server-Sent Events, with the event name on the event: line
+"""
+
+import json
+from flask import Response, stream_with_context
+
+STREAM_NDJSON = 'ndjson'
+STREAM_SSE = 'sse'
+
+STREAM_MIMETYPES = {
+    STREAM_NDJSON: 'application/x-ndjson',
+    STREAM_SSE: 'text/event-stream'
+}
+
+def format_event(event, fmt):
+    """Serialize one event for the given stream format"""
+    data = json.dumps(event, separators=(',', ':'))
+    if fmt == STREAM_SSE:
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return data + '\n'
+
+def stream_response(events, fmt):
+    """Stream an iterable of event dicts as NDJSON or Server-Sent Events"""
+    if fmt not in STREAM_MIMETYPES:
+        fmt = STREAM_NDJSON
+    body = stream_with_context(format_event(event, fmt) for event in events)
+    return Response(body, mimetype=STREAM_MIMETYPES[fmt], headers={
+        'Cache-Control': 'no-cache',
+        # Keep reverse proxies from buffering the stream
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,101 @@
+"""
+Price-per-unit normalization for scraped grocery products
+
+extract_weight leaves free text such as "500g", "1 kg", "2 x 200 ml" or
+"6 pcs" on every product. normalize_products() parses those into a
+quantity in a canonical unit (grams, millilitres or pieces) and computes
+the price per 100 g, per 100 ml or per piece for a whole batch of products
+at once with NumPy, so clients can compare products on value without
+parsing strings themselves.
+"""
+
+import re
+import numpy as np
+
+# Canonical unit and factor for every unit spelling
+UNITS = {
+    "mg": ("g", 0.001),
+    "g": ("g", 1.0), "gm": ("g", 1.0), "gms": ("g", 1.0), "gram": ("g", 1.0), "grams": ("g", 1.0),
+    "kg": ("g", 1000.0), "kgs": ("g", 1000.0), "kilogram": ("g", 1000.0), "kilograms": ("g", 1000.0),
+    "lb": ("g", 453.592), "lbs": ("g", 453.592), "pound": ("g", 453.592), "pounds": ("g", 453.592),
+    "oz": ("g", 28.3495), "ounce": ("g", 28.3495), "ounces": ("g", 28.3495),
+    "ml": ("ml", 1.0), "millilitre": ("ml", 1.0), "milliliter": ("ml", 1.0),
+    "l": ("ml", 1000.0), "ltr": ("ml", 1000.0), "litre": ("ml", 1000.0), "liter": ("ml", 1000.0),
+    "pc": ("pcs", 1.0), "pcs": ("pcs", 1.0), "piece": ("pcs", 1.0), "pieces": ("pcs", 1.0),
+    "pack": ("pcs", 1.0), "packs": ("pcs", 1.0), "unit": ("pcs", 1.0), "units": ("pcs", 1.0)
+}
+
+# Prices are quoted per 100 g, per 100 ml or per piece
+UNIT_BASIS = {"g": 100.0, "ml": 100.0, "pcs": 1.0}
+UNIT_BASIS_LABELS = {"g": "100g", "ml": "100ml", "pcs": "pc"}
+
+# Longest spellings first so "kg" is not read as "g"
+QUANTITY_PATTERN = re.compile(
+    r'(?:(\d+)\s*[x×]\s*)?(\d+(?:\.\d+)?)\s*(' + '|'.join(sorted(UNITS, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+
+def parse_quantity(text):
+    """Return the (quantity, unit) of a weight text in its canonical unit, or (None, None)"""
+    if not text:
+        return None, None
+    match = QUANTITY_PATTERN.search(text)
+    if not match:
+        return None, None
+    count, amount, unit = match.groups()
+    canonical, factor = UNITS[unit.lower()]
+    return float(amount) * factor * (int(count) if count else 1), canonical
+
+def normalize_products(products):
+    """Return copies of a batch of products with quantity, unit and price_per_unit
+
+    The quantity is read from the product's weight, or its name when the
+    weight is empty. Products without a readable quantity or price get
+    None.
+    """
+    if not products:
+        return products
+
+    parsed = [parse_quantity(product.get("weight") or product.get("name")) for product in products]
+    quantities = np.array([quantity or 0.0 for quantity, unit in parsed], dtype=float)
+    prices = np.array([product.get("sale_price") or product.get("price") or 0.0 for product in products], dtype=float)
+    bases = np.array([UNIT_BASIS.get(unit, 0.0) for quantity, unit in parsed], dtype=float)
+
+    valid = (quantities > 0) & (prices > 0)
+    per_unit = np.full(len(products), np.nan)
+    np.divide(prices * bases, quantities, out=per_unit, where=valid)
+    per_unit = np.round(per_unit, 2)
+
+    return [
+        {
+            **product,
+            "quantity": quantity,
+            "unit": unit,
+            "price_per_unit": value if ok else None,
+            "price_per_unit_basis": UNIT_BASIS_LABELS[unit] if ok else None
+        }
+        for product, (quantity, unit), value, ok in zip(products, parsed, per_unit.tolist(), valid.tolist())
+    ]
+
+# Order of the bases in sort_by_value; products without one come last
+BASIS_ORDER = {label: index for index, label in enumerate(UNIT_BASIS_LABELS.values())}
+
+def sort_by_value(products):
+    """Order normalized products by basis, then price per unit, cheapest first
+
+    A price per 100 g cannot be compared with one per piece, so products
+    are grouped by price_per_unit_basis (per 100 g, per 100 ml, per piece)
+    and ranked within each group. Products without a price per unit keep
+    their order at the end.
+    """
+    if not products:
+        return products
+    values = np.array(
+        [product["price_per_unit"] if product.get("price_per_unit") is not None else np.inf for product in products],
+        dtype=float
+    )
+    bases = np.array(
+        [BASIS_ORDER.get(product.get("price_per_unit_basis"), len(BASIS_ORDER)) for product in products]
+    )
+    # lexsort is stable and sorts by its last key first
+    return [products[index] for index in np.lexsort((values, bases))]
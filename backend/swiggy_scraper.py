@@ -1,14 +1,12 @@
 from flask import Flask, request, jsonify
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
+from scrape_jobs import scrape_jobs
 
 app = Flask(__name__)
+app.register_blueprint(scrape_jobs)
 
-@app.route('/api/crawl', methods=['GET'])
-def crawl_food_sites():
-    query = request.args.get("query")
-    city = request.args.get("city")
-
+def crawl_swiggy(query, city):
     results = []
 
     with sync_playwright() as p:
@@ -33,4 +31,15 @@ def crawl_food_sites():
 
         browser.close()
 
-    return jsonify(results)
+    return results
+
+def run_crawl_job(params):
+    """Run a Swiggy crawl job (see scrape_jobs)"""
+    return crawl_swiggy(params["query"], params["city"])
+
+@app.route('/api/crawl', methods=['GET'])
+def crawl_food_sites():
+    query = request.args.get("query")
+    city = request.args.get("city")
+
+    return jsonify(crawl_swiggy(query, city))
@@ -0,0 +1,49 @@
+import os
+import time
+
+os.environ.setdefault('SCRAPER_CACHE_BACKEND', 'memory')
+os.environ['SCRAPER_SERVICE_URL'] = ''
+
+import enhanced_grocery_scraper as grocery
+from scraper_cache import get_fresh, set_fresh
+from scraper_prewarm import PREWARM_MARGIN
+
+def stub_sources(monkeypatch):
+    """Replace the scrapes with stubs, run refreshes inline and return the scraped keys"""
+    scraped = []
+
+    def scrape_source(key, query, deadline=None):
+        scraped.append(key)
+        return {"source": key, "products": [], "fetch_path": "http", "status": grocery.SOURCE_OK}
+
+    monkeypatch.setattr(grocery, 'scrape_source', scrape_source)
+    monkeypatch.setattr(grocery, 'persist_products', lambda *args, **kwargs: None)
+    monkeypatch.setattr(grocery, 'refresh_in_background', lambda key, refresh: refresh())
+    monkeypatch.setattr(grocery, 'plan_sources', lambda scraper, sources: (list(sources), []))
+    return scraped
+
+def cache_source(key, query, ttl):
+    result = {"source": key, "products": [], "fetch_path": "http", "status": grocery.SOURCE_OK}
+    set_fresh(grocery.cache, grocery.source_cache_key(key, query), result, ttl)
+    return get_fresh(grocery.cache, grocery.source_cache_key(key, query))[1]
+
+def test_warm_query_rescrapes_entries_about_to_expire(monkeypatch):
+    scraped = stub_sources(monkeypatch)
+    query = f"prewarm-expiring-{time.time()}"
+    key = "blinkit"
+    before = cache_source(key, query, PREWARM_MARGIN / 2)
+
+    grocery.warm_query(query)
+
+    assert key in scraped
+    assert get_fresh(grocery.cache, grocery.source_cache_key(key, query))[1] > before
+
+def test_warm_query_skips_entries_fresh_beyond_margin(monkeypatch):
+    scraped = stub_sources(monkeypatch)
+    query = f"prewarm-fresh-{time.time()}"
+    for key in grocery.GROCERY_SOURCES:
+        cache_source(key, query, PREWARM_MARGIN * 2)
+
+    grocery.warm_query(query)
+
+    assert scraped == []
@@ -0,0 +1,57 @@
+import os
+import time
+import threading
+
+os.environ.setdefault('SCRAPER_CACHE_BACKEND', 'memory')
+
+from flask import Flask
+import scrape_jobs
+from scraper_cache import get_cache
+
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(scrape_jobs.scrape_jobs)
+    return app.test_client()
+
+def test_rejects_params_of_the_wrong_type():
+    jobs = client()
+    for body in (
+        {"type": "grocery", "params": {"q": 5}},
+        {"type": "grocery", "params": {"q": "  "}},
+        {"type": "grocery", "params": {"q": "milk", "sort": ["value"]}},
+        {"type": "food_delivery", "params": {"food": "pizza", "city": {"name": "Mumbai"}}},
+        {"type": "food_delivery", "params": {"food": "pizza", "city": "Mumbai", "lat": "north"}},
+        {"type": "food_delivery", "params": {"food": "pizza", "city": "Mumbai", "lon": True}}
+    ):
+        response = jobs.post('/api/scrape-jobs', json=body)
+        assert response.status_code == 400, body
+
+def test_running_job_survives_scrape_cache_eviction(monkeypatch):
+    release = threading.Event()
+
+    def runner(params):
+        release.wait(10)
+        return {"query": params["q"]}
+
+    monkeypatch.setattr(scrape_jobs, 'load_runner', lambda job_type: runner)
+    jobs = client()
+    response = jobs.post('/api/scrape-jobs', json={"type": "grocery", "params": {"q": "milk"}})
+    assert response.status_code == 202
+    job_id = response.get_json()["id"]
+
+    # Fill the scrape cache well past its bound
+    cache = get_cache()
+    for index in range(cache.max_entries + 10):
+        cache.set(f"test_eviction_{index}", {"index": index}, 60)
+
+    response = jobs.get(f'/api/scrape-jobs/{job_id}')
+    assert response.status_code == 200
+    assert response.get_json()["status"] in (scrape_jobs.JOB_QUEUED, scrape_jobs.JOB_RUNNING)
+
+    release.set()
+    for _ in range(100):
+        job = jobs.get(f'/api/scrape-jobs/{job_id}').get_json()
+        if job["status"] == scrape_jobs.JOB_DONE:
+            break
+        time.sleep(0.05)
+    assert job["result"] == {"query": "milk"}